@@ -0,0 +1,60 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import pathlib
+import typing
+
+import pytest
+import yaml
+
+from suikinkutsu.constants import ENV_CONFIG_DIR, ENV_CONFIG_FILE, ENV_PLATFORM, ENV_RECIPE_FILE, ENV_OUTPUT
+
+
+@pytest.fixture
+def environment(tmp_path, monkeypatch) -> pathlib.Path:
+    """
+    Point suikinkutsu at a scratch configuration directory and the in-memory fake platform
+    """
+    monkeypatch.setenv(ENV_CONFIG_DIR, str(tmp_path))
+    monkeypatch.setenv(ENV_CONFIG_FILE, str(tmp_path / 'water.yaml'))
+    monkeypatch.setenv(ENV_RECIPE_FILE, str(tmp_path / 'Recipe'))
+    monkeypatch.setenv(ENV_PLATFORM, 'fake')
+    monkeypatch.setenv(ENV_OUTPUT, 'json')
+    return tmp_path
+
+
+@pytest.fixture
+def recipe(environment) -> typing.Callable[[int], pathlib.Path]:
+    """
+    Write a recipe of a given number of PostgreSQL instances, each depending on its predecessor
+    """
+    def write(size: int) -> pathlib.Path:
+        blueprints = {}
+        for index in range(size):
+            blueprints[f'pg-{index}'] = {'kind': 'pg'}
+            if index > 0:
+                blueprints[f'pg-{index}']['depends_on'] = [f'pg-{index - 1}']
+        path = environment / 'Recipe'
+        with open(path, 'w', encoding='UTF-8') as recipe_file:
+            yaml.safe_dump({'blueprints': blueprints}, recipe_file)
+        return path
+    return write
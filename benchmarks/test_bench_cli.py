@@ -0,0 +1,41 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize('args', [[], ['config', 'show'], ['instance', 'list']], ids=['help', 'config-show',
+                                                                                     'instance-list'])
+def test_cold_start(benchmark, environment, args):
+    """
+    A fresh interpreter per round, so module imports and parser construction are part of the measurement. Without
+    arguments, the CLI prints its help
+    """
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [src, os.environ.get('PYTHONPATH')]))}
+    result = benchmark(subprocess.run, [sys.executable, '-m', 'suikinkutsu.cli', *args],
+                       env=env, capture_output=True, check=False)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,50 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import argparse
+import contextlib
+import io
+
+import pytest
+
+from suikinkutsu.cli import cook_up, cook_down
+from suikinkutsu.config import Configuration
+from suikinkutsu.runtime import Runtime
+from suikinkutsu.secretsfile import SecretsFile
+
+
+@pytest.mark.parametrize('size', [1, 10, 100])
+def test_cook_up_down(benchmark, recipe, size):
+    recipe(size)
+    config = Configuration()
+    runtime = Runtime(config, SecretsFile(config))
+    runtime.cli_assess(None)
+    assert len(runtime.recipe.blueprints) == size
+    args = argparse.Namespace(allocate_cores=False, reserve_cores=0, cook_workers=4, environment=[], labels=[])
+
+    def cook():
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert cook_up(runtime, args) == 0
+            assert cook_down(runtime, args) == 0
+
+    benchmark(cook)
+    assert runtime.platform.instances() == []
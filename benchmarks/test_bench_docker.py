@@ -0,0 +1,98 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import json
+import subprocess
+import timeit
+
+import pytest
+
+from suikinkutsu.config import Configuration
+from suikinkutsu.constants import LABEL_CREATED_BY
+from suikinkutsu.platforms import Docker
+
+
+def inspect_record(index: int) -> dict:
+    """
+    A container as reported by 'container inspect', trimmed to what is parsed
+    """
+    return {
+        'Id': f'{index:064x}',
+        'Name': f'/pg-{index}',
+        'State': {'Running': index % 2 == 0},
+        'Config': {'Labels': {'org.mrmat.created-by': 'suikinkutsu',
+                              'org.mrmat.suikinkutsu.blueprint': 'PostgreSQL'}},
+        'NetworkSettings': {'Ports': {'5432/tcp': [{'HostIp': '127.0.0.1', 'HostPort': str(10000 + index)}]}},
+        'Mounts': [{'Type': 'volume', 'Name': f'pg-{index}_data', 'Destination': '/var/lib/postgresql/data'}]
+    }
+
+
+def inspect_document(count: int) -> bytes:
+    """
+    The output of 'container inspect' for a given number of containers
+    """
+    return json.dumps([inspect_record(index) for index in range(count)]).encode('UTF-8')
+
+
+@pytest.mark.parametrize('count', [10, 1000, 10000])
+def test_docker_instances(benchmark, environment, monkeypatch, count):
+    container_ids = '\n'.join(f'{index:064x}' for index in range(count))
+    inspected = inspect_document(count)
+
+    def execute(args, check=True):
+        return subprocess.CompletedProcess(args=args, returncode=0, stdout=container_ids, stderr='')
+
+    def read(args, chunk_size):
+        return (inspected[offset:offset + chunk_size] for offset in range(0, len(inspected), chunk_size))
+
+    docker = Docker(Configuration())
+    docker._available = True
+    monkeypatch.setattr(docker, 'execute', execute)
+    monkeypatch.setattr(docker, 'read', read)
+    instances = benchmark(docker.instances)
+    assert len(instances) == count
+
+
+def test_docker_instances_streamed(benchmark, environment, monkeypatch):
+    container_ids = '\n'.join(f'{index:064x}' for index in range(10000))
+    inspected = inspect_document(10000)
+
+    def execute(args, check=True):
+        return subprocess.CompletedProcess(args=args, returncode=0, stdout=container_ids, stderr='')
+
+    def read(args, chunk_size):
+        return (inspected[offset:offset + chunk_size] for offset in range(0, len(inspected), chunk_size))
+
+    def loaded():
+        # What instances() did before the inspection was read as a stream
+        return [docker._instance_from_inspect(raw_instance) for raw_instance in json.loads(inspected)
+                if raw_instance.get('Config', {}).get('Labels', {}).get(LABEL_CREATED_BY)]
+
+    docker = Docker(Configuration())
+    docker._available = True
+    monkeypatch.setattr(docker, 'execute', execute)
+    monkeypatch.setattr(docker, 'read', read)
+    baseline = min(timeit.repeat(loaded, setup='gc.enable()', number=1, repeat=5))
+    instances = benchmark(docker.instances)
+    assert len(instances) == 10000
+    if benchmark.stats is not None:
+        assert benchmark.stats.stats.min < baseline * 1.2, 'Streaming the inspection regressed against json.loads'
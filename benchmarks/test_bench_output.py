@@ -0,0 +1,46 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import contextlib
+import io
+
+import pytest
+
+from suikinkutsu.config import Configuration
+from suikinkutsu.outputs import OutputEntry, OUTPUTS, output_class
+
+
+@pytest.mark.parametrize('rows', [100, 1000, 10000])
+@pytest.mark.parametrize('output_name', list(OUTPUTS))
+def test_output_table(benchmark, environment, output_name, rows):
+    output = output_class(output_name)(Configuration())
+    entry = OutputEntry(title='Instances',
+                        columns=['Id', 'Name', 'Platform', 'Blueprint', 'Running', 'Volumes'],
+                        msg=[[f'{index:012x}', f'pg-{index}', 'fake', 'PostgreSQL', str(index % 2 == 0),
+                              f'pg-{index}_data'] for index in range(rows)])
+
+    def render():
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            output.print(entry)
+        return stdout
+
+    assert len(benchmark(render).getvalue()) > 0
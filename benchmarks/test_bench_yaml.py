@@ -0,0 +1,108 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import contextlib
+import io
+import pathlib
+import shutil
+
+import pytest
+import yaml
+
+from suikinkutsu import yamlstream
+from suikinkutsu.config import Configuration
+from suikinkutsu.lockfile import LockFile
+from suikinkutsu.outputs import OutputEntry, YAMLWaterOutput, YAMLStreamWaterOutput
+from suikinkutsu.recipe import Recipe
+from suikinkutsu.runtime import Runtime
+from suikinkutsu.secretsfile import SecretsFile
+
+# The pure-Python implementation and, where PyYAML was built with it, libyaml
+LOADERS = [pytest.param(yaml.SafeLoader, id='python'),
+           pytest.param(getattr(yaml, 'CSafeLoader', None), id='libyaml',
+                        marks=pytest.mark.skipif(not yaml.__with_libyaml__, reason='PyYAML is built without libyaml'))]
+DUMPERS = [pytest.param(yaml.SafeDumper, id='python'),
+           pytest.param(getattr(yaml, 'CSafeDumper', None), id='libyaml',
+                        marks=pytest.mark.skipif(not yaml.__with_libyaml__, reason='PyYAML is built without libyaml'))]
+
+
+@pytest.mark.parametrize('size', [100, 1000])
+@pytest.mark.parametrize('loader', LOADERS)
+def test_recipe_parse(benchmark, recipe, monkeypatch, loader, size):
+    content = recipe(size).read_bytes()
+    monkeypatch.setattr('suikinkutsu.yamlstream.SafeLoader', loader)
+    assert len(benchmark(yamlstream.load, content)['blueprints']) == size
+
+
+@pytest.mark.parametrize('size', [100, 1000])
+@pytest.mark.parametrize('cached', [False, True], ids=['compiled', 'cached'])
+def test_recipe_load(benchmark, recipe, cached, size):
+    recipe(size)
+    config = Configuration()
+    runtime = Runtime(config, SecretsFile(config))
+    cache = pathlib.Path(config.config_dir.value) / 'recipes'
+
+    def setup():
+        if not cached:
+            shutil.rmtree(cache, ignore_errors=True)
+    Recipe(config, runtime.blueprints, LockFile(config))
+    loaded = benchmark.pedantic(Recipe, args=(config, runtime.blueprints, LockFile(config)), setup=setup, rounds=10)
+    assert len(loaded.blueprints) == size
+
+
+@pytest.mark.parametrize('rows', [1000, 10000])
+@pytest.mark.parametrize('output_class', [YAMLWaterOutput, YAMLStreamWaterOutput])
+@pytest.mark.parametrize('dumper', DUMPERS)
+def test_instance_list(benchmark, environment, monkeypatch, dumper, output_class, rows):
+    monkeypatch.setattr('suikinkutsu.yamlstream.SafeDumper', dumper)
+    output = output_class(Configuration())
+
+    def render():
+        entry = OutputEntry(title='Instances',
+                            columns=['Id', 'Name', 'Platform', 'Blueprint', 'Running', 'Volumes'],
+                            msg=([f'{index:012x}', f'pg-{index}', 'fake', 'PostgreSQL', str(index % 2 == 0),
+                                  f'pg-{index}_data'] for index in range(rows)))
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            output.print(entry)
+        return stdout
+
+    assert len(benchmark(render).getvalue()) > 0
+
+
+@pytest.mark.parametrize('size', [100, 1000])
+@pytest.mark.parametrize('templated', [False, True], ids=['explicit', 'replicas'])
+def test_recipe_replicas(benchmark, environment, templated, size):
+    if templated:
+        blueprints = {'pg': {'kind': 'pg', 'replicas': size}}
+    else:
+        blueprints = {f'pg-{index}': {'kind': 'pg'} for index in range(size)}
+    with open(environment / 'Recipe', 'w', encoding='UTF-8') as recipe_file:
+        yamlstream.dump({'blueprints': blueprints}, recipe_file)
+    config = Configuration()
+    runtime = Runtime(config, SecretsFile(config))
+    cache = pathlib.Path(config.config_dir.value) / 'recipes'
+
+    def load():
+        shutil.rmtree(cache, ignore_errors=True)
+        return Recipe(config, runtime.blueprints, LockFile(config)).blueprints
+    assert len(benchmark(load)) == size
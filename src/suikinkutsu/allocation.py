@@ -0,0 +1,89 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import math
+import typing
+
+from suikinkutsu.exceptions import MurkyWaterException
+
+
+def parse_cpuset(cpuset: str) -> typing.List[int]:
+    """
+    Parse a cpuset such as '0-2,5' into the list of cores it contains
+    """
+    cores = []
+    for part in cpuset.split(','):
+        first, _, last = part.strip().partition('-')
+        cores.extend(range(int(first), int(last or first) + 1))
+    return sorted(set(cores))
+
+
+def format_cpuset(cores: typing.Iterable[int]) -> str:
+    """
+    Format cores as a cpuset, collapsing consecutive cores into ranges, e.g. '0-2,5'
+    """
+    ranges = []
+    for core in sorted(set(cores)):
+        if ranges and ranges[-1][1] == core - 1:
+            ranges[-1][1] = core
+        else:
+            ranges.append([core, core])
+    return ','.join(str(first) if first == last else f'{first}-{last}' for first, last in ranges)
+
+
+def allocate_cores(demands: typing.Dict[str, float], cores: typing.List[int]) -> typing.Dict[str, str]:
+    """
+    Split cores between instances in proportion to their demand. Each instance is pinned to a contiguous block of at
+    least one core, so instances do not compete for cores unless there are more instances than cores, in which case
+    they share cores round-robin
+    Args:
+        demands: The relative demand of each instance, in the order to allocate blocks of cores in
+        cores: The cores available for allocation
+
+    Returns:
+        The cpuset of each instance
+
+    Raises:
+        MurkyWaterException when there are no cores to allocate
+    """
+    if len(cores) == 0:
+        raise MurkyWaterException(msg='There are no cores left to allocate')
+    names = list(demands.keys())
+    if len(names) >= len(cores):
+        return {name: str(cores[index % len(cores)]) for index, name in enumerate(names)}
+    total = sum(max(demand, 0.0) for demand in demands.values()) or 1.0
+    shares = {name: max(demands[name], 0.0) / total * len(cores) for name in names}
+    counts = {name: max(1, math.floor(share)) for name, share in shares.items()}
+    # Guaranteeing every instance a core may overshoot, which is taken from those with the most cores
+    while sum(counts.values()) > len(cores):
+        counts[max(names, key=lambda name: counts[name])] -= 1
+    # Hand out the remaining cores by largest remainder
+    remaining = len(cores) - sum(counts.values())
+    for name in sorted(names, key=lambda name: shares[name] - counts[name], reverse=True)[:remaining]:
+        counts[name] += 1
+    allocation = {}
+    offset = 0
+    for name in names:
+        allocation[name] = format_cpuset(cores[offset:offset + counts[name]])
+        offset += counts[name]
+    return allocation
@@ -19,22 +19,53 @@
 #  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
+import contextlib
+import os
 import subprocess
+import tempfile
 import typing
 
 from suikinkutsu import MurkyWaterException
 
+if typing.TYPE_CHECKING:
+    from suikinkutsu.journal import Journal
+
+# Commands of these groups are told apart by their second argument, e.g. 'container run' and 'container rm'
+COMMAND_GROUPS = {'container', 'image', 'volume', 'network', 'system', 'builder', 'buildx', 'compose', 'context',
+                  'namespace', 'config', 'rollout'}
+
 
 class CommandExecutor:
     """
     Managed execution of a command
     """
 
-    def _execute(self, command: str, args: typing.List[str]) -> subprocess.CompletedProcess:
+    _journal: typing.Optional['Journal'] = None
+
+    @property
+    def journal(self) -> typing.Optional['Journal']:
+        return self._journal
+
+    @journal.setter
+    def journal(self, value: 'Journal'):
+        self._journal = value
+
+    def _span(self, command: str, args: typing.List[str]) -> typing.ContextManager[typing.Dict]:
+        """
+        Time the execution of a command in the journal, if there is one. The operation is the subcommand, without
+        arguments which would make every invocation unique, such as instance names
+        """
+        if self._journal is None:
+            return contextlib.nullcontext({})
+        operation = args[:2] if len(args) > 1 and args[0] in COMMAND_GROUPS else args[:1]
+        return self._journal.span(os.path.basename(str(command)), ' '.join(operation), len(args))
+
+    def _execute(self, command: str, args: typing.List[str], check: bool = True) -> subprocess.CompletedProcess:
         """
         Execute the platform command with the provided parameters
         Args:
             args: Parameters to the executable
+            check: Raise an exception when the executable does not return with a successful exit code
 
         Returns:
             The completed process output from the subprocess module
@@ -47,11 +78,162 @@ class CommandExecutor:
             raise MurkyWaterException(msg='Platform is not available')
         if not self.executable:
             raise MurkyWaterException(msg=f'Unable to find {self.executable_name} on your path')
-        try:
-            args.insert(0, str(command))
-            return subprocess.run(args=args,
-                                  capture_output=True,
-                                  check=True,
-                                  encoding='UTF-8')
-        except subprocess.CalledProcessError as cpe:
-            raise MurkyWaterException(code=cpe.returncode, msg=cpe.output) from cpe
+        with self._span(command, args) as span:
+            try:
+                args.insert(0, str(command))
+                result = subprocess.run(args=args,
+                                        capture_output=True,
+                                        check=check,
+                                        encoding='UTF-8')
+            except subprocess.CalledProcessError as cpe:
+                span['exit'] = cpe.returncode
+                span['bytes'] = len(cpe.stdout or '') + len(cpe.stderr or '')
+                raise MurkyWaterException(code=cpe.returncode, msg=cpe.output) from cpe
+            span['exit'] = result.returncode
+            span['bytes'] = len(result.stdout or '') + len(result.stderr or '')
+            return result
+
+    def _stream(self, command: str, args: typing.List[str]) -> typing.Iterator[str]:
+        """
+        Execute the platform command with the provided parameters and yield its output line by line while it runs.
+        Standard error is merged into the output so progress reported there is streamed as well
+        Args:
+            args: Parameters to the executable
+
+        Returns:
+            An iterator over the lines of output, without their trailing newline
+
+        Raises:
+            MurkyWaterException when the platform is not unavailable, the platform executable cannot be found or
+            the executable did not return with a successful exit code
+        """
+        if not self._available and self._available is not None:
+            raise MurkyWaterException(msg='Platform is not available')
+        if not self.executable:
+            raise MurkyWaterException(msg=f'Unable to find {self.executable_name} on your path')
+        last_line = ''
+        with self._span(command, args) as span:
+            span['bytes'] = 0
+            with subprocess.Popen(args=[str(command), *args],
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.STDOUT,
+                                  encoding='UTF-8') as proc:
+                for line in proc.stdout:
+                    span['bytes'] += len(line)
+                    last_line = line.rstrip('\n')
+                    yield last_line
+            span['exit'] = proc.returncode
+            if proc.returncode != 0:
+                raise MurkyWaterException(code=proc.returncode, msg=last_line)
+
+    def _redirect(self,
+                  command: str,
+                  args: typing.List[str],
+                  stdin: typing.Optional[typing.BinaryIO] = None,
+                  stdout: typing.Optional[typing.BinaryIO] = None) -> None:
+        """
+        Execute the platform command with its input and/or output connected directly to the provided files. The data
+        does not pass through this process, which avoids copying it when a real file is provided
+        Args:
+            args: Parameters to the executable
+            stdin: File (or pipe) to connect to the input of the command
+            stdout: File (or pipe) to connect to the output of the command
+
+        Raises:
+            MurkyWaterException when the platform is not unavailable, the platform executable cannot be found or
+            the executable did not return with a successful exit code
+        """
+        if not self._available and self._available is not None:
+            raise MurkyWaterException(msg='Platform is not available')
+        if not self.executable:
+            raise MurkyWaterException(msg=f'Unable to find {self.executable_name} on your path')
+        # The data does not pass through this process, so the bytes it produced are not known
+        with self._span(command, args) as span:
+            try:
+                subprocess.run(args=[str(command), *args],
+                               stdin=stdin if stdin is not None else subprocess.DEVNULL,
+                               stdout=stdout if stdout is not None else subprocess.DEVNULL,
+                               stderr=subprocess.PIPE,
+                               check=True)
+            except subprocess.CalledProcessError as cpe:
+                span['exit'] = cpe.returncode
+                raise MurkyWaterException(code=cpe.returncode,
+                                          msg=cpe.stderr.decode('UTF-8', errors='replace')) from cpe
+            span['exit'] = 0
+
+    def _read(self, command: str, args: typing.List[str], chunk_size: int) -> typing.Iterator[bytes]:
+        """
+        Execute the platform command with the provided parameters and yield its binary output in chunks
+        Args:
+            args: Parameters to the executable
+            chunk_size: The maximum size of a chunk in bytes
+
+        Returns:
+            An iterator over the chunks of output
+
+        Raises:
+            MurkyWaterException when the platform is not unavailable, the platform executable cannot be found or
+            the executable did not return with a successful exit code
+        """
+        if not self._available and self._available is not None:
+            raise MurkyWaterException(msg='Platform is not available')
+        if not self.executable:
+            raise MurkyWaterException(msg=f'Unable to find {self.executable_name} on your path')
+        # Standard error goes to a file, so that a command writing a lot to it cannot block while its output is read
+        with self._span(command, args) as span, tempfile.TemporaryFile() as errors:
+            span['bytes'] = 0
+            with subprocess.Popen(args=[str(command), *args],
+                                  stdout=subprocess.PIPE,
+                                  stderr=errors) as proc:
+                while chunk := proc.stdout.read(chunk_size):
+                    span['bytes'] += len(chunk)
+                    yield chunk
+            span['exit'] = proc.returncode
+            if proc.returncode != 0:
+                errors.seek(0)
+                raise MurkyWaterException(code=proc.returncode,
+                                          msg=errors.read().decode('UTF-8', errors='replace'))
+
+    def _write(self, command: str, args: typing.List[str], chunks: typing.Iterable[bytes]) -> str:
+        """
+        Execute the platform command with the provided parameters and write the provided chunks to its input
+        Args:
+            args: Parameters to the executable
+            chunks: The binary input, in chunks
+
+        Returns:
+            The output of the command
+
+        Raises:
+            MurkyWaterException when the platform is not unavailable, the platform executable cannot be found or
+            the executable did not return with a successful exit code
+        """
+        if not self._available and self._available is not None:
+            raise MurkyWaterException(msg='Platform is not available')
+        if not self.executable:
+            raise MurkyWaterException(msg=f'Unable to find {self.executable_name} on your path')
+        broken = False
+        with self._span(command, args) as span, tempfile.TemporaryFile() as output:
+            with subprocess.Popen(args=[str(command), *args],
+                                  stdin=subprocess.PIPE,
+                                  stdout=output,
+                                  stderr=subprocess.STDOUT) as proc:
+                try:
+                    for chunk in chunks:
+                        proc.stdin.write(chunk)
+                except BrokenPipeError:
+                    # The command exited before reading all of its input, its output tells why
+                    broken = True
+                finally:
+                    try:
+                        proc.stdin.close()
+                    except BrokenPipeError:
+                        pass
+            output.seek(0)
+            result = output.read().decode('UTF-8', errors='replace')
+            span['exit'] = proc.returncode
+            span['bytes'] = len(result)
+            if proc.returncode != 0 or broken:
+                raise MurkyWaterException(code=proc.returncode or 1,
+                                          msg=result or f'{command} exited before reading all of its input')
+        return result
@@ -20,7 +20,7 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
-from .blueprint import Blueprint, BlueprintInstance, BlueprintVolume
+from .blueprint import Blueprint
 from .postgres import PostgreSQL
 from .keycloak import Keycloak
 from .jaeger import Jaeger
@@ -28,3 +28,4 @@ from .kafkastore import KafkaStore
 from .ksqldb import KSQLDB
 from .kafka import Kafka
 from .zookeeper import Zookeeper
+from .registry import Registry
@@ -22,10 +22,20 @@
 
 import typing
 import argparse
-from collections import OrderedDict
-from typing import Optional, List
-
+import copy
+import hashlib
+import json
+import re
+import pathlib
+import concurrent.futures
+
+from suikinkutsu.constants import DEFAULT_PULL_WORKERS, DEFAULT_BUNDLE_WORKERS, DEFAULT_BUNDLE_CHUNK_SIZE, \
+    DEFAULT_READINESS_TIMEOUT, DEFAULT_EPHEMERAL_SIZE, MAX_PORT
+from suikinkutsu.exceptions import MurkyWaterException
 from suikinkutsu.behaviours import CommandLineAware
+from suikinkutsu.models import PortBinding, VolumeBinding, Resources
+from suikinkutsu.schema import BlueprintSchema
+from suikinkutsu.bundle import ImageBundle
 from suikinkutsu.outputs import OutputEntry
 
 
@@ -40,10 +50,14 @@ class Blueprint(CommandLineAware):
         self._description = 'An abstract base blueprint'
         self._image = None
         self._version = None
+        self._labels = {}
         self._volume_bindings = []
         self._environment = {}
         self._port_bindings = []
         self._depends_on = []
+        self._resources = Resources()
+        self._readiness = None
+        self._template_ignored_environment = []
 
     def cli_prepare(self, parser, subparsers) -> None:
         blueprint_parser = subparsers.add_parser(name='blueprint', help='Blueprint commands')
@@ -51,7 +65,77 @@ class Blueprint(CommandLineAware):
         blueprint_list_parser = blueprint_subparsers.add_parser('list', help='List available blueprints')
         blueprint_list_parser.set_defaults(cmd=self.blueprint_list)
         blueprint_pull_parser = blueprint_subparsers.add_parser('pull', help='Pull all blueprint container images')
+        blueprint_pull_parser.add_argument('-w', '--workers',
+                                           dest='pull_workers',
+                                           type=int,
+                                           required=False,
+                                           default=DEFAULT_PULL_WORKERS,
+                                           help='Number of images to pull concurrently')
         blueprint_pull_parser.set_defaults(cmd=self.blueprint_pull)
+        blueprint_save_parser = blueprint_subparsers.add_parser('save',
+                                                                help='Save blueprint container images into a bundle')
+        blueprint_save_parser.add_argument('-o', '--bundle',
+                                           dest='bundle',
+                                           required=True,
+                                           help='Directory to save the bundle into')
+        blueprint_save_parser.add_argument('-a', '--all',
+                                           dest='all',
+                                           action='store_true',
+                                           default=False,
+                                           required=False,
+                                           help='Save the images of all blueprints rather than those of the recipe')
+        blueprint_save_parser.add_argument('--chunk-size',
+                                           dest='chunk_size',
+                                           type=int,
+                                           default=DEFAULT_BUNDLE_CHUNK_SIZE // (1024 * 1024),
+                                           required=False,
+                                           help='Size of the uncompressed chunks in MiB')
+        blueprint_save_parser.add_argument('-w', '--workers',
+                                           dest='bundle_workers',
+                                           type=int,
+                                           default=DEFAULT_BUNDLE_WORKERS,
+                                           required=False,
+                                           help='Number of chunks to compress concurrently')
+        blueprint_save_parser.set_defaults(cmd=self.blueprint_save)
+        blueprint_load_parser = blueprint_subparsers.add_parser('load',
+                                                                help='Load blueprint container images from a bundle')
+        blueprint_load_parser.add_argument('-i', '--bundle',
+                                           dest='bundle',
+                                           required=True,
+                                           help='Directory to load the bundle from')
+        blueprint_load_parser.add_argument('-w', '--workers',
+                                           dest='bundle_workers',
+                                           type=int,
+                                           default=DEFAULT_BUNDLE_WORKERS,
+                                           required=False,
+                                           help='Number of chunks to decompress concurrently')
+        blueprint_load_parser.set_defaults(cmd=self.blueprint_load)
+        blueprint_template_parser = blueprint_subparsers.add_parser('template',
+                                                                    help='Pre-initialised volume templates')
+        blueprint_template_subparsers = blueprint_template_parser.add_subparsers()
+        blueprint_template_create_parser = blueprint_template_subparsers.add_parser(
+            'create', help='Initialise the volumes of a blueprint once, to be cloned for new instances')
+        blueprint_template_create_parser.add_argument('-b', '--blueprint',
+                                                      dest='blueprint',
+                                                      required=True,
+                                                      help='Blueprint name, or the name of an entry in the recipe')
+        blueprint_template_create_parser.add_argument('--timeout',
+                                                      dest='timeout',
+                                                      type=int,
+                                                      default=DEFAULT_READINESS_TIMEOUT,
+                                                      required=False,
+                                                      help='Seconds to wait for the initialisation to finish')
+        blueprint_template_create_parser.set_defaults(cmd=self.blueprint_template_create)
+        blueprint_template_remove_parser = blueprint_template_subparsers.add_parser(
+            'remove', help='Remove the volume templates of a blueprint')
+        blueprint_template_remove_parser.add_argument('-b', '--blueprint',
+                                                      dest='blueprint',
+                                                      required=True,
+                                                      help='Blueprint name, or the name of an entry in the recipe')
+        blueprint_template_remove_parser.set_defaults(cmd=self.blueprint_template_remove)
+        blueprint_template_list_parser = blueprint_template_subparsers.add_parser('list',
+                                                                                  help='List volume templates')
+        blueprint_template_list_parser.set_defaults(cmd=self.blueprint_template_list)
 
     # pylint: disable=unused-argument
     def blueprint_list(self, runtime, args: argparse.Namespace) -> int:
@@ -63,13 +147,247 @@ class Blueprint(CommandLineAware):
 
     # pylint: disable=unused-argument
     def blueprint_pull(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
-        for bp in runtime.blueprints.values():
-            runtime.output.info(f'Pulling {bp.image}:{bp.version}')
-            runtime.platform.execute(['pull', f'{bp.image}:{bp.version}'])
+        images = sorted({runtime.platform.image_reference(f'{bp.image}:{bp.version}', local=False)
+                         for bp in runtime.blueprints.values()})
+        present = runtime.platform.images_present(images)
+        for image in sorted(present):
+            runtime.output.info(f'{image} is already present')
+        missing = [image for image in images if image not in present]
+        failed = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(args.pull_workers, 1)) as pool:
+            pulls = {pool.submit(self._pull, runtime, image): image for image in missing}
+            for pull in concurrent.futures.as_completed(pulls):
+                try:
+                    pull.result()
+                    runtime.output.info(f'Pulled {pulls[pull]}')
+                except MurkyWaterException as mwe:
+                    runtime.output.error(f'Failed to pull {pulls[pull]}: {mwe.msg}')
+                    failed += 1
+        return 1 if failed > 0 else 0
+
+    # pylint: disable=unused-argument
+    def blueprint_save(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
+        blueprints = runtime.recipe.blueprints.values()
+        if args.all or len(blueprints) == 0:
+            blueprints = runtime.blueprints.values()
+        images = sorted({f'{bp.image}:{bp.version}' for bp in blueprints})
+        bundle = ImageBundle(pathlib.Path(args.bundle), workers=args.bundle_workers)
+        bundle.save(runtime.platform,
+                    images,
+                    chunk_size=args.chunk_size * 1024 * 1024,
+                    progress=lambda image, size: runtime.output.info(f'Saved {image} ({size} bytes)'))
+        return 0
+
+    # pylint: disable=unused-argument
+    def blueprint_load(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
+        bundle = ImageBundle(pathlib.Path(args.bundle), workers=args.bundle_workers)
+        bundle.load(runtime.platform,
+                    progress=lambda image, size: runtime.output.info(f'Loaded {image} ({size} bytes)'))
+        return 0
+
+    def blueprint_template_create(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
+        blueprint = self.resolve(runtime, args.blueprint)
+        runtime.output.info(f'Initialising the volumes of {blueprint.name} for template {blueprint.template_key()}')
+        runtime.platform.template_create(blueprint, args.timeout)
+        runtime.output.info(f'Created template {blueprint.template_key()}')
+        return 0
+
+    def blueprint_template_remove(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
+        blueprint = self.resolve(runtime, args.blueprint)
+        runtime.platform.template_remove(blueprint)
+        runtime.output.info(f'Removed template {blueprint.template_key()}')
+        return 0
+
+    # pylint: disable=unused-argument
+    def blueprint_template_list(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
+        runtime.output.print(OutputEntry(title='Volume Templates',
+                                         columns=['Template', 'Volumes'],
+                                         msg=[[key, ', '.join(volumes)]
+                                              for key, volumes in runtime.platform.templates().items()]))
+        return 0
+
+    @staticmethod
+    def resolve(runtime: 'Runtime', name: str) -> 'Blueprint':
+        """
+        Look up a blueprint as the recipe configures it if it is part of the recipe, or as it is otherwise
+        Args:
+            runtime: The runtime
+            name: The name of an entry in the recipe or the name of a blueprint
+
+        Returns:
+            The blueprint
+
+        Raises:
+            MurkyWaterException when there is no such recipe entry or blueprint
+        """
+        blueprint = runtime.recipe.blueprints.get(name) or runtime.blueprints.get(name)
+        if not blueprint:
+            raise MurkyWaterException(msg=f'There is no blueprint called {name}')
+        return blueprint
+
+    @staticmethod
+    def _pull(runtime: 'Runtime', image: str) -> None:
+        runtime.output.info(f'Pulling {image}')
+        for line in runtime.platform.image_pull(image):
+            runtime.output.info(f'{image}: {line}')
 
     def blueprints(self):
         return [bp() for bp in Blueprint.__subclasses__()]
 
+    def configure(self, schema: BlueprintSchema) -> None:
+        """
+        Apply the overrides declared by a recipe entry onto this blueprint
+        Args:
+            schema: The recipe entry for this blueprint
+        """
+        self._image = schema.image or self._image
+        self._version = schema.version or self._version
+        self._labels.update(schema.labels or {})
+        self._environment.update(schema.environment or {})
+        if schema.volumes:
+            self._volume_bindings = [VolumeBinding(name=name, mount_point=volume)
+                                     if isinstance(volume, str) else
+                                     VolumeBinding(name=name,
+                                                   mount_point=volume.mount_point,
+                                                   ephemeral=volume.ephemeral,
+                                                   size=volume.size or DEFAULT_EPHEMERAL_SIZE)
+                                     for name, volume in schema.volumes.items()]
+        if schema.ports:
+            self._port_bindings = [PortBinding.from_spec(container, host) for container, host in schema.ports.items()]
+        if schema.depends_on is not None:
+            self._depends_on = list(schema.depends_on)
+        if schema.resources:
+            self._resources = self._resources.merged(Resources(**schema.resources.model_dump()))
+
+    def variant(self,
+                volume_bindings: typing.Optional[typing.List[VolumeBinding]] = None,
+                port_bindings: typing.Optional[typing.List[PortBinding]] = None,
+                labels: typing.Optional[typing.Dict[str, str]] = None,
+                resources: typing.Optional[Resources] = None) -> 'Blueprint':
+        """
+        A copy of this blueprint with different volume and/or port bindings or resources, and additional labels
+        """
+        variant = copy.copy(self)
+        variant._labels = {**self._labels, **(labels or {})}
+        if volume_bindings is not None:
+            variant._volume_bindings = volume_bindings
+        if port_bindings is not None:
+            variant._port_bindings = port_bindings
+        if resources is not None:
+            variant._resources = resources
+        return variant
+
+    def ephemeral(self, size: str = DEFAULT_EPHEMERAL_SIZE) -> 'Blueprint':
+        """
+        A copy of this blueprint with all volumes backed by memory, for instances which are thrown away after use
+        Args:
+            size: The size limit of each volume, e.g. '512m'
+
+        Returns:
+            The ephemeral variant of this blueprint
+        """
+        return self.variant(volume_bindings=[VolumeBinding(name=vol.name,
+                                                           mount_point=vol.mount_point,
+                                                           ephemeral=True,
+                                                           size=size)
+                                             for vol in self.volume_bindings])
+
+    def replica(self, name: str, index: int) -> 'Blueprint':
+        """
+        A copy of this blueprint for one of the instances expanded from a recipe entry with replicas or a matrix. Its
+        volumes are named after the instance and its host ports are offset by its index, so that the instances
+        expanded from the same entry do not clash
+        Args:
+            name: The instance name
+            index: The index of the instance amongst the instances expanded from its recipe entry
+
+        Returns:
+            The variant of this blueprint for the instance
+        """
+        for port in self.port_bindings:
+            if port.host_port and int(port.host_port) + index > MAX_PORT:
+                raise MurkyWaterException(code=400, msg=f'Host port {port.host_port} of instance {name} offset by '
+                                                        f'{index} exceeds {MAX_PORT}')
+        return self.variant(volume_bindings=[VolumeBinding(name=f'{name}-{vol.name}',
+                                                           mount_point=vol.mount_point,
+                                                           ephemeral=vol.ephemeral,
+                                                           size=vol.size)
+                                             for vol in self.volume_bindings],
+                            port_bindings=[PortBinding(host_port=int(port.host_port) + index if port.host_port
+                                                       else port.host_port,
+                                                       container_port=port.container_port,
+                                                       host_ip=port.host_ip,
+                                                       protocol=port.protocol)
+                                           for port in self.port_bindings])
+
+    def create_parser(self, subparsers, help_text: str) -> argparse.ArgumentParser:
+        """
+        Add the create command of this blueprint, with the arguments shared by the create commands of all blueprints
+        Args:
+            subparsers: The subparsers of the command group of this blueprint
+            help_text: The help of the create command
+
+        Returns:
+            The parser of the create command, to add the arguments specific to this blueprint to
+        """
+        parser = subparsers.add_parser(name='create', help=help_text)
+        self.ephemeral_arguments(parser)
+        return parser
+
+    def create_blueprint(self, args: argparse.Namespace) -> 'Blueprint':
+        """
+        The blueprint to create an instance of from the arguments of the create command
+        Args:
+            args: The parsed arguments of the create command
+
+        Returns:
+            The ephemeral variant of this blueprint when requested, this blueprint otherwise
+        """
+        return self.ephemeral(args.ephemeral_size) if args.ephemeral else self
+
+    @staticmethod
+    def ephemeral_arguments(parser: argparse.ArgumentParser):
+        """
+        Add the arguments to create an instance with ephemeral volumes to a create command
+        """
+        parser.add_argument('--ephemeral',
+                            dest='ephemeral',
+                            action='store_true',
+                            default=False,
+                            required=False,
+                            help='Back the volumes by memory rather than named volumes, for throwaway instances')
+        parser.add_argument('--ephemeral-size',
+                            dest='ephemeral_size',
+                            default=DEFAULT_EPHEMERAL_SIZE,
+                            required=False,
+                            help='Size limit of each ephemeral volume')
+
+    def template_key(self) -> str:
+        """
+        The key of the volume template of this blueprint. Volumes initialised from the same image and environment and
+        mounted in the same way are interchangeable, except for environment the blueprint adjusts after cloning (e.g.
+        passwords)
+        Returns:
+            A key derived from the blueprint name, image, version and relevant environment
+        """
+        environment = {key: value for key, value in self.environment.items()
+                       if key not in self._template_ignored_environment}
+        volumes = [[vol.mount_point, vol.ephemeral] for vol in self.volume_bindings]
+        digest = hashlib.sha256(json.dumps([self.image, self.version, environment, volumes],
+                                           sort_keys=True).encode('UTF-8'))
+        version = re.sub(r'[^A-Za-z0-9_.-]', '-', str(self.version))
+        return f'{self.name}-{version}-{digest.hexdigest()[:8]}'
+
+    def adopt(self, platform: 'Platform', name: str) -> None:
+        """
+        Adjust an instance whose data was not initialised for it, because it was started from cloned template volumes
+        or claimed from the pool. This is the place to re-apply environment ignored by the template key. Nothing
+        needs adjusting by default
+        Args:
+            platform: The platform hosting the instance
+            name: The instance name
+        """
+
     @property
     def description(self):
         return self._description
@@ -86,6 +404,10 @@ class Blueprint(CommandLineAware):
     def version(self, value: str):
         self._version = value
 
+    @property
+    def labels(self) -> typing.Dict:
+        return self._labels
+
     @property
     def volume_bindings(self) -> typing.List:
         return self._volume_bindings
@@ -102,83 +424,17 @@ class Blueprint(CommandLineAware):
     def depends_on(self) -> typing.List:
         return self._depends_on
 
-
-class BlueprintVolume:
-    """
-    A blueprint volume
-    """
-
-    def __init__(self, name: str, destination: str):
-        self._name = name
-        self._destination = destination
-
-    @property
-    def name(self):
-        return self._name
-
-    @property
-    def destination(self):
-        return self._destination
-
-
-class BlueprintInstance:
-    """
-    A blueprint instance
-    """
-
-    def __init__(self,
-                 name: str,
-                 platform: 'Platform',
-                 volumes: Optional[List[BlueprintVolume]] = None,
-                 blueprint: Optional[Blueprint] = None):
-        self._id = None
-        self._name = name
-        self._platform = platform
-        self._running = False
-        self._volumes = volumes or []
-        self._blueprint = blueprint
-
-    @property
-    def id(self):
-        return self._id
-
-    @id.setter
-    def id(self, value: str):
-        self._id = value
-
-    @property
-    def name(self):
-        return self._name
-
-    @property
-    def platform(self) -> 'Platform':
-        return self._platform
-
     @property
-    def running(self) -> bool:
-        return self._running
+    def resources(self) -> Resources:
+        return self._resources
 
-    @running.setter
-    def running(self, value: bool):
-        self._running = value
-
-    @property
-    def volumes(self) -> List[BlueprintVolume]:
-        return self._volumes
+    @resources.setter
+    def resources(self, value: Resources):
+        self._resources = value
 
     @property
-    def blueprint(self) -> Blueprint:
-        return self._blueprint
-
-    @blueprint.setter
-    def blueprint(self, value: Blueprint):
-        self._blueprint = value
-
-    def display_dict(self) -> OrderedDict:
-        return OrderedDict({
-            'id': self.id,
-            'name': self.name,
-            'platform': self.platform.name if self.platform else 'Unknown',
-            'blueprint': self.blueprint.name if self.blueprint else 'Unknown',
-            'running': self.running
-        })
+    def readiness(self) -> typing.Optional[typing.List[str]]:
+        """
+        A command run within an instance which succeeds once the instance is ready to serve, or None if unknown
+        """
+        return self._readiness
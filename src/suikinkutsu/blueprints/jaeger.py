@@ -23,7 +23,7 @@
 import argparse
 
 from suikinkutsu.models import VolumeBinding, PortBinding
-from suikinkutsu.blueprints.blueprint import Blueprint, BlueprintInstance
+from suikinkutsu.blueprints.blueprint import Blueprint
 
 
 class Jaeger(Blueprint):
@@ -42,7 +42,7 @@ class Jaeger(Blueprint):
         self._volume_bindings = [
             VolumeBinding(name='jaeger_tmpvol', mount_point='/tmp')
         ]
-        self._environment = {'COLLECTOR_ZIPKIN_HOST_PORT': ':9411', 'COLLECTOR_OLTP_ENABLED': 'true'}
+        self._environment = {'COLLECTOR_ZIPKIN_HOST_PORT': ':9411', 'COLLECTOR_OTLP_ENABLED': 'true'}
         self._port_bindings = [
             PortBinding(container_port=6831, host_port=6831, host_ip='127.0.0.1', protocol='udp'),
             PortBinding(container_port=6832, host_port=6832, host_ip='127.0.0.1', protocol='udp'),
@@ -59,7 +59,7 @@ class Jaeger(Blueprint):
     def cli_prepare(self, parser, subparsers) -> None:
         jaeger_parser = subparsers.add_parser(name='jaeger', help='Jaeger Commands')
         jaeger_subparser = jaeger_parser.add_subparsers()
-        jaeger_create_parser = jaeger_subparser.add_parser(name='create', help='Create a Jaeger instance')
+        jaeger_create_parser = self.create_parser(jaeger_subparser, 'Create a Jaeger instance')
         jaeger_create_parser.set_defaults(cmd=self.jaeger_create)
         jaeger_create_parser.add_argument('-n', '--instance-name',
                                           dest='name',
@@ -74,20 +74,12 @@ class Jaeger(Blueprint):
                                           help='Instance name')
 
     def jaeger_create(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
-        blueprint_instance = BlueprintInstance(name=args.name,
-                                               platform=runtime.platform,
-                                               blueprint=self)
-        self.runtime.instance_create(blueprint_instance)
-        runtime_secrets = self.runtime.secreta
-        if args.name not in runtime_secrets:
-            runtime_secrets[args.name] = {
-                'connection': f'{args.name}:16686'
-            }
-        else:
-            runtime_secrets[args.name]['connection'] = f'{args.name}:16686'
-        self.runtime.secreta = runtime_secrets
+        runtime.platform.apply(self.create_blueprint(args), args.name)
+        runtime.secreta.add(args.name, {
+            'connection': f'{args.name}:16686'
+        })
 
     # pylint: disable=unused-argument
     def jaeger_remove(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
-        blueprint_instance = self.runtime.instance_get(name=args.name, blueprint=self)
-        self.runtime.instance_remove(blueprint_instance)
+        blueprint_instance = runtime.instance_get(name=args.name, blueprint=self)
+        runtime.instance_remove(blueprint_instance)
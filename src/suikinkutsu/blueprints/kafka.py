@@ -23,7 +23,7 @@
 import argparse
 
 from suikinkutsu.models import VolumeBinding, PortBinding
-from .blueprint import Blueprint, BlueprintInstance
+from .blueprint import Blueprint
 
 
 class Kafka(Blueprint):
@@ -59,7 +59,7 @@ class Kafka(Blueprint):
     def cli_prepare(self, parser, subparsers):
         kafka_parser = subparsers.add_parser(name='kafka', help='Kafka Commands')
         kafka_subparser = kafka_parser.add_subparsers()
-        kafka_create_parser = kafka_subparser.add_parser(name='create', help='Create a Kafka instance')
+        kafka_create_parser = self.create_parser(kafka_subparser, 'Create a Kafka instance')
         kafka_create_parser.add_argument('-n', '--instance-name',
                                          dest='name',
                                          default='kafka',
@@ -76,20 +76,12 @@ class Kafka(Blueprint):
 
     # pylint: disable=unused-argument
     def kafka_create(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
-        blueprint_instance = BlueprintInstance(name=args.name,
-                                               platform=self.runtime.platform,
-                                               blueprint=self)
-        self.runtime.instance_create(blueprint_instance)
-        runtime_secrets = self.runtime.secreta
-        if args.name not in runtime_secrets:
-            runtime_secrets[args.name] = {
-                'connection': f'{args.name}:29092'
-            }
-        else:
-            runtime_secrets[args.name]['connection'] = f'{args.name}:29092'
-        self.runtime.secreta = runtime_secrets
+        runtime.platform.apply(self.create_blueprint(args), args.name)
+        runtime.secreta.add(args.name, {
+            'connection': f'{args.name}:29092'
+        })
 
     # pylint: disable=unused-argument
     def kafka_remove(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
-        blueprint_instance = self.runtime.instance_get(name=args.name, blueprint=self)
-        self.runtime.instance_remove(blueprint_instance)
+        blueprint_instance = runtime.instance_get(name=args.name, blueprint=self)
+        runtime.instance_remove(blueprint_instance)
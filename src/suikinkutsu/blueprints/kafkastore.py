@@ -23,7 +23,7 @@
 import argparse
 
 from suikinkutsu.models import VolumeBinding, PortBinding
-from .blueprint import Blueprint, BlueprintInstance
+from .blueprint import Blueprint
 
 
 class KafkaStore(Blueprint):
@@ -54,7 +54,7 @@ class KafkaStore(Blueprint):
     def cli_prepare(self, parser, subparsers):
         kafkastore_parser = subparsers.add_parser(name='kafkastore', help='KafkaStore Commands')
         kafkastore_subparser = kafkastore_parser.add_subparsers()
-        kafkastore_create_parser = kafkastore_subparser.add_parser(name='create', help='Create a KafkaStore instance')
+        kafkastore_create_parser = self.create_parser(kafkastore_subparser, 'Create a KafkaStore instance')
         kafkastore_create_parser.add_argument('-n', '--instance-name',
                                               dest='name',
                                               default='kafkastore',
@@ -71,20 +71,12 @@ class KafkaStore(Blueprint):
 
     # pylint: disable=unused-argument
     def kafkastore_create(self, runtime: 'Runtime', args: argparse.Namespace):
-        blueprint_instance = BlueprintInstance(name=args.name,
-                                               platform=self.runtime.platform,
-                                               blueprint=self)
-        self.runtime.instance_create(blueprint_instance)
-        runtime_secrets = self.runtime.secreta
-        if args.name not in runtime_secrets:
-            runtime_secrets[args.name] = {
-                'connection': f'{args.name}:8081'
-            }
-        else:
-            runtime_secrets[args.name]['connection'] = f'{args.name}:8081'
-        self.runtime.secreta = runtime_secrets
+        runtime.platform.apply(self.create_blueprint(args), args.name)
+        runtime.secreta.add(args.name, {
+            'connection': f'{args.name}:8081'
+        })
 
     # pylint: disable=unused-argument
     def kafkastore_remove(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
-        blueprint_instance = self.runtime.instance_get(name=args.name, blueprint=self)
-        self.runtime.instance_remove(blueprint_instance)
+        blueprint_instance = runtime.instance_get(name=args.name, blueprint=self)
+        runtime.instance_remove(blueprint_instance)
@@ -24,7 +24,7 @@ import argparse
 import secrets
 
 from suikinkutsu.models import VolumeBinding, PortBinding
-from suikinkutsu.blueprints.blueprint import Blueprint, BlueprintInstance
+from suikinkutsu.blueprints.blueprint import Blueprint
 
 
 class Keycloak(Blueprint):
@@ -61,7 +61,7 @@ class Keycloak(Blueprint):
     def cli_prepare(self, parser, subparsers):
         kc_parser = subparsers.add_parser(name='kc', help='Keycloak Commands')
         kc_subparser = kc_parser.add_subparsers()
-        kc_create_parser = kc_subparser.add_parser(name='create', help='Create a Keycloak instance')
+        kc_create_parser = self.create_parser(kc_subparser, 'Create a Keycloak instance')
         kc_create_parser.set_defaults(cmd=self.kc_create)
         kc_create_parser.add_argument('-n', '--name',
                                       dest='name',
@@ -78,24 +78,15 @@ class Keycloak(Blueprint):
 
     # pylint: disable=unused-argument
     def kc_create(self, runtime, args: argparse.Namespace):
-        blueprint_instance = BlueprintInstance(name=args.name,
-                                               platform=self.runtime.platform,
-                                               blueprint=self)
-        self.runtime.instance_create(blueprint_instance)
-        runtime_secrets = self.runtime.secreta
-        if args.name not in runtime_secrets:
-            runtime_secrets[args.name] = {
-                'connection': 'http://localhost:8080',
-                'accounts': {
-                    'admin': self.environment.get('KEYCLOAK_PASSWORD')
-                }
+        runtime.platform.apply(self.create_blueprint(args), args.name)
+        runtime.secreta.add(args.name, {
+            'connection': 'http://localhost:8080',
+            'accounts': {
+                'admin': self.environment.get('KEYCLOAK_PASSWORD')
             }
-        else:
-            runtime_secrets[args.name]['connection'] = 'http://localhost:8080'
-            runtime_secrets[args.name]['admin'] = self.environment.get('KEYCLOAK_PASSWORD')
-        self.runtime.secreta = runtime_secrets
+        })
 
     # pylint: disable=unused-argument
     def kc_remove(self, runtime, args: argparse.Namespace):
-        blueprint_instance = self.runtime.instance_get(name=args.name, blueprint=self)
-        self.runtime.instance_remove(blueprint_instance)
+        blueprint_instance = runtime.instance_get(name=args.name, blueprint=self)
+        runtime.instance_remove(blueprint_instance)
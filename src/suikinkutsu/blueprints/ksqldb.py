@@ -23,7 +23,7 @@
 import argparse
 
 from suikinkutsu.models import PortBinding
-from .blueprint import Blueprint, BlueprintInstance
+from .blueprint import Blueprint
 
 
 class KSQLDB(Blueprint):
@@ -53,7 +53,7 @@ class KSQLDB(Blueprint):
     def cli_prepare(self, parser, subparsers):
         ksqldb_parser = subparsers.add_parser(name='ksqldb', help='KSQLDB Commands')
         ksqldb_subparser = ksqldb_parser.add_subparsers()
-        ksqldb_create_parser = ksqldb_subparser.add_parser(name='create', help='Create a KSQLDB instance')
+        ksqldb_create_parser = self.create_parser(ksqldb_subparser, 'Create a KSQLDB instance')
         ksqldb_create_parser.add_argument('-n', '--instance-name',
                                           dest='name',
                                           default='ksqldb',
@@ -70,20 +70,12 @@ class KSQLDB(Blueprint):
 
     # pylint: disable=unused-argument
     def ksqldb_create(self, runtime, args: argparse.Namespace):
-        blueprint_instance = BlueprintInstance(name=args.name,
-                                               platform=self.runtime.platform,
-                                               blueprint=self)
-        self.runtime.instance_create(blueprint_instance)
-        runtime_secrets = self.runtime.secreta
-        if args.name not in runtime_secrets:
-            runtime_secrets[args.name] = {
-                'connection': f'{args.name}:8088'
-            }
-        else:
-            runtime_secrets[args.name]['connection'] = f'{args.name}:8088'
-        self.runtime.secreta = runtime_secrets
+        runtime.platform.apply(self.create_blueprint(args), args.name)
+        runtime.secreta.add(args.name, {
+            'connection': f'{args.name}:8088'
+        })
 
     # pylint: disable=unused-argument
     def ksqldb_remove(self, runtime, args: argparse.Namespace):
-        blueprint_instance = self.runtime.instance_get(name=args.name, blueprint=self)
-        self.runtime.instance_remove(blueprint_instance)
+        blueprint_instance = runtime.instance_get(name=args.name, blueprint=self)
+        runtime.instance_remove(blueprint_instance)
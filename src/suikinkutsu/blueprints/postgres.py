@@ -21,14 +21,53 @@
 #  SOFTWARE.
 
 import argparse
+import os
+import typing
 import secrets as generator
 import psycopg2
+import psycopg2.extensions
 from psycopg2 import sql
 
-from suikinkutsu.models import PortBinding, VolumeBinding
+from suikinkutsu.models import PortBinding, VolumeBinding, Resources
 from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.constants import DEFAULT_STORE_MAX_CHUNK_SIZE, DEFAULT_READINESS_TIMEOUT
+from suikinkutsu.store import ChunkStore
+from suikinkutsu.pool import InstancePool
 from .blueprint import Blueprint
 
+if typing.TYPE_CHECKING:
+    from suikinkutsu.journal import Journal
+
+# Statements starting with these keywords are told apart by the next one, e.g. 'CREATE ROLE' and 'CREATE SCHEMA'
+DDL_KEYWORDS = {'CREATE', 'ALTER', 'DROP', 'GRANT', 'REVOKE'}
+
+
+class JournalledConnection(psycopg2.extensions.connection):
+    """
+    A connection timing its statements and commits in a journal
+    """
+
+    journal: 'Journal' = None
+
+    def commit(self):
+        with self.journal.span('postgresql', 'COMMIT') as span:
+            super().commit()
+            span['exit'] = 0
+
+
+class JournalledCursor(psycopg2.extensions.cursor):
+    """
+    A cursor timing its statements in the journal of its connection
+    """
+
+    def execute(self, query, vars=None):   # pylint: disable=redefined-builtin
+        text = query.as_string(self.connection) if isinstance(query, sql.Composable) else str(query)
+        words = text.split(None, 2)
+        operation = ' '.join(words[:2] if words and words[0].upper() in DDL_KEYWORDS else words[:1]).upper()
+        with self.connection.journal.span('postgresql', operation, len(vars or ())) as span:
+            super().execute(query, vars)
+            span['exit'] = 0
+
 
 class PostgreSQL(Blueprint):
     """
@@ -53,11 +92,15 @@ class PostgreSQL(Blueprint):
             PortBinding(container_port=5432, host_ip='127.0.0.1', host_port=5432, protocol='tcp')
         ]
         self._depends_on = []
+        # The default /dev/shm of 64MB is too small for parallel queries
+        self._resources = Resources(shm_size='256m')
+        self._readiness = ['/usr/local/bin/pg_isready', '-h', 'localhost', '-U', 'postgres']
+        self._template_ignored_environment = ['POSTGRES_PASSWORD']
 
     def cli_prepare(self, parser, subparsers):
         pg_parser = subparsers.add_parser(name='pg', help='PostgreSQL Commands')
         pg_subparser = pg_parser.add_subparsers()
-        pg_create_parser = pg_subparser.add_parser(name='create', help='Create a PostgreSQL instance')
+        pg_create_parser = self.create_parser(pg_subparser, 'Create a PostgreSQL instance')
         pg_create_parser.set_defaults(cmd=self.pg_create)
         pg_create_parser.add_argument('-n', '--instance-name',
                                       dest='name',
@@ -116,10 +159,7 @@ class PostgreSQL(Blueprint):
                                        dest='name',
                                        required=True,
                                        help='Instance name')
-        pg_dumpall_parser.add_argument('-o', '--dumpfile',
-                                       dest='dumpfile',
-                                       required=True,
-                                       help='File to dump output into')
+        self._dump_target(pg_dumpall_parser)
         pg_dumpall_parser.set_defaults(cmd=self.pg_dumpall)
 
         pg_dump_parser = pg_subparser.add_parser(name='dump', help='PostgreSQL dump')
@@ -127,10 +167,7 @@ class PostgreSQL(Blueprint):
                                     dest='name',
                                     required=True,
                                     help='Instance name')
-        pg_dump_parser.add_argument('-o', '--dumpfile',
-                                    dest='dumpfile',
-                                    required=True,
-                                    help='File to dump output into')
+        self._dump_target(pg_dump_parser)
         pg_dump_parser.add_argument('-d', '--database',
                                     dest='database',
                                     required=False,
@@ -146,18 +183,53 @@ class PostgreSQL(Blueprint):
                                        dest='name',
                                        required=True,
                                        help='Instance name')
-        pg_restore_parser.add_argument('-o', '--dumpfile',
+        pg_restore_source = pg_restore_parser.add_mutually_exclusive_group(required=True)
+        pg_restore_source.add_argument('-o', '--dumpfile',
                                        dest='dumpfile',
-                                       required=True,
                                        help='Dump file to restore from')
+        pg_restore_source.add_argument('-t', '--tag',
+                                       dest='tag',
+                                       help='Dump in the chunk store to restore from')
+        pg_restore_parser.add_argument('-d', '--database',
+                                       dest='database',
+                                       required=False,
+                                       help='Database to restore into')
         pg_restore_parser.set_defaults(cmd=self.pg_restore)
 
+    def adopt(self, platform: 'Platform', name: str) -> None:
+        """
+        The data was initialised with a different password, which is replaced with the one of this instance
+        """
+        if not platform.instance_wait(name, self.readiness, DEFAULT_READINESS_TIMEOUT):
+            raise MurkyWaterException(msg=f'Instance {name} did not become ready')
+        password = self.environment.get('POSTGRES_PASSWORD', '').replace("'", "''")
+        platform.execute(['container', 'exec', name, '/usr/local/bin/psql', '-U', 'postgres', '-q',
+                          '-c', f"ALTER ROLE postgres PASSWORD '{password}'"])
+
+    @staticmethod
+    def _dump_target(parser: argparse.ArgumentParser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('-o', '--dumpfile',
+                            dest='dumpfile',
+                            help='File to dump output into')
+        target.add_argument('-t', '--tag',
+                            dest='tag',
+                            help='Keep the dump in the deduplicated chunk store under this tag')
+
     def pg_create(self, runtime: 'Runtime', args: argparse.Namespace):
-        runtime.platform.apply(self)
+        blueprint = self.create_blueprint(args)
+        instance = InstancePool(runtime.config, runtime.platform).claim(blueprint, args.name)
+        if instance:
+            runtime.output.info(f'Claimed a pooled instance as {args.name}')
+        else:
+            instance = runtime.platform.apply(blueprint, args.name)
+        # Pooled instances publish on a free host port
+        port = next((binding.host_port for binding in instance.port_bindings
+                     if str(binding.container_port) == '5432'), 5432)
         runtime.secreta.add(
             args.name,
             {
-                'connection': f'postgresql://localhost:5432/{self.environment.get("POSTGRES_DB")}',
+                'connection': f'postgresql://localhost:{port}/{self.environment.get("POSTGRES_DB")}',
                 'roles': {
                     'postgres': self.environment.get('POSTGRES_PASSWORD')
                 }
@@ -201,38 +273,61 @@ class PostgreSQL(Blueprint):
         runtime.save()
 
     def pg_dumpall(self, runtime: 'Runtime', args: argparse.Namespace):
-        instance = runtime.instance_get(name=args.name, blueprint=self)
-        if not instance:
+        if not runtime.platform.instance_get(args.name):
             runtime.output.error(f'There is no instance called {args.name}')
             return
-        result = instance.platform.execute(['exec', args.name,
-                                            '/usr/local/bin/pg_dumpall', '-h', 'localhost', '-U', 'postgres'])
-        with open(args.dumpfile, 'wt+', encoding='UTF-8') as d:
-            d.write(result.stdout)
+        self._dump(runtime, args, ['exec', args.name,
+                                   '/usr/local/bin/pg_dumpall', '-h', 'localhost', '-U', 'postgres'])
 
     def pg_dump(self, runtime: 'Runtime', args: argparse.Namespace):
-        instance = runtime.instance_get(name=args.name, blueprint=self)
-        if not instance:
+        if not runtime.platform.instance_get(args.name):
             runtime.output.error(f'There is no instance called {args.name}')
             return
         cmd = ['exec', args.name, '/usr/local/bin/pg_dump', '-h', 'localhost', '-U', 'postgres', '-n', args.schema]
-        if hasattr(args, 'database'):
+        if args.database:
             cmd.extend(['-d', args.database])
-        result = instance.platform.execute(cmd)
-        with open(args.dumpfile, 'wt+', encoding='UTF-8') as d:
-            d.write(result.stdout)
+        self._dump(runtime, args, cmd)
 
     def pg_restore(self, runtime: 'Runtime', args: argparse.Namespace):
-        instance = runtime.instance_get(name=args.name, blueprint=self)
-        if not instance:
+        if not runtime.platform.instance_get(args.name):
             runtime.output.error(f'There is no instance called {args.name}')
             return
-        cmd = ['exec', args.name, '/usr/local/bin/pg_restore', '-h', 'localhost', '-U', 'postgres', '-n', args.schema]
-        if hasattr(args, 'database'):
+        # Dumps are plain SQL, which is restored by psql rather than pg_restore
+        cmd = ['exec', '-i', args.name, '/usr/local/bin/psql', '-h', 'localhost', '-U', 'postgres',
+               '-v', 'ON_ERROR_STOP=1', '-q']
+        if args.database:
             cmd.extend(['-d', args.database])
-        result = instance.platform.execute(cmd)
-        with open(args.dumpfile, 'wt+', encoding='UTF-8') as d:
-            d.write(result.stdout)
+        with runtime.output.progress(f'Restoring {args.name}') as progress:
+            if args.tag:
+                chunks = ChunkStore(runtime.config).get(f'pg/{args.name}/{args.tag}')
+                runtime.platform.write(cmd, progress.track(args.name, chunks, 'restoring'))
+            else:
+                progress.update(args.name, state='restoring')
+                with open(args.dumpfile, 'rb') as d:
+                    runtime.platform.redirect(cmd, stdin=d)
+                progress.update(args.name, completed=os.path.getsize(args.dumpfile))
+            progress.update(args.name, detail='restored')
+
+    @staticmethod
+    def _dump(runtime: 'Runtime', args: argparse.Namespace, cmd: typing.List[str]):
+        """
+        Dump into a file, which the platform writes directly, or into the chunk store, which only writes the chunks
+        that differ from earlier dumps
+        """
+        with runtime.output.progress(f'Dumping {args.name}') as progress:
+            if args.tag:
+                chunks = progress.track(args.name, runtime.platform.read(cmd, DEFAULT_STORE_MAX_CHUNK_SIZE), 'dumping')
+                index = ChunkStore(runtime.config).put(f'pg/{args.name}/{args.tag}',
+                                                       chunks,
+                                                       metadata={'command': cmd[2:]})
+                progress.update(args.name, detail=f'stored as {args.tag}, {index["stored"]} bytes written')
+            else:
+                progress.update(args.name, state='dumping')
+                with open(args.dumpfile, 'wb') as d:
+                    runtime.platform.redirect(cmd, stdout=d)
+                progress.update(args.name,
+                                completed=os.path.getsize(args.dumpfile),
+                                detail=f'written to {args.dumpfile}')
 
     def _pg_conn(self, runtime: 'Runtime', instance_name: str):
         """
@@ -253,6 +348,12 @@ class PostgreSQL(Blueprint):
         instance_password = instance_secrets.get('roles', {}).get('postgres')
         if instance_password is None:
             raise MurkyWaterException(msg='Missing postgres password for this instance in secrets')
-        return psycopg2.connect(instance_connection,
-                                user='postgres',
-                                password=instance_password)
+        with runtime.journal.span('postgresql', 'CONNECT') as span:
+            conn = psycopg2.connect(instance_connection,
+                                    user='postgres',
+                                    password=instance_password,
+                                    connection_factory=JournalledConnection)
+            span['exit'] = 0
+        conn.journal = runtime.journal
+        conn.cursor_factory = JournalledCursor
+        return conn
@@ -0,0 +1,81 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import argparse
+
+from suikinkutsu.models import Instance, VolumeBinding, PortBinding
+from .blueprint import Blueprint
+
+
+class Registry(Blueprint):
+    """
+    Pull-through registry mirror blueprint
+    """
+
+    name = 'registry'
+
+    def __init__(self):
+        super().__init__()
+        self._description = 'Pull-through cache for Docker Hub, shared by all image pulls while it is running'
+        self._image = 'registry'
+        self._version = '2'
+        self._volume_bindings = [
+            VolumeBinding(name='registry_datavol', mount_point='/var/lib/registry')
+        ]
+        self._environment = {
+            'REGISTRY_PROXY_REMOTEURL': 'https://registry-1.docker.io'
+        }
+        self._port_bindings = [
+            PortBinding(container_port=5000, host_ip='127.0.0.1', host_port=5000, protocol='tcp')
+        ]
+        self._depends_on = []
+
+    def cli_prepare(self, parser, subparsers):
+        registry_parser = subparsers.add_parser(name='registry', help='Registry Mirror Commands')
+        registry_subparser = registry_parser.add_subparsers()
+        registry_create_parser = self.create_parser(registry_subparser, 'Create a registry mirror')
+        registry_create_parser.add_argument('-n', '--instance-name',
+                                            dest='name',
+                                            default='registry',
+                                            required=False,
+                                            help='Instance name')
+        registry_create_parser.set_defaults(cmd=self.registry_create)
+
+        registry_remove_parser = registry_subparser.add_parser(name='remove', help='Remove a registry mirror')
+        registry_remove_parser.add_argument('-n', '--instance-name',
+                                            dest='name',
+                                            required=True,
+                                            help='Instance name')
+        registry_remove_parser.set_defaults(cmd=self.registry_remove)
+
+    def registry_create(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
+        runtime.platform.apply(self.create_blueprint(args), args.name)
+        runtime.secreta.add(args.name, {'connection': f'{self.port_bindings[0].host_ip}:'
+                                                      f'{self.port_bindings[0].host_port}'})
+        return 0
+
+    def registry_remove(self, runtime: 'Runtime', args: argparse.Namespace) -> int:
+        instance = Instance(instance_id=None, name=args.name, running=True)
+        instance.blueprint = self
+        instance.volume_bindings = self.volume_bindings
+        runtime.platform.instance_remove(instance)
+        return 0
@@ -23,7 +23,7 @@
 import argparse
 
 from suikinkutsu.models import PortBinding, VolumeBinding
-from .blueprint import Blueprint, BlueprintInstance
+from .blueprint import Blueprint
 
 
 class Zookeeper(Blueprint):
@@ -56,7 +56,7 @@ class Zookeeper(Blueprint):
     def cli_prepare(self, parser, subparsers):
         zk_parser = subparsers.add_parser(name='zk', help='Zookeeper Commands')
         zk_subparser = zk_parser.add_subparsers()
-        zk_create_parser = zk_subparser.add_parser(name='create', help='Create a Zookeeper instance')
+        zk_create_parser = self.create_parser(zk_subparser, 'Create a Zookeeper instance')
         zk_create_parser.set_defaults(cmd=self.zookeeper_create)
         zk_create_parser.add_argument('-n', '--instance-name',
                                       dest='name',
@@ -72,20 +72,12 @@ class Zookeeper(Blueprint):
 
     # pylint: disable=unused-argument
     def zookeeper_create(self, runtime, args: argparse.Namespace):
-        blueprint_instance = BlueprintInstance(name=args.name,
-                                               platform=runtime.platform,
-                                               blueprint=self)
-        self.runtime.instance_create(blueprint_instance)
-        runtime_secrets = self.runtime.secreta
-        if args.name not in runtime_secrets:
-            runtime_secrets[args.name] = {
-                'connection': f'{args.name}:{self.environment.get("ZOOKEEPER_CLIENT_PORT")}'
-            }
-        else:
-            runtime_secrets[args.name]['connection'] = f'{args.name}:{self.environment.get("ZOOKEEPER_CLIENT_PORT")}'
-        self.runtime.secreta = runtime_secrets
+        runtime.platform.apply(self.create_blueprint(args), args.name)
+        runtime.secreta.add(args.name, {
+            'connection': f'{args.name}:{self.environment.get("ZOOKEEPER_CLIENT_PORT")}'
+        })
 
     # pylint: disable=unused-argument
     def zookeeper_remove(self, runtime, args: argparse.Namespace):
-        blueprint_instance = self.runtime.instance_get(name=args.name, blueprint=self)
-        self.runtime.instance_remove(blueprint_instance)
+        blueprint_instance = runtime.instance_get(name=args.name, blueprint=self)
+        runtime.instance_remove(blueprint_instance)
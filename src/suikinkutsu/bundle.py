@@ -0,0 +1,117 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import typing
+import pathlib
+import json
+import re
+
+from suikinkutsu.constants import DEFAULT_BUNDLE_WORKERS, DEFAULT_BUNDLE_CHUNK_SIZE
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.chunking import compress, decompress
+
+
+class ImageBundle:
+    """
+    A compressed, chunked bundle of container images on disk.
+
+    Each image is exported as a tar archive which is split into chunks that are gzip-compressed independently, so
+    that both compression and decompression can run in parallel. Since gzip members can be concatenated, an image can
+    also be loaded by hand via 'cat <chunks> | gunzip | docker image load'.
+    """
+
+    manifest_name = 'manifest.json'
+
+    def __init__(self, path: pathlib.Path, workers: int = DEFAULT_BUNDLE_WORKERS):
+        self._path = path
+        self._workers = max(workers, 1)
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+
+    @property
+    def manifest(self) -> typing.Dict:
+        manifest_path = self._path / self.manifest_name
+        if not manifest_path.exists():
+            raise MurkyWaterException(msg=f'{self._path} is not an image bundle')
+        return json.loads(manifest_path.read_text(encoding='UTF-8'))
+
+    def save(self,
+             platform: 'Platform',
+             images: typing.List[str],
+             chunk_size: int = DEFAULT_BUNDLE_CHUNK_SIZE,
+             progress: typing.Optional[typing.Callable[[str, int], None]] = None) -> typing.Dict:
+        """
+        Export images from the platform into this bundle
+        Args:
+            platform: The platform to export the images from
+            images: The image references to export
+            chunk_size: The size of the uncompressed chunks in bytes
+            progress: Optional callback receiving the image and its uncompressed size once it is saved
+
+        Returns:
+            The manifest of the bundle
+        """
+        self._path.mkdir(parents=True, exist_ok=True)
+        manifest = {'images': []}
+        for image in images:
+            slug = re.sub(r'[^\w.-]', '_', image)
+            chunks = []
+            size = 0
+
+            def measured(chunk_iter: typing.Iterator[bytes]) -> typing.Iterator[bytes]:
+                nonlocal size
+                for chunk in chunk_iter:
+                    size += len(chunk)
+                    yield chunk
+
+            members = compress(measured(platform.image_save(image, chunk_size)), self._workers)
+            for index, member in enumerate(members):
+                chunk_name = f'{slug}.{index:05d}.gz'
+                (self._path / chunk_name).write_bytes(member)
+                chunks.append(chunk_name)
+            manifest['images'].append({'image': image, 'size': size, 'chunks': chunks})
+            if progress:
+                progress(image, size)
+        (self._path / self.manifest_name).write_text(json.dumps(manifest, indent=2), encoding='UTF-8')
+        return manifest
+
+    def load(self,
+             platform: 'Platform',
+             progress: typing.Optional[typing.Callable[[str, int], None]] = None) -> typing.Dict:
+        """
+        Import all images of this bundle into the platform
+        Args:
+            platform: The platform to import the images into
+            progress: Optional callback receiving the image and its uncompressed size once it is loaded
+
+        Returns:
+            The manifest of the bundle
+        """
+        manifest = self.manifest
+        for entry in manifest.get('images', []):
+            members = ((self._path / chunk_name).read_bytes() for chunk_name in entry.get('chunks', []))
+            platform.image_load(decompress(members, self._workers))
+            if progress:
+                progress(entry.get('image'), entry.get('size', 0))
+        return manifest
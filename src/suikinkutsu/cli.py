@@ -23,49 +23,297 @@
 import sys
 import os
 import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import pathlib
+import time
+import typing
 
 from suikinkutsu import __version__, MurkyWaterException
 from suikinkutsu.config import Configuration
+from suikinkutsu.constants import DEFAULT_SNAPSHOT_WORKERS, DEFAULT_POOL_SIZE, DEFAULT_POOL_IDLE_TIMEOUT, \
+    DEFAULT_POOL_INTERVAL, DEFAULT_TRACE_ENDPOINT, TRACE_OTLP_PORT, LABEL_BLUEPRINT, DEFAULT_COOK_WORKERS, \
+    DEFAULT_READINESS_TIMEOUT
 from suikinkutsu.secretsfile import SecretsFile
 from suikinkutsu.outputs import OutputEntry, Output
 from suikinkutsu.blueprints import Blueprint
 from suikinkutsu.platforms import Platform
+from suikinkutsu.models import Instance, Resources
 from suikinkutsu.project import Project
 from suikinkutsu.runtime import Runtime
+from suikinkutsu.snapshots import VolumeSnapshots
+from suikinkutsu.store import ChunkStore
+from suikinkutsu.pool import InstancePool
+from suikinkutsu.progress import Progress, PullProgress
+from suikinkutsu.profiling import Profiler, MemoryProfiler, install_memory_profiler
+from suikinkutsu import tracing
+from suikinkutsu.allocation import allocate_cores, parse_cpuset
+from suikinkutsu.schema import LayerSchema
 
 
 # pylint: disable=unused-argument
 def instance_list(runtime: Runtime, args: argparse.Namespace) -> int:
     runtime.output.print(OutputEntry(title='Instances',
                                      columns=['Id', 'Name', 'Platform', 'Blueprint', 'Running', 'Volumes'],
-                                     msg=[[
-                                            i.id,
+                                     msg=([
+                                            i.instance_id,
                                             i.name,
-                                            i.platform.name,
+                                            runtime.platform.name,
                                             i.blueprint.name if i.blueprint else 'Unknown',
                                             str(i.running),
                                             # TODO: This is no good in structured output
-                                            '\n'.join([vol.name for vol in i.volumes])]
-                                            for i in runtime.instances]))
+                                            '\n'.join([vol.name for vol in i.volume_bindings])]
+                                          for i in runtime.platform.instances_iter())))
     return 0
 
 
-def cook_up(runtime: Runtime, args: argparse.Namespace) -> int:
-    try:
-        for blueprint in runtime.recipe.blueprints:
-            blueprint.create(runtime, args)
-        return 0
-        # with open(args.recipe, 'r', encoding='UTF-8') as r:
-        #     raw_recipe = yaml.safe_load(r)
-        # parsed_recipe = suikinkutsu.models.RecipeSchema.parse_obj(raw_recipe)
-        # console.print(parsed_recipe)
-        # for name, blueprint_model in parsed_recipe.blueprints.items():
-        #     if blueprint_model.kind == 'postgres':
-        #         blueprint_model.merge_defaults(suikinkutsu.blueprints.postgres.PostgreSQL.defaults)
-        # console.print(parsed_recipe)
-    except Exception:
-        # console.print_exception()
+def instance_snapshot(runtime: Runtime, args: argparse.Namespace) -> int:
+    instance = runtime.platform.instance_get(args.name)
+    if not instance:
+        runtime.output.error(f'There is no instance called {args.name}')
+        return 1
+    snapshots = VolumeSnapshots(runtime.config, workers=args.snapshot_workers)
+    snapshot_name = args.snapshot or datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    start = time.monotonic()
+    with runtime.output.progress(f'Taking snapshot {snapshot_name} of {args.name}') as progress:
+        for vol in instance.volume_bindings:
+            progress.update(vol.name, state='saving')
+        snapshots.create(runtime.platform,
+                         instance,
+                         snapshot_name,
+                         snapshot_format=args.snapshot_format,
+                         stop=not args.live,
+                         progress=lambda volume, size: progress.update(volume, completed=size, detail='saved'))
+    runtime.output.info(f'Snapshot {snapshot_name} of {args.name} taken in {time.monotonic() - start:.2f}s')
+    return 0
+
+
+def instance_restore(runtime: Runtime, args: argparse.Namespace) -> int:
+    instance = runtime.platform.instance_get(args.name)
+    if not instance:
+        runtime.output.error(f'There is no instance called {args.name}')
         return 1
+    snapshots = VolumeSnapshots(runtime.config, workers=args.snapshot_workers)
+    start = time.monotonic()
+    with runtime.output.progress(f'Restoring snapshot {args.snapshot} of {args.name}') as progress:
+        for vol in instance.volume_bindings:
+            progress.update(vol.name, state='restoring')
+        snapshots.restore(runtime.platform,
+                          instance,
+                          args.snapshot,
+                          progress=lambda volume, size: progress.update(volume, completed=size, detail='restored'))
+    runtime.output.info(f'Snapshot {args.snapshot} of {args.name} restored in {time.monotonic() - start:.2f}s')
+    return 0
+
+
+def instance_snapshots(runtime: Runtime, args: argparse.Namespace) -> int:
+    snapshots = VolumeSnapshots(runtime.config)
+    runtime.output.print(OutputEntry(title='Snapshots',
+                                     columns=['Instance', 'Snapshot', 'Created', 'Volumes'],
+                                     msg=[[
+                                         manifest.get('instance'),
+                                         manifest.get('snapshot'),
+                                         manifest.get('created'),
+                                         ', '.join([vol.get('name') for vol in manifest.get('volumes', [])])]
+                                         for manifest in snapshots.list(args.name)]))
+    return 0
+
+
+def instance_snapshot_remove(runtime: Runtime, args: argparse.Namespace) -> int:
+    VolumeSnapshots(runtime.config).remove(args.name, args.snapshot)
+    runtime.output.info(f'Removed snapshot {args.snapshot} of {args.name}')
+    return 0
+
+
+def store_list(runtime: Runtime, args: argparse.Namespace) -> int:
+    runtime.output.print(OutputEntry(title='Chunk Store',
+                                     columns=['Key', 'Created', 'Size', 'Chunks', 'Written'],
+                                     msg=[[
+                                         index.get('key'),
+                                         index.get('created'),
+                                         str(index.get('size')),
+                                         str(len(index.get('chunks', []))),
+                                         str(index.get('stored'))]
+                                         for index in ChunkStore(runtime.config).list(args.key)]))
+    return 0
+
+
+def store_remove(runtime: Runtime, args: argparse.Namespace) -> int:
+    removed = ChunkStore(runtime.config).remove(args.key)
+    runtime.output.info(f'Removed {removed} entries, run "store gc" to free their chunks')
+    return 0
+
+
+# pylint: disable=unused-argument
+def store_gc(runtime: Runtime, args: argparse.Namespace) -> int:
+    removed, freed = ChunkStore(runtime.config).gc()
+    runtime.output.info(f'Removed {removed} chunks, freeing {freed} bytes')
+    return 0
+
+
+def stats(runtime: Runtime, args: argparse.Namespace) -> int:
+    runtime.output.print(OutputEntry(title=f'Timing of operations in {runtime.journal.path}',
+                                     columns=['Platform', 'Operation', 'Count', 'Failures',
+                                              'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Total (s)'],
+                                     msg=[[
+                                         stat['platform'],
+                                         stat['operation'],
+                                         str(stat['count']),
+                                         str(stat['failures']),
+                                         f'{stat["p50"] * 1000:.1f}',
+                                         f'{stat["p95"] * 1000:.1f}',
+                                         f'{stat["p99"] * 1000:.1f}',
+                                         f'{stat["total"]:.2f}']
+                                         for stat in runtime.journal.stats()
+                                         if args.platform is None or stat['platform'] == args.platform]))
+    return 0
+
+
+def pool_fill(runtime: Runtime, args: argparse.Namespace) -> int:
+    blueprint = Blueprint.resolve(runtime, args.blueprint)
+    started = InstancePool(runtime.config, runtime.platform).fill(blueprint, args.size, args.blueprint)
+    runtime.output.info(f'Started {len(started)} pool members for {args.blueprint}')
+    return 0
+
+
+def pool_serve(runtime: Runtime, args: argparse.Namespace) -> int:
+    blueprint = Blueprint.resolve(runtime, args.blueprint)
+    try:
+        InstancePool(runtime.config, runtime.platform).serve(blueprint,
+                                                             size=args.size or DEFAULT_POOL_SIZE,
+                                                             entry=args.blueprint,
+                                                             idle_timeout=args.idle_timeout,
+                                                             interval=args.interval,
+                                                             progress=runtime.output.info)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+# pylint: disable=unused-argument
+def pool_status(runtime: Runtime, args: argparse.Namespace) -> int:
+    pool = InstancePool(runtime.config, runtime.platform)
+    runtime.output.print(OutputEntry(title='Pools',
+                                     columns=['Pool', 'Entry', 'Members', 'Size', 'Last Used'],
+                                     msg=[[
+                                         key,
+                                         state.get('entry'),
+                                         str(len(pool.members(key))),
+                                         str(state.get('size')),
+                                         datetime.datetime.fromtimestamp(state.get('last_used', 0))
+                                             .isoformat(timespec='seconds')]
+                                         for key, state in pool.state.items()]))
+    return 0
+
+
+def pool_drain(runtime: Runtime, args: argparse.Namespace) -> int:
+    blueprint = Blueprint.resolve(runtime, args.blueprint)
+    drained = InstancePool(runtime.config, runtime.platform).drain(InstancePool.key(blueprint))
+    runtime.output.info(f'Removed {drained} pool members for {args.blueprint}')
+    return 0
+
+
+def cook_up(runtime: Runtime, args: argparse.Namespace) -> int:
+    """
+    Start the instances of the recipe, each as soon as the instances it depends on are ready. Independent instances
+    are started concurrently
+    """
+    pool = InstancePool(runtime.config, runtime.platform)
+    if args.environment or args.labels:
+        runtime.recipe.override(LayerSchema(environment=dict(args.environment) or None,
+                                            labels=dict(args.labels) or None))
+    if args.allocate_cores:
+        allocate(runtime, args.reserve_cores)
+    pending = dict(runtime.recipe.ordered())
+    ready = set()
+    failed = {}
+    spans = {}
+    running = {}
+    with runtime.output.progress('Cooking up') as progress, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=max(args.cook_workers, 1)) as executor:
+        while pending or running:
+            for name, blueprint in list(pending.items()):
+                # Dependencies on instances outside of the recipe are assumed to exist already
+                dependencies = [dependency for dependency in blueprint.depends_on
+                                if dependency in runtime.recipe.blueprints]
+                broken = [dependency for dependency in dependencies if dependency in failed]
+                waiting = [dependency for dependency in dependencies if dependency not in ready]
+                if broken:
+                    del pending[name]
+                    failed[name] = f'{", ".join(broken)} failed'
+                    progress.update(name, state='skipped', detail=failed[name])
+                elif not waiting:
+                    del pending[name]
+                    running[executor.submit(cook_instance, runtime, pool, progress, spans, name, blueprint)] = name
+                else:
+                    progress.update(name, state='blocked', detail=f'waiting for {", ".join(waiting)}')
+            if not running:
+                break
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    ready.add(name)
+                except MurkyWaterException as mwe:
+                    failed[name] = mwe.msg
+                    progress.update(name, state='failed', detail=mwe.msg)
+    for name, reason in failed.items():
+        runtime.output.error(f'Failed to start {name}: {reason}')
+    return 1 if len(failed) > 0 else 0
+
+
+def cook_instance(runtime: Runtime,
+                  pool: InstancePool,
+                  progress: Progress,
+                  spans: typing.Dict[str, typing.Any],
+                  name: str,
+                  blueprint: Blueprint):
+    """
+    Start a single instance of the recipe, by claiming it from the pool or creating it, and wait until it is ready
+    Raises:
+        MurkyWaterException when the instance cannot be started or does not become ready
+    """
+    # Traced as a child of the first dependency, linked to the others
+    dependencies = [spans[dependency] for dependency in blueprint.depends_on if spans.get(dependency)]
+    with tracing.span(f'up {name}', {'instance': name, 'blueprint': blueprint.name},
+                      parent=dependencies[0] if dependencies else None, links=dependencies[1:]) as span:
+        spans[name] = span
+        progress.update(name, state='claiming')
+        instance = pool.claim(blueprint, name)
+        if instance:
+            published = ', '.join(f'{binding.host_ip}:{binding.host_port}->{binding.container_port}'
+                                  for binding in instance.port_bindings)
+            progress.update(name, state='ready', detail=f'claimed from the pool, published on {published}'
+                            if published else 'claimed from the pool')
+            return
+        reference = runtime.platform.image_reference(f'{blueprint.image}:{blueprint.version}')
+        if reference not in runtime.platform.images_present([reference]):
+            progress.update(name, state='pulling', detail=reference)
+            pull = PullProgress()
+            try:
+                for line in runtime.platform.image_pull(reference):
+                    progress.update(name, **pull.feed(line))
+            except MurkyWaterException as mwe:
+                # Platforms which cannot pull separately pull when creating the instance
+                progress.update(name, detail=f'not pulled separately: {mwe.msg}')
+        progress.update(name, state='creating')
+        runtime.platform.apply(blueprint, name)
+        if blueprint.readiness:
+            progress.update(name, state='waiting-ready')
+            if not runtime.platform.instance_wait(name, blueprint.readiness, DEFAULT_READINESS_TIMEOUT):
+                raise MurkyWaterException(msg=f'{name} did not become ready within {DEFAULT_READINESS_TIMEOUT}s')
+        progress.update(name, state='ready')
+
+
+# pylint: disable=unused-argument
+def cook_lock(runtime: Runtime, args: argparse.Namespace) -> int:
+    lockfile = runtime.recipe.lock(runtime.platform, update=args.update)
+    runtime.output.print(OutputEntry(title='Locked Images',
+                                     columns=['Image', 'Digest'],
+                                     msg=[[image, digest] for image, digest in lockfile.images.items()]))
+    return 0
 
 
 # pylint: disable=unused-argument
@@ -73,19 +321,150 @@ def cook_show(runtime: Runtime, args: argparse.Namespace) -> int:
     try:
         runtime.output.cook_show(runtime)
         return 0
-    except Exception:
-        # console.print_exception()
+    except MurkyWaterException as mwe:
+        runtime.output.error(f'Failed to show the recipe: {mwe.msg}')
         return 1
 
 
+def key_value(spec: str) -> typing.Tuple[str, str]:
+    """
+    Parse a KEY=VALUE command line argument
+    """
+    key, separator, value = spec.partition('=')
+    if not key or not separator:
+        raise argparse.ArgumentTypeError(f'{spec} is not of the form KEY=VALUE')
+    return key, value
+
+
+def allocate(runtime: Runtime, reserved: int):
+    """
+    Pin the instances of the recipe to separate blocks of cores in proportion to their CPU quota. Instances which are
+    pinned by the recipe keep their cores, which are not allocated to others
+    """
+    blueprints = runtime.recipe.ordered()
+    pinned = {core for _, blueprint in blueprints if blueprint.resources.cpuset
+              for core in parse_cpuset(blueprint.resources.cpuset)}
+    cores = [core for core in range(reserved, runtime.platform.cpu_count()) if core not in pinned]
+    demands = {name: blueprint.resources.cpus or 1.0
+               for name, blueprint in blueprints if not blueprint.resources.cpuset}
+    if len(demands) == 0:
+        return
+    allocation = allocate_cores(demands, cores)
+    for name, blueprint in blueprints:
+        if name in allocation:
+            blueprint.resources = blueprint.resources.merged(Resources(cpuset=allocation[name]))
+            runtime.output.info(f'Pinning {name} to cores {allocation[name]}')
+
+
 def cook_down(runtime: Runtime, args: argparse.Namespace) -> int:
+    failed = 0
+    spans = {}
+    ordered = runtime.recipe.ordered()
+    with runtime.output.progress('Cooking down') as progress:
+        for name, _ in ordered:
+            progress.update(name, state='pending')
+        for name, blueprint in reversed(ordered):
+            # Traced as a child of the first instance depending on it, which is removed before
+            dependents = [spans[dependent] for dependent, other in ordered
+                          if name in other.depends_on and spans.get(dependent)]
+            with tracing.span(f'down {name}', {'instance': name, 'blueprint': blueprint.name},
+                              parent=dependents[0] if dependents else None, links=dependents[1:]) as span:
+                spans[name] = span
+                progress.update(name, state='removing')
+                # Claimed pool members have volumes of their own, which only the platform knows about
+                instance = runtime.platform.instance_get(name)
+                if not instance:
+                    instance = Instance(instance_id=None,
+                                        name=name,
+                                        running=True,
+                                        blueprint=blueprint,
+                                        volume_bindings=blueprint.volume_bindings)
+                try:
+                    runtime.platform.instance_remove(instance)
+                    progress.update(name, state='removed')
+                except MurkyWaterException as mwe:
+                    progress.update(name, state='failed', detail=mwe.msg)
+                    runtime.output.error(f'Failed to remove {name}: {mwe.msg}')
+                    failed += 1
+    return 1 if failed > 0 else 0
+
+
+def trace_export(runtime: Runtime, destination: typing.Optional[str]):
+    """
+    Export the trace of this invocation to an OTLP/HTTP endpoint or append it to a file. Without a destination, the
+    trace is sent to a running Jaeger instance or, failing that, to the default OTLP/HTTP endpoint on this host
+    """
+    tracer = tracing.tracer()
+    if destination and not destination.startswith(('http://', 'https://')):
+        tracer.write(pathlib.Path(destination))
+        runtime.output.info(f'Wrote trace {tracer.trace_id} to {destination}')
+        return
+    endpoint = destination or jaeger_endpoint(runtime) or DEFAULT_TRACE_ENDPOINT
     try:
-        for blueprint in runtime.recipe.blueprints:
-            blueprint.remove(runtime, args)
-        return 0
-    except Exception:
-        # console.print_exception()
-        return 1
+        tracer.send(endpoint)
+        runtime.output.info(f'Sent trace {tracer.trace_id} to {endpoint}')
+    except OSError as oe:
+        runtime.output.warning(f'Unable to send trace {tracer.trace_id} to {endpoint}: {oe}')
+
+
+def jaeger_endpoint(runtime: Runtime) -> typing.Optional[str]:
+    """
+    The OTLP/HTTP endpoint of a running Jaeger instance, or None if there is none or the platform cannot tell
+    """
+    platform = runtime.platform
+    if platform is None or not platform.available:
+        return None
+    endpoint = None
+    try:
+        for name in platform.instances_labelled(LABEL_BLUEPRINT, 'Jaeger'):
+            instance = platform.instance_get(name)
+            for binding in instance.port_bindings if instance and instance.running else []:
+                if int(binding.container_port) == TRACE_OTLP_PORT and binding.host_port:
+                    host = 'localhost' if binding.host_ip in ('', '0.0.0.0') else binding.host_ip
+                    endpoint = f'http://{host}:{binding.host_port}/v1/traces'
+    except MurkyWaterException:
+        # The trace still goes to the default endpoint, the command it traces must not fail because of it
+        return None
+    return endpoint
+
+
+def memory_report(runtime: Runtime, memory: MemoryProfiler):
+    install_memory_profiler(None)
+    runtime.output.print(OutputEntry(title='Memory',
+                                     columns=['Section', 'Calls', 'Retained (KiB)', 'Peak (KiB)'],
+                                     msg=[[
+                                         name,
+                                         str(section['calls']),
+                                         f'{section["retained"] / 1024:.1f}',
+                                         f'{section["peak"] / 1024:.1f}']
+                                         for name, section in memory.sections.items()]))
+    runtime.output.print(OutputEntry(title='Top Allocation Sites',
+                                     columns=['Section', 'Site', 'Retained (KiB)', 'Blocks'],
+                                     msg=[[name, site, f'{size / 1024:.1f}', str(blocks)]
+                                          for name in memory.sections
+                                          for site, size, blocks in memory.top_sites(name)]))
+
+
+def run(config: Configuration, runtime: Runtime, args: argparse.Namespace) -> int:
+    """
+    Run the command, profiled, traced and with its memory traced as requested
+    """
+    with contextlib.ExitStack() as stack:
+        if args.trace or args.trace_to:
+            tracing.install(tracing.Tracer())
+            stack.callback(tracing.install, None)
+            stack.callback(trace_export, runtime, args.trace_to)
+        if args.memory:
+            memory = stack.enter_context(MemoryProfiler())
+            install_memory_profiler(memory)
+            stack.callback(memory_report, runtime, memory)
+        stack.enter_context(tracing.span(args.cmd.__name__.replace('_', ' ')))
+        if args.profile:
+            profiler = Profiler(config, args.cmd.__name__)
+            stack.callback(runtime.output.info, f'Wrote the profile to {profiler.pstats_path} and the sampled stacks '
+                                                f'to {profiler.stacks_path}')
+            stack.enter_context(profiler)
+        return args.cmd(runtime, args)
 
 
 def main() -> int:
@@ -102,6 +481,139 @@ def main() -> int:
     instance_subparser = instance_parser.add_subparsers()
     instance_list_parser = instance_subparser.add_parser('list', help='List instances')
     instance_list_parser.set_defaults(cmd=instance_list)
+    instance_snapshot_parser = instance_subparser.add_parser('snapshot', help='Snapshot the volumes of an instance')
+    instance_snapshot_parser.add_argument('-n', '--instance-name',
+                                          dest='name',
+                                          required=True,
+                                          help='Instance name')
+    instance_snapshot_parser.add_argument('-s', '--snapshot',
+                                          dest='snapshot',
+                                          required=False,
+                                          help='Snapshot name, defaults to the current time')
+    instance_snapshot_parser.add_argument('-f', '--format',
+                                          dest='snapshot_format',
+                                          choices=VolumeSnapshots.formats,
+                                          default='store',
+                                          required=False,
+                                          help='Deduplicate into the chunk store, write compressed tarballs or write '
+                                               'uncompressed tarballs directly from the platform')
+    instance_snapshot_parser.add_argument('--live',
+                                          dest='live',
+                                          action='store_true',
+                                          default=False,
+                                          required=False,
+                                          help='Do not stop the instance while its volumes are snapshotted')
+    instance_snapshot_parser.add_argument('-w', '--workers',
+                                          dest='snapshot_workers',
+                                          type=int,
+                                          default=DEFAULT_SNAPSHOT_WORKERS,
+                                          required=False,
+                                          help='Number of chunks to compress concurrently')
+    instance_snapshot_parser.set_defaults(cmd=instance_snapshot)
+    instance_restore_parser = instance_subparser.add_parser('restore',
+                                                            help='Restore the volumes of an instance from a snapshot')
+    instance_restore_parser.add_argument('-n', '--instance-name',
+                                         dest='name',
+                                         required=True,
+                                         help='Instance name')
+    instance_restore_parser.add_argument('-s', '--snapshot',
+                                         dest='snapshot',
+                                         required=True,
+                                         help='Snapshot name')
+    instance_restore_parser.add_argument('-w', '--workers',
+                                         dest='snapshot_workers',
+                                         type=int,
+                                         default=DEFAULT_SNAPSHOT_WORKERS,
+                                         required=False,
+                                         help='Number of chunks to decompress concurrently')
+    instance_restore_parser.set_defaults(cmd=instance_restore)
+    instance_snapshots_parser = instance_subparser.add_parser('snapshots', help='List snapshots')
+    instance_snapshots_parser.add_argument('-n', '--instance-name',
+                                           dest='name',
+                                           required=False,
+                                           help='Only list the snapshots of this instance')
+    instance_snapshots_parser.set_defaults(cmd=instance_snapshots)
+    instance_snapshot_remove_parser = instance_subparser.add_parser('snapshot-remove', help='Remove a snapshot')
+    instance_snapshot_remove_parser.add_argument('-n', '--instance-name',
+                                                 dest='name',
+                                                 required=True,
+                                                 help='Instance name')
+    instance_snapshot_remove_parser.add_argument('-s', '--snapshot',
+                                                 dest='snapshot',
+                                                 required=True,
+                                                 help='Snapshot name')
+    instance_snapshot_remove_parser.set_defaults(cmd=instance_snapshot_remove)
+
+    store_parser = subparsers.add_parser(name='store', help='Chunk Store Commands')
+    store_subparser = store_parser.add_subparsers()
+    store_list_parser = store_subparser.add_parser('list', help='List the entries of the chunk store')
+    store_list_parser.add_argument('-k', '--key',
+                                   dest='key',
+                                   required=False,
+                                   help='Only list entries below this key')
+    store_list_parser.set_defaults(cmd=store_list)
+    store_remove_parser = store_subparser.add_parser('remove', help='Remove an entry, or all entries below a key')
+    store_remove_parser.add_argument('-k', '--key',
+                                     dest='key',
+                                     required=True,
+                                     help='The key to remove')
+    store_remove_parser.set_defaults(cmd=store_remove)
+    store_gc_parser = store_subparser.add_parser('gc', help='Remove chunks which are no longer referenced')
+    store_gc_parser.set_defaults(cmd=store_gc)
+
+    stats_parser = subparsers.add_parser(name='stats',
+                                         help='Show percentiles of the wall time of platform and database operations')
+    stats_parser.add_argument('--of',
+                              dest='platform',
+                              required=False,
+                              help='Only show the operations of this platform or database, e.g. docker or postgresql')
+    stats_parser.set_defaults(cmd=stats)
+
+    pool_parser = subparsers.add_parser(name='pool', help='Warm Pool Commands')
+    pool_subparser = pool_parser.add_subparsers()
+    pool_fill_parser = pool_subparser.add_parser('fill', help='Start ready instances until the pool is full')
+    pool_fill_parser.add_argument('-b', '--blueprint',
+                                  dest='blueprint',
+                                  required=True,
+                                  help='Blueprint name, or the name of an entry in the recipe')
+    pool_fill_parser.add_argument('-s', '--size',
+                                  dest='size',
+                                  type=int,
+                                  required=False,
+                                  help=f'Pool size, defaults to the previous size or {DEFAULT_POOL_SIZE}')
+    pool_fill_parser.set_defaults(cmd=pool_fill)
+    pool_serve_parser = pool_subparser.add_parser('serve', help='Keep the pool full until interrupted')
+    pool_serve_parser.add_argument('-b', '--blueprint',
+                                   dest='blueprint',
+                                   required=True,
+                                   help='Blueprint name, or the name of an entry in the recipe')
+    pool_serve_parser.add_argument('-s', '--size',
+                                   dest='size',
+                                   type=int,
+                                   default=DEFAULT_POOL_SIZE,
+                                   required=False,
+                                   help='Pool size')
+    pool_serve_parser.add_argument('--idle-timeout',
+                                   dest='idle_timeout',
+                                   type=int,
+                                   default=DEFAULT_POOL_IDLE_TIMEOUT,
+                                   required=False,
+                                   help='Seconds without claims after which the pool is drained')
+    pool_serve_parser.add_argument('--interval',
+                                   dest='interval',
+                                   type=int,
+                                   default=DEFAULT_POOL_INTERVAL,
+                                   required=False,
+                                   help='Seconds between checks of the pool')
+    pool_serve_parser.set_defaults(cmd=pool_serve)
+    pool_status_parser = pool_subparser.add_parser('status', help='Show the pools')
+    pool_status_parser.set_defaults(cmd=pool_status)
+    pool_drain_parser = pool_subparser.add_parser('drain', help='Remove all members of a pool and forget it')
+    pool_drain_parser.add_argument('-b', '--blueprint',
+                                   dest='blueprint',
+                                   required=True,
+                                   help='Blueprint name, or the name of an entry in the recipe')
+    pool_drain_parser.set_defaults(cmd=pool_drain)
 
     cook_parser = subparsers.add_parser(name='cook', help='Cook environments')
     cook_parser.add_argument('-r', '--recipe',
@@ -111,11 +623,53 @@ def main() -> int:
                              help='The recipe to instantiate')
     cook_subparser = cook_parser.add_subparsers()
     cook_up_parser = cook_subparser.add_parser(name='up', help='Start an environment')
+    cook_up_parser.add_argument('--allocate-cores',
+                                dest='allocate_cores',
+                                action='store_true',
+                                default=False,
+                                required=False,
+                                help='Pin instances to separate cores, in proportion to their CPU quota')
+    cook_up_parser.add_argument('--reserve-cores',
+                                dest='reserve_cores',
+                                type=int,
+                                default=0,
+                                required=False,
+                                help='Number of leading cores to keep free when allocating cores, e.g. for a benchmark')
+    cook_up_parser.add_argument('-w', '--workers',
+                                dest='cook_workers',
+                                type=int,
+                                default=DEFAULT_COOK_WORKERS,
+                                required=False,
+                                help='Number of instances to start concurrently, once their dependencies are ready')
+    cook_up_parser.add_argument('-e', '--env',
+                                dest='environment',
+                                metavar='KEY=VALUE',
+                                type=key_value,
+                                action='append',
+                                default=[],
+                                required=False,
+                                help='Set an environment variable of every instance, overriding the recipe')
+    cook_up_parser.add_argument('-l', '--label',
+                                dest='labels',
+                                metavar='KEY=VALUE',
+                                type=key_value,
+                                action='append',
+                                default=[],
+                                required=False,
+                                help='Add a label to every instance, overriding the recipe')
     cook_up_parser.set_defaults(cmd=cook_up)
     cook_show_parser = cook_subparser.add_parser(name='show', help='Show the environment')
     cook_show_parser.set_defaults(cmd=cook_show)
     cook_down_parser = cook_subparser.add_parser('down', help='Stop a running environment')
     cook_down_parser.set_defaults(cmd=cook_down)
+    cook_lock_parser = cook_subparser.add_parser('lock', help='Lock the recipe images to their content digests')
+    cook_lock_parser.add_argument('-u', '--update',
+                                  dest='update',
+                                  action='store_true',
+                                  default=False,
+                                  required=False,
+                                  help='Pull and re-resolve images which are already locked')
+    cook_lock_parser.set_defaults(cmd=cook_lock)
 
     runtime = None
     try:
@@ -150,7 +704,7 @@ def main() -> int:
 
         # Execute the desired command
         if hasattr(args, 'cmd'):
-            return args.cmd(runtime, args)
+            return run(config, runtime, args)
         else:
             parser.print_help()
         return 0
@@ -33,6 +33,18 @@ from suikinkutsu.behaviours import CommandLineAware
 from suikinkutsu.outputs import OutputEntry
 
 
+def env_flag(name: str) -> bool:
+    """
+    Determine whether a flag is switched on by an environment variable
+    Args:
+        name: The name of the environment variable
+
+    Returns:
+        True if the variable is set to one of ENV_FLAG_VALUES, False if it is unset or set to anything else
+    """
+    return os.environ.get(name, '').strip().lower() in suikinkutsu.constants.ENV_FLAG_VALUES
+
+
 class WaterConfiguration(pydantic.BaseModel):
     config_dir: str = pydantic.Field(description='Directory into which suikinkutsu generates configuration files',
                                      default=None)
@@ -218,6 +230,33 @@ class Configuration(CommandLineAware):
                             #choices=[name for name in self.platforms.keys()],
                             required=False,
                             help='Override the default platform for this invocation')
+        parser.add_argument('--profile',
+                            dest=suikinkutsu.constants.CLI_PROFILE,
+                            action='store_true',
+                            default=False,
+                            required=False,
+                            help='Profile this invocation, writing a .pstats file and collapsed stacks for flamegraph '
+                                 'tools into the profiles directory of the configuration directory')
+        parser.add_argument('--memory',
+                            dest=suikinkutsu.constants.CLI_MEMORY,
+                            action='store_true',
+                            default=env_flag(suikinkutsu.constants.ENV_MEMORY),
+                            required=False,
+                            help='Trace memory allocations while listing instances, loading the recipe and rendering '
+                                 'output, then report the peak and the top allocation sites')
+        parser.add_argument('--trace',
+                            dest=suikinkutsu.constants.CLI_TRACE,
+                            action='store_true',
+                            default=False,
+                            required=False,
+                            help='Trace this invocation and send it to a running Jaeger instance, or to the default '
+                                 'OTLP/HTTP endpoint on this host')
+        parser.add_argument('--trace-to',
+                            dest=suikinkutsu.constants.CLI_TRACE_TO,
+                            default=None,
+                            required=False,
+                            help='Trace this invocation and send it to an OTLP/HTTP endpoint (e.g. '
+                                 'http://localhost:4318/v1/traces) or append it to a file')
 
         config_parser = subparsers.add_parser(name='config', help='Configuration Commands')
         config_subparser = config_parser.add_subparsers()
@@ -38,6 +38,22 @@ DEFAULT_PLATFORM = 'docker'
 ENV_PLATFORM = 'WATER_PLATFORM'
 CLI_PLATFORM = 'override_platform'
 
+CLI_PROFILE = 'profile'
+DEFAULT_PROFILE_INTERVAL = 0.001
+CLI_MEMORY = 'memory'
+ENV_MEMORY = 'WATER_MEMORY'
+# Values of environment variables which switch a flag on, compared case-insensitively
+ENV_FLAG_VALUES = ('1', 'true', 'yes')
+DEFAULT_MEMORY_TOP = 10
+DEFAULT_JOURNAL_MAX_SIZE = 4 * 1024 * 1024
+DEFAULT_JOURNAL_BACKUPS = 3
+CLI_TRACE = 'trace'
+CLI_TRACE_TO = 'trace_to'
+TRACE_SERVICE_NAME = 'suikinkutsu'
+TRACE_OTLP_PORT = 4318
+DEFAULT_TRACE_ENDPOINT = f'http://localhost:{TRACE_OTLP_PORT}/v1/traces'
+DEFAULT_TRACE_TIMEOUT = 5
+
 DEFAULT_RECIPE_FILE = os.path.join(os.path.abspath(os.path.curdir), 'Recipe')
 ENV_RECIPE_FILE = 'WATER_RECIPE'
 CLI_RECIPE_FILE = 'override_recipe_file'
@@ -45,5 +61,36 @@ CLI_RECIPE_FILE = 'override_recipe_file'
 ENV_SECRETS_FILE = 'WATER_SECRETS_FILE'
 CLI_SECRETS_FILE = 'override_secrets_file'
 
+DEFAULT_PULL_WORKERS = 4
+# Every worker holds an uncompressed chunk in memory, so memory must not grow with the number of cores
+DEFAULT_BUNDLE_WORKERS = min(os.cpu_count() or 4, 4)
+DEFAULT_BUNDLE_CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_SNAPSHOT_WORKERS = os.cpu_count() or 4
+DEFAULT_SNAPSHOT_CHUNK_SIZE = 16 * 1024 * 1024
+DEFAULT_STORE_WORKERS = os.cpu_count() or 4
+DEFAULT_STORE_MIN_CHUNK_SIZE = 256 * 1024
+DEFAULT_STORE_AVG_CHUNK_SIZE = 1024 * 1024
+DEFAULT_STORE_MAX_CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_INSPECT_CHUNK_SIZE = 64 * 1024
+
+HELPER_IMAGE = 'debian:bookworm-slim'
+DEFAULT_EPHEMERAL_SIZE = '1g'
+MAX_PORT = 65535
+TEMPLATE_PREFIX = 'sk-template'
+DEFAULT_READINESS_TIMEOUT = 120
+DEFAULT_COOK_WORKERS = 4
+DEFAULT_PROGRESS_INTERVAL = 2.0
+POOL_PREFIX = 'sk-pool'
+DEFAULT_POOL_SIZE = 2
+DEFAULT_POOL_IDLE_TIMEOUT = 15 * 60
+DEFAULT_POOL_INTERVAL = 5
+ENV_FAKE_LATENCY = 'WATER_FAKE_LATENCY'
+ENV_FAKE_FAILURE_RATE = 'WATER_FAKE_FAILURE_RATE'
+ENV_FAKE_SEED = 'WATER_FAKE_SEED'
+DEFAULT_FAKE_SEED = 0
+FAKE_PORT_RANGE_START = 32768
+
 LABEL_BLUEPRINT: str = 'org.mrmat.suikinkutsu.blueprint'
 LABEL_CREATED_BY: str = 'org.mrmat.created-by'
+LABEL_TEMPLATE: str = 'org.mrmat.suikinkutsu.template'
+LABEL_POOL: str = 'org.mrmat.suikinkutsu.pool'
@@ -26,6 +26,7 @@ from typing import Optional
 class MurkyWaterException(Exception):
 
     def __init__(self, msg: str, code: Optional[int] = 1, command: Optional[str] = None):
+        super().__init__(msg)
         self.code = code
         self.msg = msg
         self.command = command
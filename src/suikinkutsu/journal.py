@@ -0,0 +1,158 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import typing
+import pathlib
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+
+from suikinkutsu import tracing
+from suikinkutsu.config import Configuration
+from suikinkutsu.constants import DEFAULT_JOURNAL_MAX_SIZE, DEFAULT_JOURNAL_BACKUPS
+
+
+def percentile(values: typing.List[float], p: float) -> float:
+    """
+    The nearest-rank percentile of values, which must be sorted and not empty
+    """
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+class Journal:
+    """
+    A journal of timing spans for platform commands and database calls, kept as JSON lines in the configuration
+    directory. Each span records the platform, the operation, its number of arguments, its exit code, its wall time
+    in seconds and the number of bytes it produced. The journal is rotated once it exceeds its maximum size, keeping
+    a number of older journals next to it
+    """
+
+    def __init__(self,
+                 config: Configuration,
+                 max_size: int = DEFAULT_JOURNAL_MAX_SIZE,
+                 backups: int = DEFAULT_JOURNAL_BACKUPS):
+        self._path = pathlib.Path(config.config_dir.value) / 'journal.jsonl'
+        self._max_size = max_size
+        self._backups = backups
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+
+    @contextlib.contextmanager
+    def span(self, platform: str, operation: str, args: int = 0) -> typing.Iterator[typing.Dict]:
+        """
+        Time the enclosed operation and record it in the journal, also when it fails. The operation is traced as
+        well, when a tracer is installed
+        Args:
+            platform: The platform (or database) the operation was performed on
+            operation: The kind of operation, e.g. 'container run'
+            args: The number of arguments to the operation
+
+        Returns:
+            The span, whose exit code and byte count may be filled in by the enclosed operation
+        """
+        span = {'time': time.time(), 'platform': platform, 'operation': operation, 'args': args,
+                'exit': None, 'duration': None, 'bytes': None}
+        start = time.perf_counter()
+        with tracing.span(f'{platform} {operation}', {'platform': platform, 'args': args}) as trace_span:
+            try:
+                yield span
+            except Exception as ex:
+                if span['exit'] is None:
+                    span['exit'] = getattr(ex, 'code', None) or 1
+                raise
+            finally:
+                span['duration'] = time.perf_counter() - start
+                self.record(span)
+                if trace_span is not None:
+                    trace_span.attributes.update(exit=span['exit'], bytes=span['bytes'])
+
+    def record(self, span: typing.Dict):
+        line = (json.dumps(span) + '\n').encode('UTF-8')
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            if self._path.exists() and self._path.stat().st_size + len(line) > self._max_size:
+                self._rotate()
+            # A single append of a whole line, so concurrent processes do not interleave their spans
+            fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+    def _rotate(self):
+        for generation in range(self._backups, 0, -1):
+            older = self._path.with_name(f'{self._path.name}.{generation}')
+            newer = self._path.with_name(f'{self._path.name}.{generation - 1}') if generation > 1 else self._path
+            if newer.exists():
+                os.replace(newer, older)
+        if self._backups == 0:
+            self._path.unlink(missing_ok=True)
+
+    def spans(self) -> typing.Iterator[typing.Dict]:
+        """
+        Read the spans from all journals, oldest first. Partially written lines are skipped
+        """
+        paths = [self._path.with_name(f'{self._path.name}.{generation}')
+                 for generation in range(self._backups, 0, -1)]
+        paths.append(self._path)
+        for path in paths:
+            if not path.exists():
+                continue
+            with open(path, 'r', encoding='UTF-8') as journal:
+                for line in journal:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+    def stats(self) -> typing.List[typing.Dict]:
+        """
+        Summarise the wall time per platform and operation, those taking the most time overall first
+        Returns:
+            A list of dicts with the platform, operation, count, failures, the 50th, 95th and 99th percentile and the
+            total of the wall time in seconds
+        """
+        durations: typing.Dict[typing.Tuple[str, str], typing.List[float]] = {}
+        failures: typing.Dict[typing.Tuple[str, str], int] = {}
+        for span in self.spans():
+            key = (span.get('platform'), span.get('operation'))
+            durations.setdefault(key, []).append(span.get('duration') or 0.0)
+            failures[key] = failures.get(key, 0) + (1 if span.get('exit') not in (0, None) else 0)
+        stats = []
+        for (platform, operation), values in durations.items():
+            values.sort()
+            stats.append({'platform': platform,
+                          'operation': operation,
+                          'count': len(values),
+                          'failures': failures[(platform, operation)],
+                          'p50': percentile(values, 50),
+                          'p95': percentile(values, 95),
+                          'p99': percentile(values, 99),
+                          'total': sum(values)})
+        return sorted(stats, key=lambda stat: stat['total'], reverse=True)
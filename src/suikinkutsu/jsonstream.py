@@ -0,0 +1,92 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import re
+import json
+import codecs
+import typing
+import itertools
+
+from suikinkutsu.exceptions import MurkyWaterException
+
+WHITESPACE_PATTERN = re.compile(r'[ \t\r\n]*')
+
+# Parser states of iter_array: Before the array, before its first element, after an element, after a comma, after it
+_OPEN, _FIRST, _NEXT, _ELEMENT, _DONE = range(5)
+_DECODER = json.JSONDecoder()
+
+
+def iter_array(chunks: typing.Iterable[bytes]) -> typing.Iterator[typing.Any]:
+    """
+    Incrementally parse a JSON array of objects (or arrays) as it is read, such as the output of 'container inspect'.
+    Only the elements within the chunk currently being read are held in memory, regardless of the size of the array.
+    Each element is parsed in a single pass by the C scanner of the json module. An element which is not complete
+    yet fails to parse and is retried once the next chunk has been read.
+
+    Parsing element by element is slower than parsing the document at once when every element is kept. When the
+    elements are consumed as they are parsed, it is faster, because the garbage collector does not repeatedly
+    traverse the elements parsed so far
+    Args:
+        chunks: The UTF-8 encoded document in chunks of arbitrary size
+
+    Returns:
+        An iterator over the parsed elements of the array
+
+    Raises:
+        MurkyWaterException when the document is not an array of objects or is truncated
+    """
+    text = codecs.getincrementaldecoder('UTF-8')()
+    skip = WHITESPACE_PATTERN.match
+    decode = _DECODER.raw_decode
+    buffer = ''
+    state = _OPEN
+    for chunk in itertools.chain(chunks, [None]):
+        final = chunk is None
+        buffer += text.decode(b'' if final else chunk, final=final)
+        pos = skip(buffer).end()
+        while pos < len(buffer):
+            char = buffer[pos]
+            if state == _ELEMENT or (state == _FIRST and char != ']'):
+                if char not in '{[':
+                    raise MurkyWaterException(code=500, msg='Expected a JSON array of objects')
+                try:
+                    element, pos = decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # The element is still incomplete, unless there is nothing left to read
+                    break
+                state = _NEXT
+                yield element
+            elif state == _NEXT and char == ',':
+                state, pos = _ELEMENT, pos + 1
+            elif state in (_FIRST, _NEXT) and char == ']':
+                state, pos = _DONE, pos + 1
+            elif state == _OPEN and char == '[':
+                state, pos = _FIRST, pos + 1
+            elif state == _DONE:
+                raise MurkyWaterException(code=500, msg='Unbalanced JSON array')
+            else:
+                raise MurkyWaterException(code=500, msg='Expected a JSON array of objects')
+            pos = skip(buffer, pos).end()
+        # Drop what we are done with, so the buffer never holds more than the elements not parsed yet
+        buffer = buffer[pos:]
+    if state not in (_OPEN, _DONE) or buffer:
+        raise MurkyWaterException(code=500, msg='Truncated JSON array')
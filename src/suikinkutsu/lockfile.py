@@ -0,0 +1,70 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import typing
+import pathlib
+import json
+
+from suikinkutsu.config import Configuration
+
+
+class LockFile:
+    """
+    Lock file pinning the floating image tags used by a recipe to content digests
+    """
+
+    def __init__(self, config: Configuration):
+        recipe_file_path = pathlib.Path(config.recipe_file.value)
+        self._lock_file = recipe_file_path.with_name(f'{recipe_file_path.name}.lock')
+        self._images: typing.Dict[str, str] = {}
+        if self._lock_file.exists():
+            self._images = json.loads(self._lock_file.read_text(encoding='UTF-8')).get('images', {})
+
+    @property
+    def lock_file(self) -> pathlib.Path:
+        return self._lock_file
+
+    @property
+    def images(self) -> typing.Dict[str, str]:
+        return self._images
+
+    def get(self, image: str) -> typing.Optional[str]:
+        """
+        Look up the digest an image is locked to
+        Args:
+            image: The image reference, including its tag
+
+        Returns:
+            The digest reference (e.g. postgres@sha256:...) or None if the image is not locked
+        """
+        return self._images.get(image)
+
+    def add(self, image: str, digest: str):
+        self._images[image] = digest
+
+    def remove(self, image: str):
+        if image in self._images:
+            del self._images[image]
+
+    def save(self):
+        self._lock_file.write_text(json.dumps({'images': dict(sorted(self._images.items()))}, indent=2),
+                                   encoding='UTF-8')
@@ -23,3 +23,4 @@
 from .port_binding import PortBinding
 from .volume_binding import VolumeBinding
 from .instance import Instance
+from .resources import Resources
@@ -21,22 +21,37 @@
 #  SOFTWARE.
 import typing
 
-from suikinkutsu.blueprints import Blueprint
-from suikinkutsu.models import PortBinding, VolumeBinding
+from .port_binding import PortBinding
+from .volume_binding import VolumeBinding
+
+if typing.TYPE_CHECKING:
+    from suikinkutsu.blueprints import Blueprint
+    from suikinkutsu.platforms import Platform
 
 
 class Instance(object):
     """
-    A blueprint instance
+    A blueprint instance. Two instances are equal when they are the same container, regardless of the bindings and
+    state they were observed with
     """
 
-    def __init__(self, instance_id: str, name: str, running: bool):
+    __slots__ = ('_id', '_name', '_running', '_blueprint', '_platform', '_port_bindings', '_volume_bindings')
+
+    def __init__(self,
+                 instance_id: typing.Optional[str],
+                 name: str,
+                 running: bool = False,
+                 blueprint: typing.Optional['Blueprint'] = None,
+                 platform: typing.Optional['Platform'] = None,
+                 port_bindings: typing.Optional[typing.List[PortBinding]] = None,
+                 volume_bindings: typing.Optional[typing.List[VolumeBinding]] = None):
         self._id = instance_id
         self._name = name
         self._running = running
-        self._blueprint = None
-        self._port_bindings = []
-        self._volume_bindings = []
+        self._blueprint = blueprint
+        self._platform = platform
+        self._port_bindings = port_bindings or []
+        self._volume_bindings = volume_bindings or []
 
     @property
     def instance_id(self):
@@ -55,13 +70,24 @@ class Instance(object):
         self._running = value
 
     @property
-    def blueprint(self) -> Blueprint:
+    def blueprint(self) -> 'Blueprint':
         return self._blueprint
 
     @blueprint.setter
-    def blueprint(self, value: Blueprint):
+    def blueprint(self, value: 'Blueprint'):
         self._blueprint = value
 
+    @property
+    def platform(self) -> typing.Optional['Platform']:
+        """
+        The platform hosting the instance, if known
+        """
+        return self._platform
+
+    @platform.setter
+    def platform(self, value: 'Platform'):
+        self._platform = value
+
     @property
     def port_bindings(self) -> typing.List[PortBinding]:
         return self._port_bindings
@@ -77,3 +103,23 @@ class Instance(object):
     @volume_bindings.setter
     def volume_bindings(self, value: typing.List[VolumeBinding]):
         self._volume_bindings = value
+
+    def display_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            'id': self.instance_id,
+            'name': self.name,
+            'platform': self.platform.name if self.platform else 'Unknown',
+            'blueprint': self.blueprint.name if self.blueprint else 'Unknown',
+            'running': self.running
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, Instance):
+            return NotImplemented
+        return (self.instance_id, self.name) == (other.instance_id, other.name)
+
+    def __hash__(self):
+        return hash((self.instance_id, self.name))
+
+    def __repr__(self):
+        return f'Instance(instance_id={self.instance_id},name={self.name},running={self.running})'
@@ -22,15 +22,21 @@
 
 import re
 import typing
+import functools
 
+from suikinkutsu.constants import MAX_PORT
 from suikinkutsu.exceptions import UnparseableInstanceException
 
+CONTAINER_PORT_PATTERN = re.compile(r'(?P<port>\d+)(/(?P<protocol>\w+))?')
+
 
 class PortBinding(object):
     """
     A Port Binding
     """
 
+    __slots__ = ('_host_port', '_container_port', '_host_ip', '_protocol')
+
     def __init__(self,
                  host_port: int,
                  container_port: int,
@@ -57,21 +63,74 @@ class PortBinding(object):
     def protocol(self) -> str:
         return self._protocol
 
-    @classmethod
-    def from_mapping(cls, container: str, host: typing.List) -> 'PortBinding':
-        c = re.fullmatch(r'(?P<port>\d+)(/(?P<protocol>\w+))?', container)
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def parse_container(container: str) -> typing.Tuple[str, str]:
+        """
+        Parse a container port with an optional protocol, e.g. '5432/tcp'. There are only a handful of distinct
+        container ports across all instances, so the result is cached
+        Args:
+            container: The container port and optional protocol
+
+        Returns:
+            A tuple of the container port and the protocol, which defaults to 'tcp'
+
+        Raises:
+            UnparseableInstanceException when the container port is unparseable
+        """
+        c = CONTAINER_PORT_PATTERN.fullmatch(container)
         if c is None:
             raise UnparseableInstanceException(code=500, msg=f'Instance port container mapping "{container}"'
                                                              f' is unparseable')
+        return c.group('port'), c.group('protocol') or 'tcp'
+
+    @classmethod
+    def from_mapping(cls, container: str, host: typing.List) -> 'PortBinding':
+        container_port, protocol = cls.parse_container(container)
         if len(host) != 1 or 'HostIp' not in host[0] or 'HostPort' not in host[0]:
             raise UnparseableInstanceException(code=500, msg='Instance port host mapping is unparseable')
-        return cls(container_port=c.group('port'),
+        return cls(container_port=container_port,
                    host_ip=host[0].get('HostIp'),
                    host_port=host[0].get('HostPort'),
-                   protocol=c.group('protocol'))
+                   protocol=protocol)
+
+    @classmethod
+    def from_spec(cls, container: str, host: str) -> 'PortBinding':
+        """
+        Parse a port binding as declared in a recipe, e.g. '5432/tcp': '127.0.0.1:5432'
+        Args:
+            container: The container port and optional protocol
+            host: The host port with an optional host IP
+
+        Returns:
+            A PortBinding
+
+        Raises:
+            UnparseableInstanceException when the host port is not a port number
+        """
+        host_ip, _, host_port = str(host).rpartition(':')
+        if host_port and not (host_port.isdigit() and 0 < int(host_port) <= MAX_PORT):
+            raise UnparseableInstanceException(code=400, msg=f'Host port "{host_port}" of container port {container} '
+                                                             f'is not a port number')
+        return cls.from_mapping(str(container), [{'HostIp': host_ip or '0.0.0.0', 'HostPort': host_port}])
 
     def to_mapping(self) -> str:
-        return f'{self.host_ip}:{self.container_port}:{self.host_port}/{self.protocol}'
+        """
+        The binding as a publish specification, e.g. '127.0.0.1:5432:5432/tcp'. Without a host port, the platform
+        picks a free one
+        """
+        return f'{self.host_ip}:{self.host_port or ""}:{self.container_port}/{self.protocol}'
+
+    def _key(self) -> typing.Tuple[str, str, str, str]:
+        return str(self.host_port or ''), str(self.container_port), str(self.host_ip), str(self.protocol)
+
+    def __eq__(self, other):
+        if not isinstance(other, PortBinding):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
 
     def __repr__(self):
         return f'PortBinding(host_port={self.host_port},container_port={self.container_port},' \
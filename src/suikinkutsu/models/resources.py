@@ -0,0 +1,104 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import typing
+
+
+class Resources(object):
+    """
+    Resource controls of an instance. Unset controls leave the platform defaults in place
+    """
+
+    __slots__ = ('_cpus', '_cpu_shares', '_memory', '_cpuset', '_shm_size')
+
+    def __init__(self,
+                 cpus: typing.Optional[float] = None,
+                 cpu_shares: typing.Optional[int] = None,
+                 memory: typing.Optional[str] = None,
+                 cpuset: typing.Optional[str] = None,
+                 shm_size: typing.Optional[str] = None):
+        self._cpus = cpus
+        self._cpu_shares = cpu_shares
+        self._memory = memory
+        self._cpuset = cpuset
+        self._shm_size = shm_size
+
+    @property
+    def cpus(self) -> typing.Optional[float]:
+        """
+        The CPU quota, in number of cores (e.g. 1.5)
+        """
+        return self._cpus
+
+    @property
+    def cpu_shares(self) -> typing.Optional[int]:
+        """
+        The relative CPU weight when cores are contended (the platform default is 1024)
+        """
+        return self._cpu_shares
+
+    @property
+    def memory(self) -> typing.Optional[str]:
+        """
+        The memory limit, e.g. '2g'
+        """
+        return self._memory
+
+    @property
+    def cpuset(self) -> typing.Optional[str]:
+        """
+        The cores the instance is pinned to, e.g. '0-3' or '0,2'
+        """
+        return self._cpuset
+
+    @property
+    def shm_size(self) -> typing.Optional[str]:
+        """
+        The size of /dev/shm, e.g. '256m'
+        """
+        return self._shm_size
+
+    def merged(self, overrides: 'Resources') -> 'Resources':
+        """
+        Combine with overrides, whose controls take precedence where they are set
+        """
+        return Resources(cpus=overrides.cpus if overrides.cpus is not None else self.cpus,
+                         cpu_shares=overrides.cpu_shares if overrides.cpu_shares is not None else self.cpu_shares,
+                         memory=overrides.memory or self.memory,
+                         cpuset=overrides.cpuset or self.cpuset,
+                         shm_size=overrides.shm_size or self.shm_size)
+
+    def _key(self) -> typing.Tuple:
+        return self.cpus, self.cpu_shares, self.memory, self.cpuset, self.shm_size
+
+    def __eq__(self, other):
+        if not isinstance(other, Resources):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f'Resources(cpus={self.cpus},cpu_shares={self.cpu_shares},memory={self.memory},' \
+               f'cpuset={self.cpuset},shm_size={self.shm_size})'
@@ -20,14 +20,22 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
+import typing
+
+
 class VolumeBinding(object):
     """
-    A storage volume binding
+    A storage volume binding. Ephemeral bindings are backed by memory rather than a named volume, so their content
+    is gone once the instance is removed
     """
 
-    def __init__(self, name: str, mount_point: str):
+    __slots__ = ('_name', '_mount_point', '_ephemeral', '_size')
+
+    def __init__(self, name: str, mount_point: str, ephemeral: bool = False, size: typing.Optional[str] = None):
         self._name = name
         self._mount_point = mount_point
+        self._ephemeral = ephemeral
+        self._size = size
 
     @property
     def name(self):
@@ -37,5 +45,25 @@ class VolumeBinding(object):
     def mount_point(self):
         return self._mount_point
 
+    @property
+    def ephemeral(self) -> bool:
+        return self._ephemeral
+
+    @property
+    def size(self) -> typing.Optional[str]:
+        """
+        The size limit of an ephemeral binding, e.g. '512m'
+        """
+        return self._size
+
+    def __eq__(self, other):
+        if not isinstance(other, VolumeBinding):
+            return NotImplemented
+        return (self.name, self.mount_point, self.ephemeral, self.size) == \
+            (other.name, other.mount_point, other.ephemeral, other.size)
+
+    def __hash__(self):
+        return hash((self.name, self.mount_point, self.ephemeral, self.size))
+
     def __repr__(self):
-        return f'Volume(name={self.name},mount_point={self.mount_point})'
+        return f'Volume(name={self.name},mount_point={self.mount_point},ephemeral={self.ephemeral},size={self.size})'
@@ -20,7 +20,13 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
-from .output import OutputEntry, OutputSeverity, Output
-from .output_human import HumanWaterOutput
-from .output_json import JSONWaterOutput
-from .output_yaml import YAMLWaterOutput
+from .output import OutputEntry, OutputSeverity, Output, OUTPUTS, output_class
+
+# The outputs are imported on first use, so that only the chosen output loads its dependencies (e.g. rich or PyYAML)
+_OUTPUT_NAMES = {clz: name for name, (_, clz) in OUTPUTS.items()}
+
+
+def __getattr__(name: str):
+    if name in _OUTPUT_NAMES:
+        return output_class(_OUTPUT_NAMES[name])
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -21,11 +21,13 @@
 #  SOFTWARE.
 
 import dataclasses
+import importlib
 import typing
 import enum
 import argparse
 
 from suikinkutsu.behaviours import CommandLineAware
+from suikinkutsu.progress import Progress
 
 
 class OutputSeverity(enum.Enum):
@@ -47,9 +49,10 @@ class OutputSeverity(enum.Enum):
 @dataclasses.dataclass
 class OutputEntry:
     """
-    A unit of output, allowing us to abstract away the method on how we output
+    A unit of output, allowing us to abstract away the method on how we output. The rows of a table may be produced
+    by a generator, which outputs that support it render as the rows are produced. Such rows can only be consumed once
     """
-    msg: typing.Union[str, typing.List[typing.List[str]]]
+    msg: typing.Union[str, typing.Iterable[typing.List[str]]]
     columns: typing.Optional[typing.List[str]] = dataclasses.field(default_factory=list)
     code: typing.Optional[int] = 200
     title: typing.Optional[str] = None
@@ -73,6 +76,15 @@ class OutputEntry:
              'columns': self.columns}
         return d
 
+    def records(self) -> typing.Iterator[typing.Dict[str, str]]:
+        """
+        The rows of a table, each keyed by column
+        Returns:
+            An iterator over the rows of the table
+        """
+        for row in self.msg:
+            yield dict(zip(self.columns, row))
+
 
 class Output(CommandLineAware):
     """
@@ -95,7 +107,8 @@ class Output(CommandLineAware):
     def output_list(self, runtime, args: argparse.Namespace) -> int:
         output = OutputEntry(title='Outputs',
                              columns=['Name', 'Description'],
-                             msg=[[name, output.description] for name, output in runtime.outputs.items()])
+                             msg=[[name, output_class(name)(runtime.config).description]
+                                  for name in runtime.outputs])
         runtime.output.print(output)
         return 0
 
@@ -111,6 +124,33 @@ class Output(CommandLineAware):
         """
         pass
 
+    def progress(self, title: str) -> Progress:
+        """
+        Report the progress of a long-running operation. By default, progress is reported in informational messages
+        Args:
+            title: The operation, e.g. 'Cooking up'
+
+        Returns:
+            A progress tracker, to be used as a context manager for the duration of the operation
+        """
+        return Progress(title, self.info)
+
+    def cook_show(self, runtime) -> None:
+        """
+        Display the blueprints of the recipe
+        Args:
+            runtime: The runtime holding the recipe
+        """
+        self.print(OutputEntry(title='Recipe',
+                               columns=['Name', 'Kind', 'Image', 'Volumes', 'Ports', 'Depends on'],
+                               msg=[[blueprint.name,
+                                     type(blueprint).__name__,
+                                     f'{blueprint.image}:{blueprint.version}',
+                                     '\n'.join(f'{vol.name}:{vol.mount_point}' for vol in blueprint.volume_bindings),
+                                     '\n'.join(port.to_mapping() for port in blueprint.port_bindings),
+                                     '\n'.join(blueprint.depends_on)]
+                                    for blueprint in runtime.recipe.blueprints.values()]))
+
     def exception(self, ex: Exception) -> None:
         """
         Display an exception
@@ -147,7 +187,7 @@ class Output(CommandLineAware):
     def _exception_dict(ex: Exception):
         return {
             'Exception': str(ex),
-            'Type': type(ex)
+            'Type': type(ex).__name__
         }
 
     @staticmethod
@@ -170,3 +210,31 @@ class Output(CommandLineAware):
 
     def __str__(self):
         return 'Abstract base class for output'
+
+
+# The available outputs by name, with the module and class implementing them. Outputs are only imported once they
+# are chosen, so that the third-party dependencies of one (e.g. rich) are not loaded when another is used
+OUTPUTS = {
+    'human': ('suikinkutsu.outputs.output_human', 'HumanWaterOutput'),
+    'json': ('suikinkutsu.outputs.output_json', 'JSONWaterOutput'),
+    'yaml': ('suikinkutsu.outputs.output_yaml', 'YAMLWaterOutput'),
+    'yaml-stream': ('suikinkutsu.outputs.output_yaml', 'YAMLStreamWaterOutput'),
+    'ndjson': ('suikinkutsu.outputs.output_ndjson', 'NDJSONWaterOutput'),
+    'csv': ('suikinkutsu.outputs.output_delimited', 'CSVWaterOutput'),
+    'tsv': ('suikinkutsu.outputs.output_delimited', 'TSVWaterOutput')
+}
+
+
+def output_class(name: str) -> typing.Optional[typing.Type[Output]]:
+    """
+    Import the output of the provided name
+    Args:
+        name: The name of the output
+
+    Returns:
+        The output class or None if there is no output of that name
+    """
+    if name not in OUTPUTS:
+        return None
+    module, clz = OUTPUTS[name]
+    return getattr(importlib.import_module(module), clz)
@@ -0,0 +1,93 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import csv
+import sys
+import typing
+
+from . import OutputEntry
+from suikinkutsu.profiling import memory_section
+from .output import Output
+
+
+class DelimitedWaterOutput(Output):
+    """
+    Base for outputs which print tables as delimited text, one line per row, as the rows are produced. A table starts
+    with a header line of its columns. Informational messages, warnings and errors go to stderr so that they do not
+    corrupt the table
+    """
+    name = 'delimited'
+    delimiter = ','
+
+    @memory_section('output render')
+    def print(self, entry: OutputEntry) -> None:
+        if isinstance(entry.msg, str):
+            self._row([entry.msg])
+            return
+        self._row(entry.columns or [])
+        for row in entry.msg:
+            self._row(row)
+
+    def exception(self, ex: Exception) -> None:
+        print(f'Exception: {ex}', file=sys.stderr)
+
+    def info(self, msg: str) -> None:
+        print(msg, file=sys.stderr)
+
+    def warning(self, msg: str) -> None:
+        print(f'Warning: {msg}', file=sys.stderr)
+
+    def error(self, msg: str) -> None:
+        print(f'Error: {msg}', file=sys.stderr)
+
+    def _row(self, row: typing.List[str]) -> None:
+        csv.writer(sys.stdout, delimiter=self.delimiter, lineterminator='\n').writerow(row)
+        sys.stdout.flush()
+
+
+class CSVWaterOutput(DelimitedWaterOutput):
+    """
+    Comma-separated values as per RFC 4180, quoting fields as necessary
+    """
+    name = 'csv'
+    delimiter = ','
+
+    def __init__(self, config) -> None:
+        super().__init__(config)
+        self._description = 'Output tables as comma-separated values'
+
+
+class TSVWaterOutput(DelimitedWaterOutput):
+    """
+    Tab-separated values. Fields are never quoted, instead backslashes, tabs and line breaks within them are escaped
+    as \\\\, \\t, \\n and \\r, so that every row is exactly one line and can be split on tabs
+    """
+    name = 'tsv'
+    delimiter = '\t'
+    escapes = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+    def __init__(self, config) -> None:
+        super().__init__(config)
+        self._description = 'Output tables as tab-separated values'
+
+    def _row(self, row: typing.List[str]) -> None:
+        print('\t'.join(str(field).translate(self.escapes) for field in row), flush=True)
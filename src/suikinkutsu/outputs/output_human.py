@@ -23,12 +23,49 @@
 from rich.console import Console
 from rich.table import Table
 from rich.tree import Tree
-from rich.columns import Columns
 from rich.box import ROUNDED
+from rich.progress import Progress as RichProgress, TextColumn, TimeElapsedColumn
 
+from suikinkutsu.profiling import memory_section
+from suikinkutsu.progress import Progress, ProgressTask
 from .output import Output, OutputEntry, OutputSeverity
 
 
+class LiveProgress(Progress):
+    """
+    Progress rendered live on a terminal, one line per task
+    """
+
+    def __init__(self, title: str, console: Console):
+        super().__init__(title, console.print)
+        self._live = RichProgress(TextColumn('[bold]{task.description}'),
+                                  TextColumn('{task.fields[state]}'),
+                                  TimeElapsedColumn(),
+                                  TextColumn('{task.fields[transfer]}'),
+                                  TextColumn('{task.fields[detail]}'),
+                                  console=console)
+        self._ids = {}
+
+    def __enter__(self) -> 'LiveProgress':
+        super().__enter__()
+        self._live.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._live.stop()
+        return False
+
+    def _render(self, task: ProgressTask, changed: bool) -> None:
+        fields = {'state': task.state, 'transfer': task.transfer(), 'detail': task.detail or ''}
+        if task.key not in self._ids:
+            self._ids[task.key] = self._live.add_task(task.key, total=None, **fields)
+        elif changed:
+            # The elapsed time is measured within a state
+            self._live.reset(self._ids[task.key], **fields)
+        else:
+            self._live.update(self._ids[task.key], **fields)
+
+
 class HumanWaterOutput(Output):
     """
     Output for humans
@@ -41,6 +78,7 @@ class HumanWaterOutput(Output):
         self._description = 'Output for humans'
         self._console = Console()
 
+    @memory_section('output render')
     def print(self, entry: OutputEntry):
         if isinstance(entry.msg, str):
             self._console.print(HumanWaterOutput._severity(entry.severity, f'* [{entry.code}] {entry.msg}'))
@@ -69,6 +107,11 @@ class HumanWaterOutput(Output):
             case OutputSeverity.ERROR: return f'[bold red]{msg}[/bold red]'
         return msg
 
+    def progress(self, title: str) -> Progress:
+        if self._console.is_terminal:
+            return LiveProgress(title, self._console)
+        return Progress(title, self.info)
+
     def exception(self, ex: Exception) -> None:
         self._console.print_exception()
 
@@ -85,28 +128,28 @@ class HumanWaterOutput(Output):
         tree = Tree('Recipe')
         for blueprint in runtime.recipe.blueprints.values():
             node = tree.add(blueprint.name)
-            node.add(Columns(['[bold]Kind:[/bold]', blueprint.kind], width=80))
-            node.add(Columns(['[bold]Image:[/bold]', blueprint.image], width=80))
+            node.add(f'[bold]Kind:[/bold] {type(blueprint).__name__}')
+            node.add(f'[bold]Image:[/bold] {blueprint.image}:{blueprint.version}')
 
             labels_node = node.add('[bold]Labels:[/bold]')
             for k, v in blueprint.labels.items():
-                labels_node.add(Columns([f'[bold]{k}:[/bold]', v], width=80))
+                labels_node.add(f'[bold]{k}:[/bold] {v}')
 
             volumes_node = node.add('[bold]Volumes:[/bold]')
-            for k, v in blueprint.volume_bindings.items():
-                volumes_node.add(Columns([f'[bold]{k}:[/bold]', v], width=80))
+            for volume in blueprint.volume_bindings:
+                volumes_node.add(f'[bold]{volume.name}:[/bold] {volume.mount_point}')
 
             env_node = node.add('[bold]Environment:[/bold]')
             for k, v in blueprint.environment.items():
-                env_node.add(Columns([f'[bold]{k}:[/bold]', v], width=80))
+                env_node.add(f'[bold]{k}:[/bold] {v}')
 
             ports_node = node.add('[bold]Ports:[/bold]')
-            for k, v in blueprint.port_bindings.items():
-                ports_node.add(Columns([f'[bold]{k}:[/bold]', v], width=80))
+            for port in blueprint.port_bindings:
+                ports_node.add(f'[bold]{port.container_port}/{port.protocol}:[/bold] {port.host_ip}:{port.host_port}')
 
             depends_on_node = node.add('[bold]Depends on:[/bold]')
             for v in blueprint.depends_on:
-                depends_on_node.add(Columns(['[bold]Blueprint:[/bold]', v], width=80))
+                depends_on_node.add(f'[bold]Blueprint:[/bold] {v}')
         self._console.print(tree)
 
     def __repr__(self):
@@ -23,6 +23,7 @@
 import json
 
 from . import OutputEntry
+from suikinkutsu.profiling import memory_section
 from .output import Output
 
 
@@ -36,13 +37,14 @@ class JSONWaterOutput(Output):
         super().__init__(config)
         self._description = 'Output in JSON'
 
+    @memory_section('output render')
     def print(self, entry: OutputEntry) -> None:
         if isinstance(entry.msg, str):
             print(json.dumps(entry.__dict__()))
             return
 
         d = entry.__dict__()
-        d['msg'] = dict(zip(entry.columns, entry.msg))
+        d['msg'] = list(entry.records())
         del d['columns']
         print(json.dumps(d))
 
@@ -0,0 +1,63 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import json
+
+from . import OutputEntry
+from suikinkutsu.profiling import memory_section
+from .output import Output
+
+
+class NDJSONWaterOutput(Output):
+    """
+    Newline-delimited JSON output. Every row of a table is printed as a JSON object of its own as soon as it is
+    produced, so that consumers such as jq can start processing before the whole table is known
+    """
+    name = 'ndjson'
+
+    def __init__(self, config) -> None:
+        super().__init__(config)
+        self._description = 'Output in newline-delimited JSON, one object per table row'
+
+    @memory_section('output render')
+    def print(self, entry: OutputEntry) -> None:
+        if isinstance(entry.msg, str):
+            self._emit(entry.__dict__())
+            return
+        for record in entry.records():
+            self._emit(record)
+
+    def exception(self, ex: Exception) -> None:
+        self._emit(self._exception_dict(ex))
+
+    def info(self, msg: str) -> None:
+        self._emit({'INFO': msg})
+
+    def warning(self, msg: str) -> None:
+        self._emit({'WARNING': msg})
+
+    def error(self, msg: str) -> None:
+        self._emit({'ERROR': msg})
+
+    @staticmethod
+    def _emit(obj) -> None:
+        print(json.dumps(obj, default=str), flush=True)
@@ -20,9 +20,9 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
-import yaml
-
 from . import OutputEntry
+from suikinkutsu import yamlstream
+from suikinkutsu.profiling import memory_section
 from .output import Output
 
 
@@ -36,26 +36,62 @@ class YAMLWaterOutput(Output):
         super().__init__(config)
         self._description = 'Output in YAML'
 
+    @memory_section('output render')
     def print(self, entry: OutputEntry) -> None:
         if isinstance(entry.msg, str):
-            print(yaml.safe_dump(entry.__dict__()))
+            print(yamlstream.dump(entry.__dict__()))
             return
 
-        # TODO: We must reorder this
         d = entry.__dict__()
-        d['msg'] = dict(zip(entry.columns, entry.msg))
+        d['msg'] = list(entry.records())
         del d['columns']
-        print(yaml.safe_dump(d))
+        print(yamlstream.dump(d, sort_keys=False))
 
     def exception(self, ex: Exception):
         ex_dict = self._exception_dict(ex)
-        print(yaml.safe_dump(ex_dict))
+        print(yamlstream.dump(ex_dict))
 
     def info(self, msg: str):
-        print(yaml.safe_dump({'INFO': msg}))
+        print(yamlstream.dump({'INFO': msg}))
 
     def warning(self, msg: str):
-        print(yaml.safe_dump({'WARNING': msg}))
+        print(yamlstream.dump({'WARNING': msg}))
 
     def error(self, msg: str):
-        print(yaml.safe_dump({'ERROR': msg}))
+        print(yamlstream.dump({'ERROR': msg}))
+
+
+class YAMLStreamWaterOutput(Output):
+    """
+    Multi-document YAML output. Every row of a table is printed as a YAML document of its own as soon as it is
+    produced, so that large instance lists can be consumed (e.g. with yaml.safe_load_all) before they are complete
+    """
+    name = 'yaml-stream'
+
+    def __init__(self, config) -> None:
+        super().__init__(config)
+        self._description = 'Output in multi-document YAML, one document per table row'
+
+    @memory_section('output render')
+    def print(self, entry: OutputEntry) -> None:
+        if isinstance(entry.msg, str):
+            self._emit(entry.__dict__())
+            return
+        for record in entry.records():
+            self._emit(record)
+
+    def exception(self, ex: Exception) -> None:
+        self._emit(self._exception_dict(ex))
+
+    def info(self, msg: str) -> None:
+        self._emit({'INFO': msg})
+
+    def warning(self, msg: str) -> None:
+        self._emit({'WARNING': msg})
+
+    def error(self, msg: str) -> None:
+        self._emit({'ERROR': msg})
+
+    @staticmethod
+    def _emit(obj) -> None:
+        print(yamlstream.dump(obj, explicit_start=True, sort_keys=False), end='', flush=True)
@@ -24,3 +24,4 @@ from .platform import Platform
 from .docker import Docker
 from .nerdctl import Nerdctl
 from .kubectl import Kubectl
+from .fake import Fake
@@ -24,13 +24,16 @@ import sys
 import typing
 import json
 import shutil
+import time
 
+from suikinkutsu import tracing, jsonstream
+from suikinkutsu.profiling import memory_section
 from suikinkutsu.exceptions import MurkyWaterException, UnparseableInstanceException
 from .platform import Platform
-from suikinkutsu.models import Instance, PortBinding, VolumeBinding
+from suikinkutsu.models import Instance, PortBinding, VolumeBinding, Resources
 from suikinkutsu.config import Configuration
 from suikinkutsu.blueprints import Blueprint
-from suikinkutsu.constants import LABEL_BLUEPRINT, LABEL_CREATED_BY
+from suikinkutsu.constants import LABEL_BLUEPRINT, LABEL_CREATED_BY, HELPER_IMAGE, DEFAULT_INSPECT_CHUNK_SIZE
 
 
 class Docker(Platform):
@@ -46,61 +49,259 @@ class Docker(Platform):
         self._executable_name = 'docker'
         self._executable = shutil.which(self._executable_name)
         self._available = None
+        self._registry_mirror = None
 
-    def apply(self, blueprint: Blueprint) -> Instance:
-        cmd = ['container', 'run', '-d', '--name', blueprint.name]
+    def apply(self, blueprint: Blueprint, name: typing.Optional[str] = None, template: bool = True) -> Instance:
+        name = name or blueprint.name
+        cloned = template and self.template_clone(blueprint)
+        cmd = ['container', 'run', '-d', '--name', name]
         cmd.extend(['--label', f'{LABEL_CREATED_BY}=suikinkutsu'])
         cmd.extend(['--label', f'{LABEL_BLUEPRINT}={blueprint.__class__.__name__}'])
+        for key, value in blueprint.labels.items():
+            cmd.extend(['--label', f'{key}={value}'])
         for key, value in blueprint.environment.items():
             cmd.extend(['-e', f'{key}={value}'])
         for vol in blueprint.volume_bindings:
             # TODO: ro/rw
-            cmd.extend(['--mount', f'type=volume,source={vol.name},destination={vol.mount_point}'])
+            if vol.ephemeral:
+                cmd.extend(['--mount', f'type=tmpfs,destination={vol.mount_point},tmpfs-size={vol.size}'])
+            else:
+                cmd.extend(['--mount', f'type=volume,source={vol.name},destination={vol.mount_point}'])
         for port_binding in blueprint.port_bindings:
             cmd.extend(['-p', port_binding.to_mapping()])
-        cmd.extend(['--hostname', blueprint.name])
+        cmd.extend(self._resource_flags(blueprint.resources))
+        if blueprint.resources.shm_size:
+            cmd.extend(['--shm-size', blueprint.resources.shm_size])
+        cmd.extend(['--hostname', name])
         if len(blueprint.depends_on) > 0:
             cmd.extend(['--link', ','.join(blueprint.depends_on)])
-        cmd.append(f'{blueprint.image}:{blueprint.version}')
+        cmd.append(self.image_reference(f'{blueprint.image}:{blueprint.version}'))
         result = self.execute(cmd)
         instance = Instance(instance_id=result.stdout.strip('\n'),
-                            name=blueprint.name,
-                            running=True)
-        instance.blueprint = blueprint
-        instance.port_bindings = blueprint.port_bindings
-        instance.volume_bindings = blueprint.volume_bindings
+                            name=name,
+                            running=True,
+                            blueprint=blueprint,
+                            platform=self,
+                            port_bindings=blueprint.port_bindings,
+                            volume_bindings=blueprint.volume_bindings)
+        if cloned:
+            blueprint.adopt(self, name)
         return instance
 
+    @memory_section('platform instances')
     def instances(self) -> typing.List[Instance]:
+        return list(self.instances_iter())
+
+    @memory_section('platform instances')
+    def instances_iter(self) -> typing.Iterator[Instance]:
+        """
+        Yield the instances created by us while their inspection is read from the platform, so that only a single
+        inspected container is held in memory at a time
+        Returns:
+            An iterator over the instances
+        """
         if not self.available:
-            return []
+            return
         result = self.execute(['container', 'ls', '--all', '--quiet'])
         container_ids = [container_id for container_id in result.stdout.split('\n') if container_id != '']
         if len(container_ids) == 0:
-            return []
+            return
         cmd = ['container', 'inspect']
         cmd.extend(container_ids)
-        result = self.execute(cmd)
-        raw_instances = json.loads(result.stdout)
-        filtered_instances = [i for i in raw_instances if i.get('Config', {}).get('Labels', {}).get(LABEL_CREATED_BY)]
-        instances = []
-        for i in filtered_instances:
-            instance = Instance(instance_id=i['Id'],
-                                name=i.get('Name', 'Unknown').strip('/'),
-                                running=i.get('State', {}).get('Running'))
-            instance_blueprint = i.get('Config', {}).get('Labels', {}).get(LABEL_BLUEPRINT, 'Unknown')
-            try:
-                blueprint_clz = getattr(sys.modules['suikinkutsu.blueprints'], instance_blueprint)
-                instance.blueprint = blueprint_clz()
-            except AttributeError as ae:
-                raise UnparseableInstanceException(code=500, msg=f'Unable to find corresponding blueprint for '
-                                                                 f'"{instance_blueprint}') from ae
-            instance.port_bindings = [PortBinding.from_mapping(c, h) for c, h in
-                                      i.get('NetworkSettings', {}).get('Ports', {}).items()]
-            instance.volume_bindings = [VolumeBinding(mount['Name'], mount['Destination']) for mount in
-                                        i.get('Mounts', [])]
-            instances.append(instance)
-        return instances
+        for raw_instance in jsonstream.iter_array(self.read(cmd, DEFAULT_INSPECT_CHUNK_SIZE)):
+            if raw_instance.get('Config', {}).get('Labels', {}).get(LABEL_CREATED_BY):
+                yield self._instance_from_inspect(raw_instance)
+
+    def instance_get(self, name: str) -> typing.Optional[Instance]:
+        result = self.execute(['container', 'inspect', name], check=False)
+        if result.returncode != 0:
+            return None
+        raw_instances = [i for i in json.loads(result.stdout or '[]')
+                         if i.get('Config', {}).get('Labels', {}).get(LABEL_CREATED_BY)]
+        return self._instance_from_inspect(raw_instances[0]) if len(raw_instances) > 0 else None
+
+    def instance_start(self, name: str):
+        self.execute(['container', 'start', name])
+
+    def instance_stop(self, name: str):
+        self.execute(['container', 'stop', name])
+
+    def volume_export(self, volume: str, destination: typing.BinaryIO):
+        self.redirect(['container', 'run', '--rm', '--network', 'none',
+                       '--mount', f'type=volume,source={volume},destination=/volume,readonly',
+                       self.image_reference(HELPER_IMAGE),
+                       'tar', '--numeric-owner', '-C', '/volume', '-cf', '-', '.'],
+                      stdout=destination)
+
+    def volume_import(self, volume: str, source: typing.BinaryIO):
+        self.redirect(['container', 'run', '--rm', '-i', '--network', 'none',
+                       '--mount', f'type=volume,source={volume},destination=/volume',
+                       self.image_reference(HELPER_IMAGE),
+                       'sh', '-c', 'find /volume -mindepth 1 -delete && tar --numeric-owner -C /volume -xpf -'],
+                      stdin=source)
+
+    def instance_update(self, name: str, resources: Resources):
+        flags = self._resource_flags(resources)
+        if len(flags) > 0:
+            self.execute(['container', 'update', *flags, name])
+
+    def cpu_count(self) -> int:
+        result = self.execute(['info', '--format', '{{json .NCPU}}'])
+        return int(result.stdout.strip())
+
+    @staticmethod
+    def _resource_flags(resources: Resources) -> typing.List[str]:
+        """
+        The flags for the resource controls which can be changed while a container runs, i.e. all but shm_size
+        """
+        flags = []
+        if resources.cpus is not None:
+            flags.extend(['--cpus', str(resources.cpus)])
+        if resources.cpu_shares is not None:
+            flags.extend(['--cpu-shares', str(resources.cpu_shares)])
+        if resources.memory:
+            flags.extend(['--memory', resources.memory])
+        if resources.cpuset:
+            flags.extend(['--cpuset-cpus', resources.cpuset])
+        return flags
+
+    def instance_rename(self, name: str, new_name: str):
+        self.execute(['container', 'rename', name, new_name])
+
+    def instances_labelled(self, label: str, value: str) -> typing.List[str]:
+        result = self.execute(['container', 'ls', '--all', '--filter', f'label={label}={value}',
+                               '--format', '{{.Names}}'])
+        return sorted(result.stdout.split())
+
+    def instance_wait(self, name: str, command: typing.List[str], timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        with tracing.span(f'wait {name}', {'instance': name, 'timeout': timeout}) as span:
+            attempts = 0
+            while True:
+                attempts += 1
+                ready = self.execute(['container', 'exec', name, *command], check=False).returncode == 0
+                if ready or time.monotonic() >= deadline:
+                    break
+                time.sleep(0.1)
+            if span is not None:
+                span.attributes.update(ready=ready, attempts=attempts)
+        return ready
+
+    def volumes_present(self, volumes: typing.List[str]) -> typing.Set[str]:
+        if len(volumes) == 0:
+            return set()
+        result = self.execute(['volume', 'inspect', *volumes], check=False)
+        return {raw_volume.get('Name') for raw_volume in json.loads(result.stdout or '[]')} & set(volumes)
+
+    def volume_create(self, volume: str, labels: typing.Optional[typing.Dict[str, str]] = None):
+        cmd = ['volume', 'create', '--label', f'{LABEL_CREATED_BY}=suikinkutsu']
+        for key, value in (labels or {}).items():
+            cmd.extend(['--label', f'{key}={value}'])
+        cmd.append(volume)
+        self.execute(cmd)
+
+    def volume_clone(self, source: str, target: str):
+        self.volume_create(target)
+        try:
+            self.execute(['container', 'run', '--rm', '--network', 'none',
+                          '--mount', f'type=volume,source={source},destination=/source,readonly',
+                          '--mount', f'type=volume,source={target},destination=/target',
+                          self.image_reference(HELPER_IMAGE),
+                          'cp', '-a', '--reflink=auto', '/source/.', '/target/'])
+        except MurkyWaterException:
+            # A partial clone would otherwise be mistaken for existing data
+            self.execute(['volume', 'rm', target], check=False)
+            raise
+
+    def volume_remove(self, volume: str):
+        self.execute(['volume', 'rm', volume])
+
+    def volume_list(self, label: str) -> typing.Dict[str, str]:
+        result = self.execute(['volume', 'ls', '--quiet', '--filter', f'label={label}'])
+        names = result.stdout.split()
+        if len(names) == 0:
+            return {}
+        result = self.execute(['volume', 'inspect', *names])
+        return {raw_volume['Name']: (raw_volume.get('Labels') or {}).get(label)
+                for raw_volume in json.loads(result.stdout or '[]')}
+
+    def _instance_from_inspect(self, raw_instance: typing.Dict) -> Instance:
+        """
+        Construct an instance from the output of 'container inspect'
+        Args:
+            raw_instance: A single container as reported by 'container inspect'
+
+        Returns:
+            The corresponding instance
+
+        Raises:
+            UnparseableInstanceException when the container does not correspond to a known blueprint
+        """
+        instance = Instance(instance_id=raw_instance['Id'],
+                            name=raw_instance.get('Name', 'Unknown').strip('/'),
+                            running=raw_instance.get('State', {}).get('Running'),
+                            platform=self)
+        instance_blueprint = raw_instance.get('Config', {}).get('Labels', {}).get(LABEL_BLUEPRINT, 'Unknown')
+        try:
+            blueprint_clz = getattr(sys.modules['suikinkutsu.blueprints'], instance_blueprint)
+            instance.blueprint = blueprint_clz()
+        except AttributeError as ae:
+            raise UnparseableInstanceException(code=500, msg=f'Unable to find corresponding blueprint for '
+                                                             f'"{instance_blueprint}') from ae
+        instance.port_bindings = [PortBinding.from_mapping(c, h) for c, h in
+                                  (raw_instance.get('NetworkSettings', {}).get('Ports') or {}).items() if h]
+        instance.volume_bindings = [VolumeBinding(mount['Name'], mount['Destination']) for mount in
+                                    raw_instance.get('Mounts', []) if mount.get('Type') == 'volume']
+        return instance
+
+    def images_present(self, images: typing.List[str]) -> typing.Set[str]:
+        if len(images) == 0:
+            return set()
+        cmd = ['image', 'inspect']
+        cmd.extend(images)
+        result = self.execute(cmd, check=False)
+        try:
+            raw_images = json.loads(result.stdout or '[]')
+        except json.JSONDecodeError:
+            return set()
+        references = set()
+        for raw_image in raw_images:
+            references.update(raw_image.get('RepoTags') or [])
+            references.update(raw_image.get('RepoDigests') or [])
+        return {image for image in images if image in references}
+
+    def image_digest(self, image: str) -> typing.Optional[str]:
+        result = self.execute(['image', 'inspect', '--format', '{{json .RepoDigests}}', image], check=False)
+        if result.returncode != 0:
+            return None
+        repository = image.rsplit(':', 1)[0] if ':' in image.rsplit('/', 1)[-1] else image
+        for digest in json.loads(result.stdout or 'null') or []:
+            if digest.split('@', 1)[0] == repository:
+                return digest
+        return None
+
+    def image_pull(self, image: str) -> typing.Iterator[str]:
+        return self.stream(['image', 'pull', image])
+
+    def registry_mirror(self) -> typing.Optional[str]:
+        if self._registry_mirror is not None:
+            return self._registry_mirror or None
+        self._registry_mirror = ''
+        result = self.execute(['container', 'ls', '--quiet',
+                               '--filter', f'label={LABEL_BLUEPRINT}=Registry',
+                               '--filter', 'status=running'], check=False)
+        for container_id in result.stdout.split():
+            ports = self.execute(['container', 'port', container_id, '5000/tcp'], check=False)
+            if ports.returncode == 0 and ports.stdout.strip():
+                self._registry_mirror = ports.stdout.split()[0].replace('0.0.0.0', '127.0.0.1')
+                break
+        return self._registry_mirror or None
+
+    def image_save(self, image: str, chunk_size: int) -> typing.Iterator[bytes]:
+        return self.read(['image', 'save', image], chunk_size)
+
+    def image_load(self, chunks: typing.Iterable[bytes]) -> str:
+        return self.write(['image', 'load'], chunks)
 
     def instance_show(self, name: str, blueprint: typing.Optional[Blueprint] = None):
         # result = self.execute(['container', 'inspect', blueprint.name])
@@ -110,7 +311,8 @@ class Docker(Platform):
         self.execute(['container', 'stop', instance.name])
         self.execute(['container', 'rm', instance.name])
         for vol in instance.volume_bindings:
-            self.execute(['volume', 'rm', vol.name])
+            if not vol.ephemeral:
+                self.execute(['volume', 'rm', vol.name])
 
     @property
     def executable_name(self) -> str:
@@ -0,0 +1,318 @@
+#  MIT License
+#
+#  Copyright (c) 2022 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import os
+import typing
+import time
+import random
+import hashlib
+import threading
+import subprocess
+
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.profiling import memory_section
+from .platform import Platform
+from suikinkutsu.models import Instance, PortBinding, Resources
+from suikinkutsu.config import Configuration
+from suikinkutsu.blueprints import Blueprint
+from suikinkutsu.constants import (
+    LABEL_BLUEPRINT, LABEL_CREATED_BY,
+    ENV_FAKE_LATENCY, ENV_FAKE_FAILURE_RATE, ENV_FAKE_SEED, DEFAULT_FAKE_SEED, FAKE_PORT_RANGE_START
+)
+
+
+class Fake(Platform):
+    """
+    A platform which keeps its containers, volumes and images in memory. It behaves deterministically for a given
+    seed, so the scheduler, inventory and output paths can be tested and benchmarked at scale without a container
+    runtime. Latency and failures of platform operations can be injected
+    """
+
+    @classmethod
+    def factory(cls, config: Configuration) -> typing.Dict[str, 'Platform']:
+        # The platform may still be selected on the command line, after the platforms were created
+        self = cls(config)
+        return {self.name: self}
+
+    def __init__(self,
+                 config: Configuration,
+                 latency: typing.Optional[float] = None,
+                 failure_rate: typing.Optional[float] = None,
+                 seed: typing.Optional[int] = None):
+        super().__init__(config)
+        self._name = 'fake'
+        self._description = 'An in-memory platform for tests and benchmarks'
+        self._latency = latency if latency is not None else float(os.environ.get(ENV_FAKE_LATENCY, 0))
+        self._failure_rate = failure_rate if failure_rate is not None \
+            else float(os.environ.get(ENV_FAKE_FAILURE_RATE, 0))
+        self._random = random.Random(seed if seed is not None else int(os.environ.get(ENV_FAKE_SEED,
+                                                                                      DEFAULT_FAKE_SEED)))
+        self._lock = threading.RLock()
+        self._containers: typing.Dict[str, typing.Dict] = {}
+        self._volumes: typing.Dict[str, typing.Dict] = {}
+        self._images: typing.Set[str] = set()
+        self._events: typing.List[typing.Dict] = []
+        self._next_port = FAKE_PORT_RANGE_START
+
+    def _operation(self, action: str, target: str):
+        """
+        Account for a platform operation by recording it as an event, after the injected latency. Must be called
+        before the state is changed, so an injected failure leaves it untouched
+        Args:
+            action: The kind of operation, e.g. 'container.run'
+            target: The name of the container, volume or image operated upon
+
+        Raises:
+            MurkyWaterException when a failure is injected
+        """
+        if self._latency > 0:
+            time.sleep(self._latency)
+        with self._lock:
+            failed = self._failure_rate > 0 and self._random.random() < self._failure_rate
+            self._events.append({'seq': len(self._events), 'action': action, 'target': target, 'failed': failed})
+        if failed:
+            raise MurkyWaterException(msg=f'Injected failure of {action} on {target}', code=500, command=action)
+
+    def _container(self, name: str) -> typing.Dict:
+        if name not in self._containers:
+            raise MurkyWaterException(msg=f'No such container: {name}', code=404)
+        return self._containers[name]
+
+    def _instance(self, container: typing.Dict) -> Instance:
+        return Instance(instance_id=container['id'],
+                        name=container['name'],
+                        running=container['running'],
+                        blueprint=container['blueprint'],
+                        platform=self,
+                        port_bindings=list(container['port_bindings']),
+                        volume_bindings=list(container['volume_bindings']))
+
+    def apply(self, blueprint: Blueprint, name: typing.Optional[str] = None, template: bool = True) -> Instance:
+        name = name or blueprint.name
+        cloned = template and self.template_clone(blueprint)
+        image = self.image_reference(f'{blueprint.image}:{blueprint.version}')
+        self._operation('container.run', name)
+        with self._lock:
+            if name in self._containers:
+                raise MurkyWaterException(msg=f'The container name "{name}" is already in use', code=409)
+            port_bindings = []
+            for port_binding in blueprint.port_bindings:
+                host_port = port_binding.host_port
+                if not host_port:
+                    host_port = self._next_port
+                    self._next_port += 1
+                port_bindings.append(PortBinding(host_port=host_port,
+                                                 container_port=port_binding.container_port,
+                                                 host_ip=port_binding.host_ip,
+                                                 protocol=port_binding.protocol))
+            for vol in blueprint.volume_bindings:
+                if not vol.ephemeral and vol.name not in self._volumes:
+                    self._volumes[vol.name] = {'labels': {LABEL_CREATED_BY: 'suikinkutsu'}, 'data': b''}
+            self._images.add(image)
+            self._containers[name] = {
+                'id': f'{self._random.getrandbits(256):064x}',
+                'name': name,
+                'running': True,
+                'blueprint': blueprint,
+                'image': image,
+                'labels': {LABEL_CREATED_BY: 'suikinkutsu',
+                           LABEL_BLUEPRINT: blueprint.__class__.__name__,
+                           **blueprint.labels},
+                'environment': dict(blueprint.environment),
+                'port_bindings': port_bindings,
+                'volume_bindings': list(blueprint.volume_bindings),
+                'resources': blueprint.resources
+            }
+            instance = self._instance(self._containers[name])
+        if cloned:
+            blueprint.adopt(self, name)
+        return instance
+
+    @memory_section('platform instances')
+    def instances(self) -> typing.List[Instance]:
+        self._operation('container.ls', '*')
+        with self._lock:
+            return [self._instance(container) for container in self._containers.values()]
+
+    def instance_get(self, name: str) -> typing.Optional[Instance]:
+        self._operation('container.inspect', name)
+        with self._lock:
+            return self._instance(self._containers[name]) if name in self._containers else None
+
+    def instance_start(self, name: str):
+        self._operation('container.start', name)
+        with self._lock:
+            self._container(name)['running'] = True
+
+    def instance_stop(self, name: str):
+        self._operation('container.stop', name)
+        with self._lock:
+            self._container(name)['running'] = False
+
+    def instance_remove(self, instance: Instance):
+        self._operation('container.rm', instance.name)
+        with self._lock:
+            self._container(instance.name)
+            del self._containers[instance.name]
+            for vol in instance.volume_bindings:
+                if not vol.ephemeral:
+                    self._volumes.pop(vol.name, None)
+
+    def instance_update(self, name: str, resources: Resources):
+        self._operation('container.update', name)
+        with self._lock:
+            container = self._container(name)
+            container['resources'] = container['resources'].merged(resources)
+
+    def instance_rename(self, name: str, new_name: str):
+        self._operation('container.rename', name)
+        with self._lock:
+            if new_name in self._containers:
+                raise MurkyWaterException(msg=f'The container name "{new_name}" is already in use', code=409)
+            container = self._containers.pop(self._container(name)['name'])
+            container['name'] = new_name
+            self._containers[new_name] = container
+
+    def instances_labelled(self, label: str, value: str) -> typing.List[str]:
+        self._operation('container.ls', f'{label}={value}')
+        with self._lock:
+            return sorted(name for name, container in self._containers.items()
+                          if container['labels'].get(label) == value)
+
+    def instance_wait(self, name: str, command: typing.List[str], timeout: float) -> bool:
+        self._operation('container.exec', name)
+        with self._lock:
+            return name in self._containers and self._containers[name]['running']
+
+    def instance_resources(self, name: str) -> Resources:
+        """
+        The resource controls currently in effect for an instance
+        """
+        with self._lock:
+            return self._container(name)['resources']
+
+    def volumes_present(self, volumes: typing.List[str]) -> typing.Set[str]:
+        self._operation('volume.inspect', ','.join(volumes))
+        with self._lock:
+            return set(volumes) & self._volumes.keys()
+
+    def volume_create(self, volume: str, labels: typing.Optional[typing.Dict[str, str]] = None):
+        self._operation('volume.create', volume)
+        with self._lock:
+            self._volumes[volume] = {'labels': {LABEL_CREATED_BY: 'suikinkutsu', **(labels or {})}, 'data': b''}
+
+    def volume_clone(self, source: str, target: str):
+        self._operation('volume.clone', target)
+        with self._lock:
+            if source not in self._volumes:
+                raise MurkyWaterException(msg=f'No such volume: {source}', code=404)
+            self._volumes[target] = {'labels': {LABEL_CREATED_BY: 'suikinkutsu'},
+                                     'data': self._volumes[source]['data']}
+
+    def volume_remove(self, volume: str):
+        self._operation('volume.rm', volume)
+        with self._lock:
+            if self._volumes.pop(volume, None) is None:
+                raise MurkyWaterException(msg=f'No such volume: {volume}', code=404)
+
+    def volume_list(self, label: str) -> typing.Dict[str, str]:
+        self._operation('volume.ls', label)
+        with self._lock:
+            return {name: vol['labels'][label] for name, vol in self._volumes.items() if label in vol['labels']}
+
+    def volume_export(self, volume: str, destination: typing.BinaryIO):
+        self._operation('volume.export', volume)
+        with self._lock:
+            if volume not in self._volumes:
+                raise MurkyWaterException(msg=f'No such volume: {volume}', code=404)
+            data = self._volumes[volume]['data']
+        destination.write(data)
+
+    def volume_import(self, volume: str, source: typing.BinaryIO):
+        self._operation('volume.import', volume)
+        data = source.read()
+        with self._lock:
+            if volume not in self._volumes:
+                raise MurkyWaterException(msg=f'No such volume: {volume}', code=404)
+            self._volumes[volume]['data'] = data
+
+    def images_present(self, images: typing.List[str]) -> typing.Set[str]:
+        self._operation('image.inspect', ','.join(images))
+        with self._lock:
+            return set(images) & self._images
+
+    def image_digest(self, image: str) -> typing.Optional[str]:
+        with self._lock:
+            if image not in self._images:
+                return None
+        repository = image.rsplit(':', 1)[0] if ':' in image.rsplit('/', 1)[-1] else image
+        return f'{repository}@sha256:{hashlib.sha256(image.encode()).hexdigest()}'
+
+    def image_pull(self, image: str) -> typing.Iterator[str]:
+        self._operation('image.pull', image)
+        with self._lock:
+            self._images.add(image)
+        yield f'Status: Downloaded newer image for {image}'
+
+    def execute(self, args: typing.List[str], check: bool = True) -> subprocess.CompletedProcess:
+        """
+        Commands have no effect on an in-memory platform, but fail like the platform would for missing containers
+        """
+        self._operation(' '.join(args[:2]), args[2] if len(args) > 2 else '')
+        if args[:2] == ['container', 'exec'] and len(args) > 2 and args[2] not in self._containers:
+            if check:
+                raise MurkyWaterException(msg=f'No such container: {args[2]}', code=404)
+            return subprocess.CompletedProcess(args=args, returncode=1, stdout='', stderr='')
+        return subprocess.CompletedProcess(args=args, returncode=0, stdout='', stderr='')
+
+    @property
+    def volumes(self) -> typing.Dict[str, typing.Dict[str, str]]:
+        """
+        The volumes and their labels
+        """
+        with self._lock:
+            return {name: dict(vol['labels']) for name, vol in self._volumes.items()}
+
+    @property
+    def events(self) -> typing.List[typing.Dict]:
+        """
+        The operations performed on this platform, in order
+        """
+        with self._lock:
+            return list(self._events)
+
+    @property
+    def executable_name(self) -> str:
+        return self._executable_name
+
+    @property
+    def executable(self):
+        return self._executable
+
+    @property
+    def available(self):
+        """
+        The fake platform is only available when it is the configured platform, so it is never offered next to
+        the real ones
+        """
+        return self._config.platform.value == self.name
@@ -27,7 +27,8 @@ import shutil
 from .platform import Platform
 from suikinkutsu.config import Configuration
 from suikinkutsu import MurkyWaterException
-from suikinkutsu.blueprints import BlueprintInstance, Blueprint
+from suikinkutsu.blueprints import Blueprint
+from suikinkutsu.models import Instance
 
 
 class Kubectl(Platform):
@@ -63,7 +64,7 @@ class Kubectl(Platform):
             #self.runtime.output.warning(f'{self._name} executable was found but is not available: {mwe.msg}')
             self._available = False
 
-    def apply(self, blueprint: Blueprint):
+    def apply(self, blueprint: Blueprint, name: typing.Optional[str] = None, template: bool = True):
         pass
 
     @property
@@ -88,11 +89,11 @@ class Kubectl(Platform):
             self._available = False
         return self._available
 
-    def instance_create(self, instance: BlueprintInstance):
+    def instance_create(self, instance: Instance):
         pass
 
     # pylint: disable=unused-argument
-    def instance_list(self, blueprint: typing.Optional[Blueprint] = None) -> typing.List[BlueprintInstance]:
+    def instance_list(self, blueprint: typing.Optional[Blueprint] = None) -> typing.List[Instance]:
         # TODO
         return []
 
@@ -20,15 +20,18 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
+import sys
 import typing
-import json
 import shutil
 
 from .platform import Platform
 from suikinkutsu.config import Configuration
 from suikinkutsu.exceptions import MurkyWaterException
-from suikinkutsu.blueprints import Blueprint, BlueprintInstance, BlueprintVolume
-from suikinkutsu.constants import LABEL_BLUEPRINT, LABEL_CREATED_BY
+from suikinkutsu import jsonstream
+from suikinkutsu.profiling import memory_section
+from suikinkutsu.blueprints import Blueprint
+from suikinkutsu.models import Instance, VolumeBinding
+from suikinkutsu.constants import LABEL_BLUEPRINT, LABEL_CREATED_BY, DEFAULT_INSPECT_CHUNK_SIZE
 
 
 class Nerdctl(Platform):
@@ -46,11 +49,7 @@ class Nerdctl(Platform):
         self._executable = shutil.which(self._executable_name)
         self._available = None
 
-    def instances(self):
-        result = self.execute(['container', 'ls', '-q'])
-        return result
-
-    def apply(self, blueprint: Blueprint):
+    def apply(self, blueprint: Blueprint, name: typing.Optional[str] = None, template: bool = True):
         pass
 
     @property
@@ -78,36 +77,31 @@ class Nerdctl(Platform):
     #
     # nerdctl features a --mode=native which in some ways may be more detailed but for what we parse it's currently
     # easier to use the same method as Docker. Particularly the mounts are easier to parse.
-    # pylint: disable=unused-argument
-    def instance_list(self, blueprint: typing.Optional[Blueprint] = None) -> typing.List[BlueprintInstance]:
-        platform_instances: typing.List[BlueprintInstance] = []
+    @memory_section('platform instances')
+    def instances(self) -> typing.List[Instance]:
+        return list(self.instances_iter())
+
+    @memory_section('platform instances')
+    def instances_iter(self) -> typing.Iterator[Instance]:
         if not self.available:
-            return platform_instances
+            return
         result = self.execute(['container', 'ls', '--all', '--quiet'])
         container_ids = [container_id for container_id in result.stdout.split('\n') if container_id != '']
         if len(container_ids) == 0:
-            return platform_instances
+            return
         cmd = ['container', 'inspect']
         cmd.extend(container_ids)
-        result = self.execute(cmd)
-        raw_instances = json.loads(result.stdout)
-        for raw_instance in raw_instances:
+        for raw_instance in jsonstream.iter_array(self.read(cmd, DEFAULT_INSPECT_CHUNK_SIZE)):
             if not raw_instance.get('Config', {}).get('Labels', {}).get(LABEL_CREATED_BY):
                 continue
             blueprint_label = raw_instance.get('Config', {}).get('Labels', {}).get(LABEL_BLUEPRINT)
-            instance_name = raw_instance.get('Name', 'Unknown').strip('/')
-            volumes = []
-            for mount in raw_instance.get('Mounts', []):
-                if mount['Type'] != 'volume':
-                    continue
-                volumes.append(BlueprintVolume(name=mount['Name'],
-                                               destination=mount['Destination']))
-            instance = BlueprintInstance(name=instance_name,
-                                         platform=self,
-                                         volumes=volumes,
-                                         blueprint=self.runtime.blueprints.get(blueprint_label))
-            instance.id = raw_instance['Id']
-            instance.running = raw_instance.get('State', {}).get('Running')
-            platform_instances.append(instance)
-        return platform_instances
+            blueprint_clz = getattr(sys.modules['suikinkutsu.blueprints'], str(blueprint_label), None)
+            volumes = [VolumeBinding(name=mount['Name'], mount_point=mount['Destination'])
+                       for mount in raw_instance.get('Mounts', []) if mount['Type'] == 'volume']
+            yield Instance(instance_id=raw_instance['Id'],
+                           name=raw_instance.get('Name', 'Unknown').strip('/'),
+                           running=raw_instance.get('State', {}).get('Running'),
+                           blueprint=blueprint_clz() if blueprint_clz else None,
+                           platform=self,
+                           volume_bindings=volumes)
 
@@ -23,14 +23,21 @@
 
 import typing
 import abc
+import os
 import pathlib
 import subprocess
 import argparse
+import concurrent.futures
 
+from suikinkutsu.exceptions import MurkyWaterException
 from suikinkutsu.config import Configuration
-from suikinkutsu.blueprints import Blueprint, BlueprintInstance
+from suikinkutsu.constants import LABEL_TEMPLATE, TEMPLATE_PREFIX, DEFAULT_READINESS_TIMEOUT
+from suikinkutsu.lockfile import LockFile
+from suikinkutsu.blueprints import Blueprint
+from suikinkutsu.models import Instance, VolumeBinding, Resources
 from suikinkutsu.outputs import OutputEntry
 from suikinkutsu.behaviours import CommandLineAware, CommandExecutor
+from suikinkutsu.profiling import memory_section
 
 
 class Platform(CommandLineAware, CommandExecutor):
@@ -49,6 +56,7 @@ class Platform(CommandLineAware, CommandExecutor):
         self._platforms = None
         self._platform = None
         self._instances = None
+        self._lockfile = None
 
     @classmethod
     def factory(cls, config: Configuration) -> typing.Dict[str, 'Platform']:
@@ -77,9 +85,8 @@ class Platform(CommandLineAware, CommandExecutor):
     def platform_list(self, runtime, args: argparse.Namespace) -> int:
         output = OutputEntry(title='Platforms',
                              columns=['Name', 'Description', 'Available'],
-                             msg=[
-                                 [pf.name, pf.description, str(pf.available)] for name, pf in runtime.platforms.items()]
-                             )
+                             msg=[[pf.name, pf.description, str(pf.available)]
+                                  for pf in runtime.platforms.values() if pf.available])
         runtime.output.print(output)
         return 0
 
@@ -97,8 +104,18 @@ class Platform(CommandLineAware, CommandExecutor):
                 self._instances.update(pf.instances())
         return self._instances
 
+    @memory_section('platform instances')
+    def instances_iter(self) -> typing.Iterator[Instance]:
+        """
+        Yield the instances created by us on this platform. Platforms which can discover their instances one by one
+        override this so that the instances can be displayed while the rest are still being discovered
+        Returns:
+            An iterator over the instances
+        """
+        yield from self.instances()
+
     @abc.abstractmethod
-    def apply(self, blueprint: Blueprint):
+    def apply(self, blueprint: Blueprint, name: typing.Optional[str] = None, template: bool = True):
         pass
 
     @property
@@ -109,6 +126,14 @@ class Platform(CommandLineAware, CommandExecutor):
     def description(self) -> str:
         return self._description
 
+    @property
+    def lockfile(self) -> typing.Optional[LockFile]:
+        return self._lockfile
+
+    @lockfile.setter
+    def lockfile(self, value: LockFile):
+        self._lockfile = value
+
     @property
     @abc.abstractmethod
     def available(self):
@@ -120,19 +145,331 @@ class Platform(CommandLineAware, CommandExecutor):
         return self._available
 
     @abc.abstractmethod
-    def instance_create(self, instance: BlueprintInstance):
+    def instance_create(self, instance: Instance):
         pass
 
-    def execute(self, args: typing.List[str]) -> subprocess.CompletedProcess:
-        return self._execute(self._executable, args)
+    def images_present(self, images: typing.List[str]) -> typing.Set[str]:
+        """
+        Determine which of the provided images are already present on the platform
+        Args:
+            images: The image references to check
+
+        Returns:
+            The subset of image references which do not need to be pulled
+        """
+        return set()
+
+    def image_digest(self, image: str) -> typing.Optional[str]:
+        """
+        Determine the content digest of an image that is present on the platform
+        Args:
+            image: The image reference, including its tag
+
+        Returns:
+            The digest reference (e.g. postgres@sha256:...) or None if the image is not present
+        """
+        return None
+
+    def image_reference(self, image: str, local: bool = True) -> str:
+        """
+        Resolve the reference by which an image should be run or pulled. A digest pinned in the lock file is
+        preferred over the floating tag, so the platform does not need to ask the registry whether the tag moved.
+        When a registry mirror is running, references to images which are not yet present are rewritten to pull
+        through it. Images which are present already are referred to as they are, whether they were pulled through
+        the mirror or not
+        Args:
+            image: The image reference, including its tag
+            local: Only prefer the digest when the image is already present on the platform
+
+        Returns:
+            The digest reference if the image is locked (and present), the original image reference otherwise
+        """
+        mirror = self.registry_mirror()
+        digest = self._lockfile.get(image) if self._lockfile else None
+        if mirror is None and digest is None:
+            return image
+        candidates = [digest, self._mirrored(digest, mirror)] if digest else []
+        if local or digest is None:
+            candidates.extend([image, self._mirrored(image, mirror)])
+        candidates = list(dict.fromkeys(candidates))
+        present = self.images_present(candidates)
+        for candidate in candidates:
+            if candidate in present:
+                return candidate
+        return self._mirrored(digest if digest and not local else image, mirror)
+
+    def registry_mirror(self) -> typing.Optional[str]:
+        """
+        Determine the address of a running registry mirror on this platform
+        Returns:
+            The host and port of the registry mirror or None if there is none
+        """
+        return None
+
+    @staticmethod
+    def _mirrored(reference: str, mirror: typing.Optional[str]) -> str:
+        """
+        Rewrite an image reference on Docker Hub to be pulled through the registry mirror. References to images
+        on other registries are returned as-is, since the mirror only proxies Docker Hub
+        """
+        if mirror is None:
+            return reference
+        registry, _, path = reference.partition('/')
+        if path and registry == 'docker.io':
+            reference = path
+        elif path and ('.' in registry or ':' in registry or registry == 'localhost'):
+            return reference
+        if '/' not in reference:
+            reference = f'library/{reference}'
+        return f'{mirror}/{reference}'
+
+    def image_pull(self, image: str) -> typing.Iterator[str]:
+        """
+        Pull an image onto the platform
+        Args:
+            image: The image reference to pull
+
+        Returns:
+            An iterator over the progress messages of the pull
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support pulling images')
+
+    def image_save(self, image: str, chunk_size: int) -> typing.Iterator[bytes]:
+        """
+        Export an image from the platform as a tar archive
+        Args:
+            image: The image reference to export
+            chunk_size: The maximum size of a chunk in bytes
+
+        Returns:
+            An iterator over the chunks of the tar archive
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support saving images')
+
+    def image_load(self, chunks: typing.Iterable[bytes]) -> str:
+        """
+        Import images into the platform from a tar archive
+        Args:
+            chunks: The chunks of the tar archive
+
+        Returns:
+            The output of the platform describing the loaded images
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support loading images')
+
+    def instance_get(self, name: str) -> typing.Optional[Instance]:
+        """
+        Look up a single instance created by us on this platform
+        Args:
+            name: The instance name
+
+        Returns:
+            The instance or None if there is no such instance
+        """
+        return None
+
+    def instance_start(self, name: str):
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support starting instances')
+
+    def instance_stop(self, name: str):
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support stopping instances')
+
+    def volume_export(self, volume: str, destination: typing.BinaryIO):
+        """
+        Export the content of a named volume as a tar archive, using a throwaway helper container
+        Args:
+            volume: The name of the volume
+            destination: A file (or pipe) the tar archive is written into directly
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support exporting volumes')
+
+    def volume_import(self, volume: str, source: typing.BinaryIO):
+        """
+        Replace the content of a named volume with a tar archive, using a throwaway helper container
+        Args:
+            volume: The name of the volume
+            source: A file (or pipe) the tar archive is read from directly
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support importing volumes')
+
+    def instance_update(self, name: str, resources: Resources):
+        """
+        Change the resource controls of an existing instance, as far as the platform allows
+        Args:
+            name: The instance name
+            resources: The resource controls to apply
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support updating instances')
+
+    def cpu_count(self) -> int:
+        """
+        The number of cores available to instances, which may differ from the local host (e.g. in a virtual machine)
+        """
+        return os.cpu_count() or 1
+
+    def instance_rename(self, name: str, new_name: str):
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support renaming instances')
+
+    def instances_labelled(self, label: str, value: str) -> typing.List[str]:
+        """
+        List the names of the instances carrying a label with a particular value, whether they are running or not
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support looking up instances by label')
+
+    def instance_wait(self, name: str, command: typing.List[str], timeout: float) -> bool:
+        """
+        Wait for an instance to become ready
+        Args:
+            name: The instance name
+            command: A command run within the instance which succeeds once it is ready
+            timeout: The number of seconds to wait at most
+
+        Returns:
+            True when the instance became ready in time, False otherwise
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support waiting for instances')
+
+    def volumes_present(self, volumes: typing.List[str]) -> typing.Set[str]:
+        """
+        Determine which of the provided named volumes exist
+        Args:
+            volumes: The volume names
+
+        Returns:
+            The subset of volume names which exist
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support looking up volumes')
+
+    def volume_create(self, volume: str, labels: typing.Optional[typing.Dict[str, str]] = None):
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support creating volumes')
+
+    def volume_clone(self, source: str, target: str):
+        """
+        Create a named volume with the content of another, sharing its data copy-on-write where the storage supports it
+        Args:
+            source: The name of the volume to clone
+            target: The name of the new volume
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support cloning volumes')
+
+    def volume_remove(self, volume: str):
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support removing volumes')
+
+    def volume_list(self, label: str) -> typing.Dict[str, str]:
+        """
+        List the named volumes carrying a label
+        Args:
+            label: The label
+
+        Returns:
+            A dict of volume names and their label values
+        """
+        raise MurkyWaterException(msg=f'Platform {self.name} does not support listing volumes')
+
+    @staticmethod
+    def template_volume(blueprint: Blueprint, volume: VolumeBinding) -> str:
+        return f'{TEMPLATE_PREFIX}-{blueprint.template_key()}-{volume.name}'
+
+    def templates(self) -> typing.Dict[str, typing.List[str]]:
+        """
+        List the volume templates on this platform
+        Returns:
+            A dict of template keys and the names of their volumes
+        """
+        templates = {}
+        for volume, key in sorted(self.volume_list(LABEL_TEMPLATE).items()):
+            templates.setdefault(key, []).append(volume)
+        return templates
+
+    def template_create(self, blueprint: Blueprint, timeout: float = DEFAULT_READINESS_TIMEOUT):
+        """
+        Initialise the volumes of a blueprint once by running a throwaway instance on template volumes until it is
+        ready. The instance is stopped cleanly, so the volumes can be cloned for new instances
+        Args:
+            blueprint: The blueprint to create a volume template for
+            timeout: The number of seconds to wait for the instance to become ready
+
+        Raises:
+            MurkyWaterException when the blueprint has no volumes or cannot tell when it is ready, or when the
+            instance does not become ready in time
+        """
+        if not blueprint.readiness or len(blueprint.volume_bindings) == 0:
+            raise MurkyWaterException(msg=f'Blueprint {blueprint.name} does not support volume templates')
+        if any(vol.ephemeral for vol in blueprint.volume_bindings):
+            raise MurkyWaterException(msg=f'Ephemeral volumes of {blueprint.name} cannot be templated')
+        key = blueprint.template_key()
+        volumes = [VolumeBinding(name=self.template_volume(blueprint, vol), mount_point=vol.mount_point)
+                   for vol in blueprint.volume_bindings]
+        for vol in volumes:
+            self.volume_create(vol.name, {LABEL_TEMPLATE: key})
+        name = f'{TEMPLATE_PREFIX}-{key}'
+        instance = self.apply(blueprint.variant(volume_bindings=volumes, port_bindings=[]), name, template=False)
+        try:
+            if not self.instance_wait(name, blueprint.readiness, timeout):
+                raise MurkyWaterException(msg=f'Template instance {name} did not become ready within {timeout}s')
+        except MurkyWaterException:
+            instance.volume_bindings = volumes
+            self.instance_remove(instance)
+            raise
+        instance.volume_bindings = []
+        self.instance_remove(instance)
+
+    def template_remove(self, blueprint: Blueprint):
+        for vol in blueprint.volume_bindings:
+            self.volume_remove(self.template_volume(blueprint, vol))
+
+    def template_clone(self, blueprint: Blueprint, targets: typing.Optional[typing.List[str]] = None) -> bool:
+        """
+        Clone the volume template of a blueprint into the volumes of a new instance, concurrently. Nothing is cloned
+        when there is no complete template or when any of the instance volumes exists already, since existing data
+        always takes precedence
+        Args:
+            blueprint: The blueprint of the new instance
+            targets: The names of the volumes to clone into, in the order of the blueprint volume bindings. Defaults
+                to the names of the blueprint volume bindings
+
+        Returns:
+            True when the instance volumes were cloned from the template, False otherwise
+        """
+        if not blueprint.readiness or len(blueprint.volume_bindings) == 0 or \
+                any(vol.ephemeral for vol in blueprint.volume_bindings):
+            return False
+        targets = targets or [vol.name for vol in blueprint.volume_bindings]
+        templates = {self.template_volume(blueprint, vol): target
+                     for vol, target in zip(blueprint.volume_bindings, targets)}
+        present = self.volumes_present([*templates.keys(), *templates.values()])
+        if any(template not in present for template in templates) or any(vol in present for vol in templates.values()):
+            return False
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(templates)) as pool:
+            for clone in [pool.submit(self.volume_clone, source, target) for source, target in templates.items()]:
+                clone.result()
+        return True
+
+    def execute(self, args: typing.List[str], check: bool = True) -> subprocess.CompletedProcess:
+        return self._execute(self._executable, args, check)
+
+    def stream(self, args: typing.List[str]) -> typing.Iterator[str]:
+        return self._stream(self._executable, args)
+
+    def redirect(self,
+                 args: typing.List[str],
+                 stdin: typing.Optional[typing.BinaryIO] = None,
+                 stdout: typing.Optional[typing.BinaryIO] = None):
+        return self._redirect(self._executable, args, stdin, stdout)
+
+    def read(self, args: typing.List[str], chunk_size: int) -> typing.Iterator[bytes]:
+        return self._read(self._executable, args, chunk_size)
+
+    def write(self, args: typing.List[str], chunks: typing.Iterable[bytes]) -> str:
+        return self._write(self._executable, args, chunks)
 
 
     # @abc.abstractmethod
-    # def instance_create(self, blueprint_instance: BlueprintInstance):
+    # def instance_create(self, instance: Instance):
     #     pass
     #
     # @abc.abstractmethod
-    # def instance_list(self, blueprint: typing.Optional[Blueprint] = None) -> typing.List[BlueprintInstance]:
+    # def instance_list(self, blueprint: typing.Optional[Blueprint] = None) -> typing.List[Instance]:
     #     pass
     #
     # @abc.abstractmethod
@@ -140,7 +477,7 @@ class Platform(CommandLineAware, CommandExecutor):
     #     pass
     #
     # @abc.abstractmethod
-    # def instance_remove(self, blueprint_instance: BlueprintInstance):
+    # def instance_remove(self, blueprint_instance: Instance):
     #     pass
 
 
@@ -0,0 +1,260 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import typing
+import pathlib
+import concurrent.futures
+import hashlib
+import json
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+
+from suikinkutsu.config import Configuration
+from suikinkutsu.constants import POOL_PREFIX, LABEL_POOL, DEFAULT_POOL_SIZE, DEFAULT_POOL_IDLE_TIMEOUT, \
+    DEFAULT_POOL_INTERVAL, DEFAULT_READINESS_TIMEOUT
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.models import Instance, PortBinding, VolumeBinding, Resources
+
+
+class InstancePool:
+    """
+    A pool of pre-started, ready and unassigned instances per blueprint configuration.
+
+    Pool members are named 'sk-pool-<blueprint>-<id>', carry the pool key of their blueprint as a label and publish
+    their ports on free host ports, since bindings cannot change once a container exists. An instance is claimed by
+    renaming a member, which is atomic, so concurrent claims never obtain the same member. Labels cannot change on a
+    running container either, so a claimed instance keeps its pool label and leaves the pool by its name alone. For
+    the same reason, only blueprints with the labels and ports the members were started for may claim them.
+
+    The size of each pool and when it was last used are kept in the configuration directory, so that claims can
+    trigger a refill in the background and an idle pool can be shrunk.
+    """
+
+    def __init__(self, config: Configuration, platform: 'Platform'):
+        self._config = config
+        self._platform = platform
+        self._state_path = pathlib.Path(config.config_dir.value) / 'pools.json'
+
+    @staticmethod
+    def key(blueprint: 'Blueprint') -> str:
+        """
+        The key of the pool of a blueprint. Members of a pool share the volume template of the blueprint as well as
+        its labels and the ports it publishes, none of which can change once a member is started. Blueprints which
+        differ in these, e.g. because of labels given on the command line or ports offset for replicas, do not share
+        a pool
+        Args:
+            blueprint: The blueprint to pool instances of
+
+        Returns:
+            The pool key
+        """
+        published = json.dumps([sorted(blueprint.labels.items()),
+                                sorted(port.to_mapping() for port in blueprint.port_bindings)])
+        return f'{blueprint.template_key()}-{hashlib.sha256(published.encode("UTF-8")).hexdigest()[:8]}'
+
+    @property
+    def state(self) -> typing.Dict[str, typing.Dict]:
+        if not self._state_path.exists():
+            return {}
+        return json.loads(self._state_path.read_text(encoding='UTF-8'))
+
+    def members(self, key: str) -> typing.List[str]:
+        return [name for name in self._platform.instances_labelled(LABEL_POOL, key)
+                if name.startswith(f'{POOL_PREFIX}-')]
+
+    def fill(self,
+             blueprint: 'Blueprint',
+             size: typing.Optional[int] = None,
+             entry: typing.Optional[str] = None) -> typing.List[str]:
+        """
+        Start pool members concurrently until the pool has the desired size, and wait for them to become ready
+        Args:
+            blueprint: The blueprint to pool instances of
+            size: The desired pool size. Defaults to the size the pool was last filled to
+            entry: The recipe entry or blueprint name which resolves to the blueprint, used to refill the pool later
+
+        Returns:
+            The names of the started members
+        """
+        if not blueprint.readiness:
+            raise MurkyWaterException(msg=f'Blueprint {blueprint.name} does not support pooling')
+        key = self.key(blueprint)
+        previous = self.state.get(key, {})
+        size = size if size is not None else previous.get('size', DEFAULT_POOL_SIZE)
+        self._update(key,
+                     blueprint=blueprint.name,
+                     entry=entry or previous.get('entry') or blueprint.name,
+                     size=size,
+                     last_used=previous.get('last_used') or time.time())
+        missing = size - len(self.members(key))
+        if missing <= 0:
+            return []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=missing) as pool:
+            return [start.result() for start in [pool.submit(self._start, blueprint) for _ in range(missing)]]
+
+    def claim(self, blueprint: 'Blueprint', name: str, refill: bool = True) -> typing.Optional[Instance]:
+        """
+        Claim a pool member as a new instance
+        Args:
+            blueprint: The blueprint of the new instance
+            name: The name of the new instance
+            refill: Refill the pool in the background after claiming a member
+
+        Returns:
+            The claimed instance, or None if the pool has no members. It publishes its ports on the free host ports
+            it was started with, rather than those of the blueprint
+        """
+        key = self.key(blueprint)
+        if key not in self.state:
+            return None
+        self._update(key, last_used=time.time())
+        for member in self.members(key):
+            try:
+                self._platform.instance_rename(member, name)
+            except MurkyWaterException:
+                # Claimed concurrently
+                continue
+            if not self._platform.instance_wait(name, blueprint.readiness, DEFAULT_READINESS_TIMEOUT):
+                raise MurkyWaterException(msg=f'Pooled instance {name} did not become ready')
+            # Members are started without the resource controls of the claiming blueprint, e.g. an allocated cpuset
+            self._platform.instance_update(name, blueprint.resources)
+            blueprint.adopt(self._platform, name)
+            if refill:
+                self.refill_in_background(key)
+            return self._platform.instance_get(name)
+        return None
+
+    def drain(self, key: str, forget: bool = True) -> int:
+        """
+        Remove all members of a pool, along with their volumes
+        Args:
+            key: The pool key
+            forget: Also forget the size of the pool, rather than keeping it to refill it on demand
+
+        Returns:
+            The number of removed members
+        """
+        members = self.members(key)
+        if len(members) > 0:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(members)) as pool:
+                for removal in [pool.submit(self._remove, member) for member in members]:
+                    removal.result()
+        if forget:
+            state = self.state
+            state.pop(key, None)
+            self._save(state)
+        return len(members)
+
+    def serve(self,
+              blueprint: 'Blueprint',
+              size: int = DEFAULT_POOL_SIZE,
+              entry: typing.Optional[str] = None,
+              idle_timeout: float = DEFAULT_POOL_IDLE_TIMEOUT,
+              interval: float = DEFAULT_POOL_INTERVAL,
+              progress: typing.Optional[typing.Callable[[str], None]] = None):
+        """
+        Keep a pool at its desired size until interrupted. A pool that has not been claimed from within the idle
+        timeout is drained, and filled again once it is claimed from
+        Args:
+            blueprint: The blueprint to pool instances of
+            size: The desired pool size
+            entry: The recipe entry or blueprint name which resolves to the blueprint
+            idle_timeout: The number of seconds without claims after which the pool is drained
+            interval: The number of seconds between checks
+            progress: Optional callback receiving messages about changes to the pool
+        """
+        key = self.key(blueprint)
+        self.fill(blueprint, size, entry)
+        while True:
+            idle = time.time() - self.state.get(key, {}).get('last_used', 0)
+            if idle > idle_timeout:
+                drained = self.drain(key, forget=False)
+                if drained > 0 and progress:
+                    progress(f'Drained {drained} members of idle pool {key}')
+            else:
+                started = self.fill(blueprint, size, entry)
+                if len(started) > 0 and progress:
+                    progress(f'Started {", ".join(started)} for pool {key}')
+            time.sleep(interval)
+
+    def refill_in_background(self, key: str):
+        """
+        Refill a pool in a detached process, so the caller does not wait for new members to become ready
+        """
+        cmd = [sys.executable, '-m', 'suikinkutsu.cli',
+               '-c', str(self._config.config_file.value),
+               '-d', str(self._config.config_dir.value),
+               '-r', str(self._config.recipe_file.value),
+               '-p', self._platform.name,
+               'pool', 'fill', '-b', self.state[key]['entry']]
+        subprocess.Popen(cmd,  # pylint: disable=consider-using-with
+                         stdin=subprocess.DEVNULL,
+                         stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+
+    def _start(self, blueprint: 'Blueprint') -> str:
+        key = self.key(blueprint)
+        name = f'{POOL_PREFIX}-{blueprint.name}-{secrets.token_hex(4)}'
+        volumes = [VolumeBinding(name=f'{name}-{vol.name}',
+                                 mount_point=vol.mount_point,
+                                 ephemeral=vol.ephemeral,
+                                 size=vol.size)
+                   for vol in blueprint.volume_bindings]
+        ports = [PortBinding(host_port=None,
+                             container_port=port.container_port,
+                             host_ip=port.host_ip,
+                             protocol=port.protocol)
+                 for port in blueprint.port_bindings]
+        self._platform.template_clone(blueprint, [vol.name for vol in volumes])
+        instance = self._platform.apply(blueprint.variant(volume_bindings=volumes,
+                                                          port_bindings=ports,
+                                                          labels={LABEL_POOL: key},
+                                                          resources=Resources(shm_size=blueprint.resources.shm_size)),
+                                        name,
+                                        template=False)
+        if not self._platform.instance_wait(name, blueprint.readiness, DEFAULT_READINESS_TIMEOUT):
+            self._platform.instance_remove(instance)
+            raise MurkyWaterException(msg=f'Pool member {name} did not become ready')
+        return name
+
+    def _remove(self, name: str):
+        instance = self._platform.instance_get(name)
+        if instance:
+            self._platform.instance_remove(instance)
+
+    def _update(self, key: str, **values):
+        state = self.state
+        state[key] = {**state.get(key, {}), **values}
+        self._save(state)
+
+    def _save(self, state: typing.Dict):
+        self._state_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(mode='w', dir=self._state_path.parent, prefix='.', encoding='UTF-8',
+                                         delete=False) as temporary:
+            json.dump(state, temporary, indent=2)
+        os.replace(temporary.name, self._state_path)
@@ -0,0 +1,251 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import typing
+import pathlib
+import collections
+import contextlib
+import cProfile
+import datetime
+import functools
+import inspect
+import os
+import sys
+import threading
+import tracemalloc
+
+from suikinkutsu.constants import DEFAULT_PROFILE_INTERVAL, DEFAULT_MEMORY_TOP
+
+if typing.TYPE_CHECKING:
+    from suikinkutsu.config import Configuration
+
+
+class StackSampler(threading.Thread):
+    """
+    Periodically sample the stacks of all other threads. cProfile only keeps caller/callee pairs, which is not enough
+    to reconstruct the stacks a flamegraph is drawn from
+    """
+
+    def __init__(self, interval: float = DEFAULT_PROFILE_INTERVAL):
+        super().__init__(name='sk-stack-sampler', daemon=True)
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._stacks: typing.Counter[str] = collections.Counter()
+
+    def run(self):
+        while not self._stopped.wait(self._interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():   # pylint: disable=protected-access
+                if ident != self.ident:
+                    self._stacks[self._collapse(names.get(ident, str(ident)), frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        names.append(thread_name)
+        return ';'.join(reversed(names))
+
+    @property
+    def stacks(self) -> typing.Dict[str, int]:
+        """
+        The sampled stacks, root first and separated by semicolons, and how often each was sampled
+        """
+        return dict(self._stacks)
+
+    def write(self, path: pathlib.Path):
+        """
+        Write the sampled stacks in the collapsed format understood by flamegraph tools (e.g. flamegraph.pl,
+        speedscope or inferno), one stack and its sample count per line
+        """
+        with open(path, 'w', encoding='UTF-8') as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f'{stack} {count}\n')
+
+
+class Profiler:
+    """
+    Profile a command. A deterministic profile is written as a .pstats file for pstats, snakeviz and the like, and the
+    sampled stacks of all threads are written as a .folded file for flamegraph tools. Both are kept in the 'profiles'
+    directory of the configuration directory
+    """
+
+    def __init__(self, config: 'Configuration', name: str, interval: float = DEFAULT_PROFILE_INTERVAL):
+        stem = f'{name}-{datetime.datetime.now().strftime("%Y%m%d%H%M%S")}'
+        self._path = pathlib.Path(config.config_dir.value) / 'profiles'
+        self._pstats_path = self._path / f'{stem}.pstats'
+        self._stacks_path = self._path / f'{stem}.folded'
+        self._profiler = cProfile.Profile()
+        self._sampler = StackSampler(interval)
+
+    @property
+    def pstats_path(self) -> pathlib.Path:
+        return self._pstats_path
+
+    @property
+    def stacks_path(self) -> pathlib.Path:
+        return self._stacks_path
+
+    def __enter__(self) -> 'Profiler':
+        self._path.mkdir(parents=True, exist_ok=True)
+        self._sampler.start()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._profiler.disable()
+        self._sampler.stop()
+        self._profiler.dump_stats(self._pstats_path)
+        self._sampler.write(self._stacks_path)
+
+
+class MemoryProfiler:
+    """
+    Trace the memory allocated by sections of the code with tracemalloc. Each section records the memory it still
+    holds on return, its peak and the source lines which allocated the most. Sections nested within another one are
+    accounted to the outermost section
+    """
+
+    def __init__(self, top: int = DEFAULT_MEMORY_TOP):
+        self._top = top
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._sections: typing.Dict[str, typing.Dict] = {}
+        self._filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                         tracemalloc.Filter(False, __file__),
+                         tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                         tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')]
+
+    def __enter__(self) -> 'MemoryProfiler':
+        tracemalloc.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def section(self, name: str) -> typing.Iterator[None]:
+        with self._lock:
+            self._depth += 1
+            outermost = self._depth == 1
+        if not outermost or not tracemalloc.is_tracing():
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._depth -= 1
+            return
+        before = tracemalloc.take_snapshot().filter_traces(self._filters)
+        tracemalloc.reset_peak()
+        current_before, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(self._filters)
+            with self._lock:
+                self._depth -= 1
+                section = self._sections.setdefault(name, {'calls': 0, 'retained': 0, 'peak': 0,
+                                                           'sites': collections.Counter(),
+                                                           'blocks': collections.Counter()})
+                section['calls'] += 1
+                section['retained'] += current - current_before
+                section['peak'] = max(section['peak'], peak - current_before)
+                for stat in after.compare_to(before, 'lineno'):
+                    if stat.size_diff > 0:
+                        site = f'{self._module_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}'
+                        section['sites'][site] += stat.size_diff
+                        section['blocks'][site] += stat.count_diff
+
+    @staticmethod
+    def _module_path(filename: str) -> str:
+        """
+        Shorten the file name to the path it is imported by, e.g. 'rich/table.py'
+        """
+        for entry in sorted((entry for entry in sys.path if entry), key=len, reverse=True):
+            if filename.startswith(entry + os.sep):
+                return filename[len(entry) + 1:]
+        return filename
+
+    @property
+    def sections(self) -> typing.Dict[str, typing.Dict]:
+        """
+        The sections, with their number of calls, the bytes they retained and their peak over all calls, and the
+        bytes and blocks retained per allocation site
+        """
+        return self._sections
+
+    def top_sites(self, name: str) -> typing.List[typing.Tuple[str, int, int]]:
+        """
+        The allocation sites of a section which retained the most memory
+        Returns:
+            A list of sites ('file:line'), their bytes and their number of blocks
+        """
+        section = self._sections[name]
+        return [(site, size, section['blocks'][site]) for site, size in section['sites'].most_common(self._top)]
+
+
+_memory_profiler: typing.Optional[MemoryProfiler] = None
+
+
+def install_memory_profiler(profiler: typing.Optional[MemoryProfiler]):
+    """
+    Install the memory profiler which traces the memory sections of this process, or remove it
+    """
+    global _memory_profiler   # pylint: disable=global-statement
+    _memory_profiler = profiler
+
+
+def memory_section(name: str):
+    """
+    Decorate a function as a section traced by the installed memory profiler. Without a profiler, the function is
+    called directly.
+
+    A generator would be resumed from within whichever section consumes it, and would therefore be accounted to its
+    consumer. When traced, generators are run to completion within their own section as they are called instead
+    """
+    def decorator(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                if _memory_profiler is None:
+                    return fn(*args, **kwargs)
+                with _memory_profiler.section(name):
+                    return iter(list(fn(*args, **kwargs)))
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _memory_profiler is None:
+                return fn(*args, **kwargs)
+            with _memory_profiler.section(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,255 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import re
+import time
+import threading
+import typing
+
+from suikinkutsu.constants import DEFAULT_PROGRESS_INTERVAL
+
+# A layer status line of an image pull, e.g. 'a1b2c3d4e5f6: Downloading  12.3MB/45.6MB'. Byte counts are only
+# reported by some platforms
+PULL_LAYER_PATTERN = re.compile(r'^(?P<layer>[0-9a-f]{12}): (?P<status>[A-Za-z ]+?)'
+                                r'(?:\s.*?(?P<current>[\d.]+)\s?(?P<current_unit>[kMG]?B)'
+                                r'/(?P<total>[\d.]+)\s?(?P<total_unit>[kMG]?B))?\s*$')
+PULL_UNITS = {'B': 1, 'kB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3}
+PULL_LAYER_DONE = {'Pull complete', 'Already exists'}
+
+
+def human_size(size: float) -> str:
+    """
+    Format a number of bytes for humans, e.g. '12.3 MiB'
+    """
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if abs(size) < 1024 or unit == 'GiB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GiB'
+
+
+class ProgressTask(object):
+    """
+    The progress of a single task, e.g. an instance being cooked or a volume being saved
+    """
+
+    __slots__ = ('_key', '_state', '_completed', '_total', '_detail', '_started')
+
+    def __init__(self, key: str):
+        self._key = key
+        self._state = 'pending'
+        self._completed = 0
+        self._total = None
+        self._detail = None
+        self._started = time.monotonic()
+
+    def update(self,
+               state: typing.Optional[str] = None,
+               completed: typing.Optional[int] = None,
+               advance: typing.Optional[int] = None,
+               total: typing.Optional[int] = None,
+               detail: typing.Optional[str] = None) -> bool:
+        """
+        Update the task
+        Returns:
+            True if the state or detail of the task changed, rather than just its byte count
+        """
+        changed = (state is not None and state != self._state) or (detail is not None and detail != self._detail)
+        if state is not None and state != self._state:
+            # Throughput and details are specific to a state
+            self._completed = 0
+            self._total = None
+            self._detail = None
+            self._started = time.monotonic()
+        self._state = state if state is not None else self._state
+        self._detail = detail if detail is not None else self._detail
+        self._total = total if total is not None else self._total
+        if completed is not None:
+            self._completed = completed
+        self._completed += advance or 0
+        return changed
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def completed(self) -> int:
+        return self._completed
+
+    @property
+    def total(self) -> typing.Optional[int]:
+        return self._total
+
+    @property
+    def detail(self) -> typing.Optional[str]:
+        return self._detail
+
+    @property
+    def rate(self) -> float:
+        """
+        The throughput within the current state, in bytes per second
+        """
+        elapsed = time.monotonic() - self._started
+        return self._completed / elapsed if elapsed > 0 else 0.0
+
+    def transfer(self) -> str:
+        """
+        The bytes processed within the current state and the throughput, e.g. '12.3 MiB/45.6 MiB (3.2 MiB/s)', or an
+        empty string if no bytes were processed
+        """
+        if not self.completed:
+            return ''
+        total = f'/{human_size(self.total)}' if self.total else ''
+        return f'{human_size(self.completed)}{total} ({human_size(self.rate)}/s)'
+
+    def describe(self) -> str:
+        line = f'{self.key}: {self.state}'
+        if self.completed:
+            line += f' {self.transfer()}'
+        if self.detail:
+            line += f' - {self.detail}'
+        return line
+
+
+class Progress(object):
+    """
+    Tracks the tasks of a long-running operation, e.g. the instances of a recipe while it is cooked. This
+    implementation reports in plain lines: changes of state right away, byte counts at most once per interval. Outputs
+    which can do better render the progress live instead
+    """
+
+    def __init__(self,
+                 title: str,
+                 write: typing.Callable[[str], None],
+                 interval: float = DEFAULT_PROGRESS_INTERVAL):
+        self._title = title
+        self._write = write
+        self._interval = interval
+        self._lock = threading.RLock()
+        self._tasks: typing.Dict[str, ProgressTask] = {}
+        self._reported = 0.0
+
+    def __enter__(self) -> 'Progress':
+        self._write(self._title)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def update(self,
+               key: str,
+               state: typing.Optional[str] = None,
+               completed: typing.Optional[int] = None,
+               advance: typing.Optional[int] = None,
+               total: typing.Optional[int] = None,
+               detail: typing.Optional[str] = None) -> None:
+        """
+        Update a task, which is added if it is not yet known
+        Args:
+            key: The task, e.g. an instance name
+            state: The new state of the task, e.g. 'pulling'
+            completed: The number of bytes processed so far within this state
+            advance: The number of bytes processed since the last update
+            total: The total number of bytes to process within this state, if known
+            detail: A note on the state, e.g. what the task is blocked by
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            created = task is None
+            if created:
+                task = self._tasks[key] = ProgressTask(key)
+            changed = task.update(state, completed, advance, total, detail)
+            self._render(task, changed or created)
+
+    def track(self, key: str, chunks: typing.Iterable[bytes], state: str) -> typing.Iterator[bytes]:
+        """
+        Count the bytes of a stream towards a task as they pass through
+        Args:
+            key: The task
+            chunks: The stream
+            state: The state of the task while the stream is consumed
+
+        Returns:
+            The stream
+        """
+        self.update(key, state=state)
+        for chunk in chunks:
+            self.update(key, advance=len(chunk))
+            yield chunk
+
+    @property
+    def tasks(self) -> typing.List[ProgressTask]:
+        with self._lock:
+            return list(self._tasks.values())
+
+    def _render(self, task: ProgressTask, changed: bool) -> None:
+        """
+        Report an updated task
+        Args:
+            task: The task which was updated
+            changed: Whether the state or detail of the task changed, rather than just its byte count
+        """
+        now = time.monotonic()
+        if changed or now - self._reported >= self._interval:
+            self._reported = now
+            self._write(task.describe())
+
+
+class PullProgress(object):
+    """
+    Follows the status lines of an image pull, layer by layer
+    """
+
+    def __init__(self):
+        self._layers: typing.Dict[str, str] = {}
+        self._bytes: typing.Dict[str, typing.Tuple[int, int]] = {}
+
+    def feed(self, line: str) -> typing.Dict[str, typing.Any]:
+        """
+        Take note of a status line of the pull
+        Args:
+            line: The status line
+
+        Returns:
+            The arguments to update a progress task with
+        """
+        match = PULL_LAYER_PATTERN.match(line.strip())
+        if match is None:
+            return {}
+        layer = match.group('layer')
+        self._layers[layer] = match.group('status')
+        if match.group('current'):
+            self._bytes[layer] = (int(float(match.group('current')) * PULL_UNITS[match.group('current_unit')]),
+                                  int(float(match.group('total')) * PULL_UNITS[match.group('total_unit')]))
+        elif match.group('status') in PULL_LAYER_DONE and layer in self._bytes:
+            self._bytes[layer] = (self._bytes[layer][1], self._bytes[layer][1])
+        done = sum(1 for status in self._layers.values() if status in PULL_LAYER_DONE)
+        update = {'detail': f'{done}/{len(self._layers)} layers'}
+        if self._bytes:
+            update['completed'] = sum(current for current, _ in self._bytes.values())
+            update['total'] = sum(total for _, total in self._bytes.values())
+        return update
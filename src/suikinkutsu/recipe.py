@@ -20,11 +20,20 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
-from typing import Dict, Type
+import hashlib
+import os
+import pathlib
+import tempfile
+from typing import Dict, List, Optional, Tuple, Type
 import yaml
+from pydantic import ValidationError
+from suikinkutsu import __version__, yamlstream
 from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.config import Configuration
+from suikinkutsu.profiling import memory_section
+from suikinkutsu.lockfile import LockFile
 from suikinkutsu.blueprints import Blueprint
-from suikinkutsu.schema import RecipeSchema
+from suikinkutsu.schema import RecipeSchema, BlueprintSchema, LayerSchema, LayeredSchema
 
 
 class Recipe:
@@ -32,23 +41,198 @@ class Recipe:
     A recipe
     """
 
-    def __init__(self, runtime):
-        self._blueprints: Dict[str, Type[Blueprint]] = {}
-        if not runtime.recipe_file.exists():
+    @memory_section('recipe load')
+    def __init__(self, config: Configuration, blueprints: Dict[str, Blueprint], lockfile: LockFile):
+        self._layers: Dict[str, Tuple[Type[Blueprint], LayeredSchema, Optional[int]]] = {}
+        self._blueprints: Optional[Dict[str, Blueprint]] = None
+        self._lockfile = lockfile
+        recipe_file = pathlib.Path(config.recipe_file.value)
+        if not recipe_file.exists():
             return
+        self._cache_path = pathlib.Path(config.config_dir.value) / 'recipes'
+        parsed_recipe = self._compile(recipe_file)
+        defaults = parsed_recipe.defaults or {}
+        expansions = {name: list(bp_schema.expand(name)) for name, bp_schema in parsed_recipe.blueprints.items()}
+        instances = [instance for expansion in expansions.values() for instance, _ in expansion]
+        if len(instances) != len(set(instances)):
+            duplicates = sorted({instance for instance in instances if instances.count(instance) > 1})
+            raise MurkyWaterException(msg=f'Recipe declares {", ".join(duplicates)} more than once')
+        for name, bp_schema in parsed_recipe.blueprints.items():
+            if bp_schema.kind not in blueprints:
+                raise MurkyWaterException(msg=f'Blueprint {bp_schema.kind} for instance {name} is not available')
+            clz = blueprints[bp_schema.kind].__class__
+            layers = LayeredSchema(defaults.get(bp_schema.kind), bp_schema)
+            dependencies = layers.get('depends_on') or []
+            for index, (instance, parameters) in enumerate(expansions[name]):
+                rewired = self._rewire(dependencies, expansions, index, len(expansions[name]))
+                if not parameters and rewired == dependencies:
+                    self._layers[instance] = (clz, layers, None)
+                    continue
+                settings = {key: parameters[key] for key in BlueprintSchema.MATRIX_SETTINGS if key in parameters}
+                if rewired != dependencies:
+                    settings['depends_on'] = rewired
+                self._layers[instance] = (clz,
+                                          LayeredSchema(defaults.get(bp_schema.kind),
+                                                        bp_schema,
+                                                        LayerSchema.model_construct(**settings) if settings else None,
+                                                        parameters=parameters),
+                                          index if parameters else None)
+
+    def override(self, layer: LayerSchema) -> None:
+        """
+        Override the settings of every instance of this recipe, e.g. from the command line
+        Args:
+            layer: The overriding settings
+        """
+        self._layers = {name: (clz, layers.new_child(layer), index)
+                        for name, (clz, layers, index) in self._layers.items()}
+        self._blueprints = None
+
+    @staticmethod
+    def _rewire(dependencies: List[str],
+                expansions: Dict[str, List[Tuple[str, Dict[str, str]]]],
+                index: int,
+                count: int) -> List[str]:
+        """
+        Point the dependencies of an instance at the instances expanded from the entries it depends on. It depends on
+        the instance of the same index of an entry expanded into as many instances as its own entry, e.g. per-shard
+        applications on per-shard databases, and on all instances of any other entry
+        Args:
+            dependencies: The dependencies as declared in the recipe
+            expansions: The instance names and parameters of every recipe entry
+            index: The index of the instance amongst the instances of its entry
+            count: The number of instances of its entry
+
+        Returns:
+            The names of the instances depended on
+        """
+        rewired = []
+        for dependency in dependencies:
+            targets = [instance for instance, _ in expansions.get(dependency, [(dependency, {})])]
+            rewired.extend([targets[index]] if len(targets) == count else targets)
+        return rewired
+
+    def _compile(self, recipe_file: pathlib.Path) -> RecipeSchema:
+        """
+        Parse and validate a recipe file, or load it from the compiled recipe cache if it has not changed since.
+        The cache keeps the validated recipe as JSON, keyed by the hash of the recipe file and the version of
+        suikinkutsu that validated it. There is one cache entry per recipe file, which is replaced when it changes
+        Args:
+            recipe_file: The recipe file
+
+        Returns:
+            The validated recipe
+
+        Raises:
+            MurkyWaterException when the recipe is not valid YAML or does not match the recipe schema
+        """
+        content = recipe_file.read_bytes()
+        key = hashlib.sha256(__version__.encode('UTF-8') + b'\0' + content).hexdigest()
+        cache_file = self._cache_path / \
+            f'{hashlib.sha256(str(recipe_file.resolve()).encode("UTF-8")).hexdigest()[:16]}.json'
+        try:
+            cached_key, compiled = cache_file.read_bytes().split(b'\n', 1)
+            if cached_key.decode('UTF-8') == key:
+                return RecipeSchema.model_validate_json(compiled)
+        except (OSError, ValueError):
+            # No usable cache entry, e.g. because it is missing, truncated or was written by an older schema
+            pass
+
+        try:
+            parsed_recipe = RecipeSchema.model_validate(yamlstream.load(content) or {'blueprints': {}})
+        except yaml.YAMLError as ye:
+            raise MurkyWaterException(msg=f'Recipe {recipe_file} is not valid YAML: {ye}') from ye
+        except ValidationError as ve:
+            errors = '; '.join(f'{".".join(str(loc) for loc in error["loc"])}: {error["msg"]}' for error in ve.errors())
+            raise MurkyWaterException(msg=f'Recipe {recipe_file} is invalid: {errors}') from ve
         try:
-            with open(runtime.recipe_file, 'r', encoding='UTF-8') as r:
-                raw_recipe = yaml.safe_load(r)
-            parsed_recipe = RecipeSchema.parse_obj(raw_recipe)
-            for name, bp_schema in parsed_recipe.blueprints.items():
-                if bp_schema.kind not in runtime.available_blueprints:
-                    raise MurkyWaterException(msg=f'Blueprint {bp_schema.kind} for instance {name} is not available')
-                blueprint_instance = runtime.available_blueprints[bp_schema.kind](name, bp_schema)
-                self.blueprints[name] = blueprint_instance
-        except Exception:
+            self._cache_path.mkdir(parents=True, exist_ok=True)
+            compiled = parsed_recipe.model_dump_json(exclude_none=True).encode('UTF-8')
+            with tempfile.NamedTemporaryFile(dir=self._cache_path, prefix='.', delete=False) as temporary:
+                temporary.write(key.encode('UTF-8') + b'\n' + compiled)
+            os.replace(temporary.name, cache_file)
+        except OSError:
+            # The cache only saves time, the recipe is usable without it
             pass
-            #console.print_exception()
+        return parsed_recipe
 
     @property
-    def blueprints(self) -> Dict[str, Type[Blueprint]]:
+    def blueprints(self) -> Dict[str, Blueprint]:
+        """
+        The blueprints of this recipe by instance name. They are configured from their layers on first use
+        """
+        if self._blueprints is None:
+            self._blueprints = {}
+            for name, (clz, layers, index) in self._layers.items():
+                blueprint = clz()
+                try:
+                    blueprint.configure(layers.materialise())
+                    self._blueprints[name] = blueprint if index is None else blueprint.replica(name, index)
+                except MurkyWaterException as mwe:
+                    raise MurkyWaterException(code=mwe.code, msg=f'Recipe entry {name} is invalid: {mwe.msg}') from mwe
         return self._blueprints
+
+    @property
+    def lockfile(self) -> LockFile:
+        return self._lockfile
+
+    def ordered(self) -> List[Tuple[str, Blueprint]]:
+        """
+        Order the blueprints of this recipe such that every blueprint follows the blueprints it depends on.
+        Dependencies on instances outside of the recipe are assumed to exist already
+
+        Returns:
+            A list of instance name and blueprint tuples
+
+        Raises:
+            MurkyWaterException when the dependencies of the recipe are circular
+        """
+        blueprints = self.blueprints
+        ordered: List[Tuple[str, Blueprint]] = []
+        visiting = set()
+        visited = set()
+
+        def visit(name: str):
+            if name in visited or name not in blueprints:
+                return
+            if name in visiting:
+                raise MurkyWaterException(msg=f'Recipe has a circular dependency involving {name}')
+            visiting.add(name)
+            for dependency in blueprints[name].depends_on:
+                visit(dependency)
+            visiting.remove(name)
+            visited.add(name)
+            ordered.append((name, blueprints[name]))
+
+        for name in blueprints:
+            visit(name)
+        return ordered
+
+    def lock(self, platform: 'Platform', update: bool = False) -> LockFile:
+        """
+        Resolve the image of every blueprint in this recipe to a content digest and persist them in the lock file.
+        Images which are not yet present on the platform are pulled by their tag in order to resolve them
+        Args:
+            platform: The platform to resolve the image digests on
+            update: Re-resolve images which are already locked
+
+        Returns:
+            The updated lock file
+
+        Raises:
+            MurkyWaterException when an image cannot be resolved to a digest
+        """
+        for blueprint in self.blueprints.values():
+            image = f'{blueprint.image}:{blueprint.version}'
+            if self._lockfile.get(image) and not update:
+                continue
+            digest = None if update else platform.image_digest(image)
+            if digest is None:
+                for _ in platform.image_pull(image):
+                    pass
+                digest = platform.image_digest(image)
+            if digest is None:
+                raise MurkyWaterException(msg=f'Unable to resolve {image} to a digest')
+            self._lockfile.add(image, digest)
+        self._lockfile.save()
+        return self._lockfile
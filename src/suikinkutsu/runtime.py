@@ -23,11 +23,16 @@
 import typing
 import argparse
 
-from suikinkutsu.outputs import Output
-from suikinkutsu.blueprints import Blueprint, BlueprintInstance
+from suikinkutsu.outputs import Output, OUTPUTS, output_class
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.models import Instance
+from suikinkutsu.blueprints import Blueprint
 from suikinkutsu.platforms import Platform
 from suikinkutsu.config import Configuration
 from suikinkutsu.secretsfile import SecretsFile
+from suikinkutsu.lockfile import LockFile
+from suikinkutsu.journal import Journal
+from suikinkutsu.recipe import Recipe
 from suikinkutsu.behaviours import CommandLineAware
 
 
@@ -40,9 +45,6 @@ class Runtime(CommandLineAware):
         self._config = config
         self._secreta = secrets
 
-        self._outputs = {}
-        for output in Output.__subclasses__():
-            self._outputs[output.name] = output(self._config)
         self._output = None
 
         self._platforms = {}
@@ -52,20 +54,29 @@ class Runtime(CommandLineAware):
 
         self._blueprints = {}
         for blueprint in Blueprint.__subclasses__():
-            self._blueprints[blueprint.name] = blueprint(self._config)
+            self._blueprints[blueprint.name] = blueprint()
 
-        self._instances = {}
+        self._lockfile = None
+        self._journal = None
+        self._recipe = None
 
     def cli_assess(self, args: argparse.Namespace):
-        if self._config.output.value not in self._outputs:
+        output = output_class(self._config.output.value)
+        if output is None:
             print(f'ERROR: Configured output {self._config.output.value} is not available')
             return 1
-        self._output = self._outputs.get(self._config.output.value)
+        self._output = output(self._config)
 
-        if self._config.platform.value not in self._platforms:
+        self._platform = self._platforms.get(self._config.platform.value)
+        if self._platform is None or not self._platform.available:
             self._output.error(f'Configured platform {self._config.platform.value} is not available')
             return 1
-        self._platform = self._platforms.get(self._config.platform.value)
+
+        self._lockfile = LockFile(self._config)
+        self._journal = Journal(self._config)
+        for platform in self._platforms.values():
+            platform.lockfile = self._lockfile
+            platform.journal = self._journal
 
     @property
     def config(self) -> Configuration:
@@ -76,8 +87,11 @@ class Runtime(CommandLineAware):
         return self._secreta
 
     @property
-    def outputs(self) -> typing.Dict[str, Output]:
-        return self._outputs
+    def outputs(self) -> typing.List[str]:
+        """
+        The names of the available outputs. Only the chosen output is imported
+        """
+        return list(OUTPUTS)
 
     @property
     def output(self) -> Output:
@@ -95,27 +109,68 @@ class Runtime(CommandLineAware):
     def blueprints(self) -> typing.Dict[str, Blueprint]:
         return self._blueprints
 
-    def instance_remove(self, blueprint_instance: BlueprintInstance):
-        blueprint_instance.platform.instance_remove(blueprint_instance)
-        self._instances.remove(blueprint_instance)
+    @property
+    def lockfile(self) -> LockFile:
+        return self._lockfile
+
+    @property
+    def journal(self) -> Journal:
+        return self._journal
+
+    @property
+    def recipe(self) -> Recipe:
+        if self._recipe is None:
+            self._recipe = Recipe(self._config, self._blueprints, self._lockfile)
+        return self._recipe
+
+    def instance_remove(self, instance: Instance):
+        """
+        Remove an instance from the platform hosting it
+        Args:
+            instance: The instance to remove
+
+        Raises:
+            MurkyWaterException when there is no instance to remove
+        """
+        if instance is None:
+            raise MurkyWaterException(msg='There is no such instance to remove')
+        (instance.platform or self._platform).instance_remove(instance)
 
     def instance_list(self,
                       blueprint: typing.Optional[Blueprint] = None,
-                      platform: typing.Optional[Platform] = None) -> typing.List[BlueprintInstance]:
-        instances = self._instances
-        if platform:
-            instances = list(filter(lambda _: _.platform == platform, instances))
+                      platform: typing.Optional[Platform] = None) -> typing.List[Instance]:
+        """
+        List the instances we created
+        Args:
+            blueprint: Only list the instances of the same kind as this blueprint
+            platform: The platform to list the instances of, defaults to the current platform
+
+        Returns:
+            A list of instances
+        """
+        instances = (platform or self._platform).instances()
         if blueprint:
-            instances = list(filter(lambda _: _.blueprint == blueprint, instances))
+            instances = [i for i in instances if isinstance(i.blueprint, type(blueprint))]
         return instances
 
     def instance_get(self,
                      name: str,
                      blueprint: typing.Optional[Blueprint] = None,
-                     platform: typing.Optional[Platform] = None) -> typing.Optional[BlueprintInstance]:
-        instances = list(filter(lambda _: _.name == name,
-                                self.instance_list(blueprint, platform)))
-        return instances[0] if len(instances) > 0 else None
+                     platform: typing.Optional[Platform] = None) -> typing.Optional[Instance]:
+        """
+        Look up a single instance we created
+        Args:
+            name: The instance name
+            blueprint: Only consider an instance of the same kind as this blueprint
+            platform: The platform to look the instance up on, defaults to the current platform
+
+        Returns:
+            The instance or None if there is no such instance
+        """
+        instance = (platform or self._platform).instance_get(name)
+        if instance is None or (blueprint and not isinstance(instance.blueprint, type(blueprint))):
+            return None
+        return instance
 
     def _find_extensions(self, base):
         """
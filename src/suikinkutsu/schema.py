@@ -20,46 +20,175 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
-from typing import Optional, Dict, List
-from pydantic import BaseModel
+import itertools
+import re
+import string
+from collections import ChainMap
+from typing import Annotated, Any, ClassVar, Optional, Dict, Iterator, List, Tuple, Union
+from pydantic import BaseModel, Field, PositiveInt
 
 
-class BlueprintSchema(BaseModel):
+class VolumeSchema(BaseModel):
     """
-    A blueprint schema
+    A volume binding with options. A plain mount point is shorthand for a persistent volume
     """
-    platform: Optional[str]
-    image: Optional[str]
-    labels: Optional[Dict[str, str]]
-    volumes: Optional[Dict[str, str]]
-    environment: Optional[Dict[str, str]]
-    ports: Optional[Dict[str, str]]
-    depends_on: Optional[List[str]]
-
-    # TODO: This should be optimised
-    def merge_defaults(self, defaults: 'BlueprintSchema'):
-        self.platform = self.platform or defaults.platform
-        self.image = self.image or defaults.image
-        self.labels = self.labels or defaults.labels
-        for k, v in defaults.labels.items():
-            if k not in self.labels:
-                self.labels[k] = v
-        self.volumes = self.volumes or defaults.volumes
-        for k, v in defaults.volumes.items():
-            if k not in self.volumes:
-                self.volumes[k] = v
-        self.environment = self.environment or defaults.environment
-        for k, v in defaults.environment.items():
-            if k not in self.environment:
-                self.environment[k] = v
-        self.ports = self.ports or defaults.ports
-        for k, v in defaults.ports.items():
-            if k not in self.ports:
-                self.ports[k] = v
-        self.depends_on = self.depends_on or defaults.depends_on
+    mount_point: str
+    ephemeral: bool = False
+    size: Optional[str] = None
+
+
+class ResourcesSchema(BaseModel):
+    """
+    Resource controls of an instance
+    """
+    cpus: Optional[float] = None
+    cpu_shares: Optional[int] = None
+    memory: Optional[str] = None
+    cpuset: Optional[str] = None
+    shm_size: Optional[str] = None
+
+
+class LayerSchema(BaseModel):
+    """
+    Settings of a blueprint which may be given at any layer, i.e. as recipe defaults, for an instance of the recipe or
+    on the command line
+    """
+    platform: Optional[str] = None
+    image: Optional[str] = None
+    version: Optional[str] = None
+    labels: Optional[Dict[str, str]] = None
+    volumes: Optional[Dict[str, Union[str, VolumeSchema]]] = None
+    environment: Optional[Dict[str, str]] = None
+    ports: Optional[Dict[str, str]] = None
+    depends_on: Optional[List[str]] = None
+    resources: Optional[ResourcesSchema] = None
+
+
+class BlueprintSchema(LayerSchema):
+    """
+    A blueprint schema. An entry with replicas and/or a matrix of parameters is a template for several instances
+    """
+    kind: str
+    replicas: Optional[PositiveInt] = None
+    matrix: Optional[Dict[str, Annotated[List[Union[str, int]], Field(min_length=1)]]] = None
+
+    # Matrix parameters of these names set the corresponding setting of the instances
+    MATRIX_SETTINGS: ClassVar[Tuple[str, ...]] = ('platform', 'image', 'version')
+
+    def expand(self, name: str) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """
+        The instances of this entry, i.e. one for every replica of every combination of the matrix parameters, or just
+        the entry itself if it is no template. Instances are named after the entry, the parameters and the replica,
+        e.g. 'pg-15-0'
+        Args:
+            name: The name of this entry
+
+        Returns:
+            An iterator over the instance names and their parameters, which are the matrix parameters, the 'index' of
+            the instance amongst the instances of this entry and its 'name'
+        """
+        if self.replicas is None and self.matrix is None:
+            yield name, {}
+            return
+        keys = list(self.matrix or {})
+        index = 0
+        for combination in itertools.product(*[[str(value) for value in self.matrix[key]] for key in keys]):
+            for replica in range(self.replicas or 1):
+                suffix = [re.sub(r'[^A-Za-z0-9_.-]', '-', value) for value in combination]
+                if self.replicas is not None:
+                    suffix.append(str(replica))
+                instance = '-'.join([name, *suffix])
+                yield instance, {**dict(zip(keys, combination)), 'index': str(index), 'name': instance}
+                index += 1
 
 
 class RecipeSchema(BaseModel):
+    """
+    A recipe schema. Defaults are given by blueprint kind and apply to all instances of that kind
+    """
+    defaults: Optional[Dict[str, LayerSchema]] = None
     blueprints: Dict[str, BlueprintSchema]
 
 
+class LayeredSchema:
+    """
+    A view onto the layers configuring an instance, e.g. the recipe defaults for its kind, its recipe entry and
+    overrides from the command line. Later layers override earlier ones: settings are taken from the last layer
+    which sets them, and mappings (labels, volumes, environment, ports) and resources are merged by key. Nothing is
+    copied until the view is materialised, which happens at most once. Instances expanded from a template have
+    parameters, which are substituted for ${parameter} placeholders in the settings when the view is materialised
+    """
+
+    __slots__ = ('_layers', '_parameters', '_schema')
+
+    MAPPINGS = ('labels', 'volumes', 'environment', 'ports')
+
+    def __init__(self, *layers: Optional[LayerSchema], parameters: Optional[Dict[str, str]] = None):
+        self._layers = tuple(layer for layer in layers if layer is not None)
+        self._parameters = parameters or {}
+        self._schema: Optional[BlueprintSchema] = None
+
+    def new_child(self, layer: LayerSchema) -> 'LayeredSchema':
+        """
+        A view with an additional layer on top of the layers of this view
+        Args:
+            layer: The layer overriding this view
+
+        Returns:
+            The new view. This view is unchanged
+        """
+        return LayeredSchema(*self._layers, layer, parameters=self._parameters)
+
+    def get(self, field: str) -> Any:
+        """
+        Resolve a setting without materialising the view
+        Args:
+            field: The name of the setting, e.g. 'version' or 'environment'
+
+        Returns:
+            The setting of the last layer which sets it, a ChainMap across all layers for mappings, or None
+        """
+        if field in self.MAPPINGS:
+            maps = [getattr(layer, field) for layer in reversed(self._layers) if getattr(layer, field) is not None]
+            return ChainMap(*maps) if maps else None
+        if field == 'resources':
+            resources = [layer.resources.model_dump(exclude_none=True)
+                         for layer in reversed(self._layers) if layer.resources is not None]
+            return ChainMap(*resources) if resources else None
+        for layer in reversed(self._layers):
+            value = getattr(layer, field, None)
+            if value is not None:
+                return value
+        return None
+
+    def materialise(self) -> BlueprintSchema:
+        """
+        The concrete schema of the instance, for when a blueprint is configured from it
+
+        Returns:
+            The schema. Its layers were validated already, so it is constructed without validating it again
+        """
+        if self._schema is None:
+            # Whether the instance was expanded from a template is of no concern to the blueprint
+            settings = {'kind': self.get('kind')}
+            for field in LayerSchema.model_fields:
+                value = self.get(field)
+                if field == 'resources' and value is not None:
+                    value = ResourcesSchema.model_construct(**value)
+                elif isinstance(value, ChainMap):
+                    value = {key: self._substitute(item) for key, item in value.items()}
+                else:
+                    value = self._substitute(value)
+                if value is not None:
+                    settings[field] = value
+            self._schema = BlueprintSchema.model_construct(**settings)
+        return self._schema
+
+    def _substitute(self, value: Any) -> Any:
+        if not self._parameters:
+            return value
+        if isinstance(value, str):
+            return string.Template(value).safe_substitute(self._parameters)
+        if isinstance(value, VolumeSchema):
+            return value.model_copy(update={'mount_point': self._substitute(value.mount_point)})
+        return value
@@ -27,10 +27,10 @@ import json
 
 from suikinkutsu.config import Configuration
 from suikinkutsu.outputs import OutputEntry
-from suikinkutsu.behaviours import CommandLineIntegration
+from suikinkutsu.behaviours import CommandLineAware
 
 
-class SecretsFile(CommandLineIntegration):
+class SecretsFile(CommandLineAware):
     """
     Secrets File Manager
     """
@@ -57,13 +57,13 @@ class SecretsFile(CommandLineIntegration):
                                         dest='value',
                                         required=True,
                                         help='Secret value')
-        secrets_add_parser.set_default(cmd=self.secrets_add)
+        secrets_add_parser.set_defaults(cmd=self.secrets_add)
         secrets_remove_parser = secrets_subparser.add_parser('remove', help='Remove a secret')
         secrets_remove_parser.add_argument('-k', '--key',
                                            dest='key',
                                            required=True,
                                            help='The secret key to remove')
-        secrets_remove_parser.set_default(cmd=self.secrets_remove)
+        secrets_remove_parser.set_defaults(cmd=self.secrets_remove)
 
     # pylint: disable=unused-argument
     def secrets_list(self, runtime, args: argparse.Namespace):
@@ -0,0 +1,274 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import typing
+import pathlib
+import datetime
+import concurrent.futures
+import json
+import re
+import os
+import shutil
+
+from suikinkutsu.config import Configuration
+from suikinkutsu.constants import DEFAULT_SNAPSHOT_WORKERS, DEFAULT_SNAPSHOT_CHUNK_SIZE
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.models import Instance, VolumeBinding
+from suikinkutsu.chunking import ordered_map, read_chunks, compress, decompress
+from suikinkutsu.store import ChunkStore
+
+T = typing.TypeVar('T')
+
+
+class VolumeSnapshots:
+    """
+    Snapshots of the named volumes of instances, kept below the configuration directory.
+
+    By default, the tarball of each volume is kept in the content-addressed chunk store, so repeated snapshots of the
+    same instance only write the chunks that changed. Compressed tarballs consist of independently compressed gzip
+    members whose sizes are recorded in the manifest of the snapshot, so that both compression and decompression can
+    run in parallel. Uncompressed tarballs are written and read by the platform directly, without passing through
+    this process.
+    """
+
+    manifest_name = 'manifest.json'
+    formats = ['store', 'gzip', 'tar']
+    # The same characters as a segment of a chunk store key, since snapshots are kept in the store by name
+    _name_pattern = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+    def __init__(self,
+                 config: Configuration,
+                 workers: int = DEFAULT_SNAPSHOT_WORKERS,
+                 chunk_size: int = DEFAULT_SNAPSHOT_CHUNK_SIZE):
+        self._snapshot_dir = pathlib.Path(config.config_dir.value) / 'snapshots'
+        self._workers = max(workers, 1)
+        self._chunk_size = chunk_size
+        self._store = ChunkStore(config, workers=workers)
+
+    def path(self, instance_name: str, snapshot_name: str) -> pathlib.Path:
+        """
+        The directory of a snapshot
+        Raises:
+            MurkyWaterException when the instance or snapshot name is not a valid name, e.g. because it contains path
+            separators
+        """
+        self._validate(instance_name)
+        self._validate(snapshot_name)
+        return self._snapshot_dir / instance_name / snapshot_name
+
+    def manifest(self, instance_name: str, snapshot_name: str) -> typing.Dict:
+        manifest_path = self.path(instance_name, snapshot_name) / self.manifest_name
+        if not manifest_path.exists():
+            raise MurkyWaterException(msg=f'There is no snapshot {snapshot_name} of instance {instance_name}')
+        return json.loads(manifest_path.read_text(encoding='UTF-8'))
+
+    def list(self, instance_name: typing.Optional[str] = None) -> typing.List[typing.Dict]:
+        if instance_name is not None:
+            self._validate(instance_name)
+        pattern = f'{instance_name or "*"}/*/{self.manifest_name}'
+        return [json.loads(manifest_path.read_text(encoding='UTF-8'))
+                for manifest_path in sorted(self._snapshot_dir.glob(pattern))]
+
+    def remove(self, instance_name: str, snapshot_name: str):
+        """
+        Remove a snapshot along with its entries in the chunk store. Chunks that are no longer referenced remain until
+        the store is garbage collected
+        """
+        self.manifest(instance_name, snapshot_name)
+        self._store.remove(f'snapshots/{instance_name}/{snapshot_name}')
+        shutil.rmtree(self.path(instance_name, snapshot_name))
+
+    def create(self,
+               platform: 'Platform',
+               instance: Instance,
+               snapshot_name: str,
+               snapshot_format: str = 'store',
+               stop: bool = True,
+               progress: typing.Optional[typing.Callable[[str, int], None]] = None) -> typing.Dict:
+        """
+        Snapshot all named volumes of an instance. The volumes are exported concurrently
+        Args:
+            platform: The platform hosting the instance
+            instance: The instance to snapshot
+            snapshot_name: The name of the snapshot
+            snapshot_format: 'store' to deduplicate the tarballs into the chunk store, 'gzip' for compressed and
+                'tar' for uncompressed tarballs
+            stop: Stop a running instance for the duration of the snapshot, so its volumes are consistent
+            progress: Optional callback receiving the volume name and the number of bytes written once it is done
+
+        Returns:
+            The manifest of the snapshot
+        """
+        if snapshot_format not in self.formats:
+            raise MurkyWaterException(msg=f'Unknown snapshot format {snapshot_format}')
+        if len(instance.volume_bindings) == 0:
+            raise MurkyWaterException(msg=f'Instance {instance.name} has no named volumes to snapshot')
+        path = self.path(instance.name, snapshot_name)
+        path.mkdir(parents=True, exist_ok=True)
+        stopped = stop and instance.running
+        if stopped:
+            platform.instance_stop(instance.name)
+        try:
+            volumes = list(ordered_map(lambda vol: self._export(platform, instance, vol, snapshot_name, path,
+                                                                snapshot_format, progress),
+                                       instance.volume_bindings,
+                                       len(instance.volume_bindings)))
+        finally:
+            if stopped:
+                platform.instance_start(instance.name)
+        manifest = {
+            'instance': instance.name,
+            'blueprint': instance.blueprint.__class__.__name__ if instance.blueprint else None,
+            'snapshot': snapshot_name,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'volumes': volumes
+        }
+        (path / self.manifest_name).write_text(json.dumps(manifest, indent=2), encoding='UTF-8')
+        return manifest
+
+    def restore(self,
+                platform: 'Platform',
+                instance: Instance,
+                snapshot_name: str,
+                progress: typing.Optional[typing.Callable[[str, int], None]] = None) -> typing.Dict:
+        """
+        Replace the content of the named volumes of an instance with a snapshot. The instance is stopped while its
+        volumes are restored and the volumes are restored concurrently
+        Args:
+            platform: The platform hosting the instance
+            instance: The instance to restore
+            snapshot_name: The name of the snapshot
+            progress: Optional callback receiving the volume name and the number of bytes read once it is done
+
+        Returns:
+            The manifest of the restored snapshot
+        """
+        manifest = self.manifest(instance.name, snapshot_name)
+        path = self.path(instance.name, snapshot_name)
+        stopped = instance.running
+        if stopped:
+            platform.instance_stop(instance.name)
+        try:
+            list(ordered_map(lambda vol: self._import(platform, vol, path, progress),
+                             manifest.get('volumes', []),
+                             len(manifest.get('volumes', []))))
+        finally:
+            if stopped:
+                platform.instance_start(instance.name)
+        return manifest
+
+    def _export(self,
+                platform: 'Platform',
+                instance: Instance,
+                volume: VolumeBinding,
+                snapshot_name: str,
+                path: pathlib.Path,
+                snapshot_format: str,
+                progress: typing.Optional[typing.Callable[[str, int], None]]) -> typing.Dict:
+        entry = {'name': volume.name, 'mount_point': volume.mount_point, 'format': snapshot_format}
+        if snapshot_format == 'tar':
+            entry['file'] = f'{volume.name}.tar'
+            with open(path / entry['file'], 'wb') as tarball:
+                platform.volume_export(volume.name, tarball)
+            entry['size'] = (path / entry['file']).stat().st_size
+        elif snapshot_format == 'store':
+            entry['key'] = f'snapshots/{instance.name}/{snapshot_name}/{volume.name}'
+            index = self._drain(platform, volume.name, lambda chunks: self._store.put(entry['key'], chunks))
+            entry['size'] = index['size']
+            entry['stored'] = index['stored']
+        else:
+            entry['file'] = f'{volume.name}.tar.gz'
+            with open(path / entry['file'], 'wb') as tarball:
+                entry['members'] = self._drain(platform, volume.name, lambda chunks: [
+                    tarball.write(member) for member in compress(chunks, self._workers)])
+            entry['size'] = sum(entry['members'])
+        if progress:
+            progress(volume.name, entry['size'])
+        return entry
+
+    def _import(self,
+                platform: 'Platform',
+                entry: typing.Dict,
+                path: pathlib.Path,
+                progress: typing.Optional[typing.Callable[[str, int], None]]):
+        snapshot_format = entry.get('format', 'gzip' if 'members' in entry else 'tar')
+        if snapshot_format == 'tar':
+            with open(path / entry['file'], 'rb') as tarball:
+                platform.volume_import(entry['name'], tarball)
+        elif snapshot_format == 'store':
+            self._feed(platform, entry['name'], self._store.get(entry['key']))
+        else:
+            with open(path / entry['file'], 'rb') as tarball:
+                members = (tarball.read(size) for size in entry['members'])
+                self._feed(platform, entry['name'], decompress(members, self._workers))
+        if progress:
+            progress(entry['name'], entry.get('size', 0))
+
+    def _validate(self, name: str):
+        if not self._name_pattern.match(name) or name in ('.', '..'):
+            raise MurkyWaterException(msg=f'{name} is not a valid snapshot or instance name')
+
+    def _drain(self,
+               platform: 'Platform',
+               volume_name: str,
+               consume: typing.Callable[[typing.Iterator[bytes]], T]) -> T:
+        """
+        Export a volume through a pipe and consume the tarball in chunks while the platform is still writing it
+        """
+        read_fd, write_fd = os.pipe()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool, \
+                open(read_fd, 'rb') as reader, \
+                open(write_fd, 'wb') as writer:
+            export = pool.submit(self._closing, writer, platform.volume_export, volume_name, writer)
+            result = consume(read_chunks(reader, self._chunk_size))
+            export.result()
+        return result
+
+    def _feed(self, platform: 'Platform', volume_name: str, chunks: typing.Iterable[bytes]):
+        """
+        Import a volume through a pipe, writing the tarball in chunks while the platform is already reading it
+        """
+        read_fd, write_fd = os.pipe()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool, \
+                open(read_fd, 'rb') as reader, \
+                open(write_fd, 'wb') as writer:
+            restore = pool.submit(self._closing, reader, platform.volume_import, volume_name, reader)
+            try:
+                for chunk in chunks:
+                    writer.write(chunk)
+            except BrokenPipeError:
+                # The platform gave up reading, its own error is more meaningful
+                pass
+            finally:
+                writer.close()
+            restore.result()
+
+    @staticmethod
+    def _closing(stream: typing.BinaryIO, fn: typing.Callable, *args):
+        """
+        Run a function and close the provided end of a pipe once it is done, so that the process on the other end
+        is not left waiting for data or for a reader
+        """
+        try:
+            fn(*args)
+        finally:
+            stream.close()
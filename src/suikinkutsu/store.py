@@ -0,0 +1,202 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import typing
+import pathlib
+import datetime
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zlib
+
+from suikinkutsu.config import Configuration
+from suikinkutsu.constants import DEFAULT_STORE_WORKERS, \
+    DEFAULT_STORE_MIN_CHUNK_SIZE, DEFAULT_STORE_AVG_CHUNK_SIZE, DEFAULT_STORE_MAX_CHUNK_SIZE
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.chunking import ordered_map, content_defined_chunks
+
+
+class ChunkStore:
+    """
+    A content-addressed, deduplicated store for streams of bytes below the configuration directory.
+
+    Streams are split into content-defined chunks which are stored zlib-compressed under their SHA-256 digest, so a
+    chunk that is already present is never written again. Each stored stream is described by an index file listing
+    its chunks in order. Repeated dumps or snapshots of the same data therefore only write the chunks that changed.
+    """
+
+    _key_pattern = re.compile(r'^[A-Za-z0-9_.-]+(/[A-Za-z0-9_.-]+)*$')
+
+    def __init__(self,
+                 config: Configuration,
+                 workers: int = DEFAULT_STORE_WORKERS,
+                 min_size: int = DEFAULT_STORE_MIN_CHUNK_SIZE,
+                 avg_size: int = DEFAULT_STORE_AVG_CHUNK_SIZE,
+                 max_size: int = DEFAULT_STORE_MAX_CHUNK_SIZE):
+        self._path = pathlib.Path(config.config_dir.value) / 'store'
+        self._workers = max(workers, 1)
+        self._min_size = min_size
+        self._avg_size = avg_size
+        self._max_size = max_size
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+
+    def index(self, key: str) -> typing.Dict:
+        index_path = self._index_path(key)
+        if not index_path.exists():
+            raise MurkyWaterException(msg=f'There is nothing stored as {key}')
+        return json.loads(index_path.read_text(encoding='UTF-8'))
+
+    def list(self, prefix: typing.Optional[str] = None) -> typing.List[typing.Dict]:
+        base = self._path / 'index'
+        if prefix:
+            self._validate(prefix)
+            base = base / prefix
+        return [json.loads(index_path.read_text(encoding='UTF-8'))
+                for index_path in sorted(base.rglob('*.json'))]
+
+    def put(self,
+            key: str,
+            stream: typing.Iterable[bytes],
+            metadata: typing.Optional[typing.Dict] = None) -> typing.Dict:
+        """
+        Store a stream of bytes. The stream is chunked while chunks are hashed, compressed and written concurrently
+        Args:
+            key: The key to store the stream as, e.g. 'pg/pg/before-migration'. An existing entry is replaced
+            stream: The stream of bytes, in chunks of any size
+            metadata: Optional metadata to keep in the index
+
+        Returns:
+            The index of the stored stream, including the number of bytes that were newly written
+        """
+        index_path = self._index_path(key)
+        chunks = []
+        stored = 0
+        for digest, size, written in ordered_map(self._put_chunk,
+                                                 content_defined_chunks(stream,
+                                                                        self._min_size,
+                                                                        self._avg_size,
+                                                                        self._max_size),
+                                                 self._workers):
+            chunks.append([digest, size])
+            stored += written
+        index = {
+            'key': key,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'size': sum(size for _, size in chunks),
+            'stored': stored,
+            'metadata': metadata or {},
+            'chunks': chunks
+        }
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomically(index_path, json.dumps(index, indent=2).encode('UTF-8'))
+        return index
+
+    def get(self, key: str) -> typing.Iterator[bytes]:
+        """
+        Read a stored stream. Chunks are read, decompressed and verified concurrently
+        Args:
+            key: The key the stream is stored as
+
+        Returns:
+            An iterator over the chunks of the stream, in order
+
+        Raises:
+            MurkyWaterException when nothing is stored under the key, or when a chunk is missing or corrupt
+        """
+        return ordered_map(self._get_chunk, [digest for digest, _ in self.index(key)['chunks']], self._workers)
+
+    def remove(self, key: str) -> int:
+        """
+        Remove a stored stream, or all streams below a key. The chunks remain until the store is garbage collected
+        Args:
+            key: The key of a stream, or a prefix of keys
+
+        Returns:
+            The number of removed streams
+        """
+        index_path = self._index_path(key)
+        removed = [index_path] if index_path.exists() else []
+        removed.extend((self._path / 'index' / key).rglob('*.json'))
+        for path in removed:
+            path.unlink()
+        return len(removed)
+
+    def gc(self) -> typing.Tuple[int, int]:
+        """
+        Remove chunks which are no longer referenced by any stored stream
+        Returns:
+            The number of removed chunks and the number of bytes freed
+        """
+        referenced = {digest for index in self.list() for digest, _ in index['chunks']}
+        removed = freed = 0
+        for chunk_path in (self._path / 'chunks').glob('*/*'):
+            if chunk_path.name not in referenced:
+                freed += chunk_path.stat().st_size
+                chunk_path.unlink()
+                removed += 1
+        return removed, freed
+
+    def _put_chunk(self, chunk: bytes) -> typing.Tuple[str, int, int]:
+        digest = hashlib.sha256(chunk).hexdigest()
+        chunk_path = self._chunk_path(digest)
+        if chunk_path.exists():
+            return digest, len(chunk), 0
+        compressed = zlib.compress(chunk)
+        chunk_path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomically(chunk_path, compressed)
+        return digest, len(chunk), len(compressed)
+
+    def _get_chunk(self, digest: str) -> bytes:
+        chunk_path = self._chunk_path(digest)
+        if not chunk_path.exists():
+            raise MurkyWaterException(msg=f'Chunk {digest} is missing from the store')
+        chunk = zlib.decompress(chunk_path.read_bytes())
+        if hashlib.sha256(chunk).hexdigest() != digest:
+            raise MurkyWaterException(msg=f'Chunk {digest} in the store is corrupt')
+        return chunk
+
+    def _chunk_path(self, digest: str) -> pathlib.Path:
+        return self._path / 'chunks' / digest[:2] / digest
+
+    def _index_path(self, key: str) -> pathlib.Path:
+        self._validate(key)
+        return self._path / 'index' / f'{key}.json'
+
+    def _validate(self, key: str):
+        if not self._key_pattern.match(key) or '..' in key.split('/'):
+            raise MurkyWaterException(msg=f'{key} is not a valid store key')
+
+    @staticmethod
+    def _write_atomically(path: pathlib.Path, content: bytes):
+        """
+        Write to a temporary file next to the destination and move it into place, so that concurrent writers of the
+        same chunk and interrupted writes never leave a partial file behind
+        """
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix='.', delete=False) as temporary:
+            temporary.write(content)
+        os.replace(temporary.name, path)
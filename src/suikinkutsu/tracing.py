@@ -0,0 +1,241 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import typing
+import pathlib
+import contextlib
+import json
+import secrets
+import threading
+import time
+import urllib.request
+
+from suikinkutsu.constants import TRACE_SERVICE_NAME, DEFAULT_TRACE_TIMEOUT
+
+# Status codes and the internal span kind of the OTLP protocol
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+KIND_INTERNAL = 1
+
+
+class Span:
+    """
+    A timed operation within a trace
+    """
+
+    def __init__(self,
+                 name: str,
+                 trace_id: str,
+                 parent: typing.Optional['Span'] = None,
+                 attributes: typing.Optional[typing.Dict[str, typing.Any]] = None,
+                 links: typing.Optional[typing.List['Span']] = None):
+        self._name = name
+        self._trace_id = trace_id
+        self._span_id = secrets.token_hex(8)
+        self._parent = parent
+        self._attributes = dict(attributes or {})
+        self._links = [link for link in links or [] if link is not None]
+        self._start = time.time_ns()
+        self._end = None
+        self._error = None
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def span_id(self) -> str:
+        return self._span_id
+
+    @property
+    def parent(self) -> typing.Optional['Span']:
+        return self._parent
+
+    @property
+    def attributes(self) -> typing.Dict[str, typing.Any]:
+        return self._attributes
+
+    @property
+    def error(self) -> typing.Optional[str]:
+        return self._error
+
+    def end(self, error: typing.Optional[str] = None):
+        self._end = time.time_ns()
+        self._error = error
+
+    @staticmethod
+    def _value(value: typing.Any) -> typing.Dict:
+        if isinstance(value, bool):
+            return {'boolValue': value}
+        if isinstance(value, int):
+            return {'intValue': str(value)}
+        if isinstance(value, float):
+            return {'doubleValue': value}
+        return {'stringValue': str(value)}
+
+    def to_otlp(self) -> typing.Dict:
+        """
+        The span in the JSON encoding of the OTLP protocol
+        """
+        span = {'traceId': self._trace_id,
+                'spanId': self._span_id,
+                'name': self._name,
+                'kind': KIND_INTERNAL,
+                'startTimeUnixNano': str(self._start),
+                'endTimeUnixNano': str(self._end or self._start),
+                'attributes': [{'key': key, 'value': self._value(value)}
+                               for key, value in self._attributes.items() if value is not None],
+                'links': [{'traceId': self._trace_id, 'spanId': link.span_id} for link in self._links],
+                'status': {'code': STATUS_ERROR, 'message': self._error} if self._error is not None
+                else {'code': STATUS_UNSET}}
+        if self._parent is not None:
+            span['parentSpanId'] = self._parent.span_id
+        return span
+
+
+class Tracer:
+    """
+    Collects the spans of a single trace and exports them as OTLP/JSON, to an OTLP/HTTP endpoint such as the one of
+    the Jaeger blueprint or into a file in the format of the OpenTelemetry collector file exporter.
+
+    Spans are nested per thread. The first span of a thread other than the one which started the trace becomes a
+    child of the first span of the trace, e.g. when blueprints are processed concurrently
+    """
+
+    def __init__(self, service_name: str = TRACE_SERVICE_NAME):
+        self._service_name = service_name
+        self._trace_id = secrets.token_hex(16)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._root: typing.Optional[Span] = None
+        self._spans: typing.List[Span] = []
+
+    @property
+    def trace_id(self) -> str:
+        return self._trace_id
+
+    @property
+    def spans(self) -> typing.List[Span]:
+        """
+        The finished spans
+        """
+        with self._lock:
+            return list(self._spans)
+
+    @property
+    def current(self) -> typing.Optional[Span]:
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else self._root
+
+    @contextlib.contextmanager
+    def span(self,
+             name: str,
+             attributes: typing.Optional[typing.Dict[str, typing.Any]] = None,
+             parent: typing.Optional[Span] = None,
+             links: typing.Optional[typing.List[Span]] = None) -> typing.Iterator[Span]:
+        """
+        Time the enclosed operation as a span, which ends in error when the operation raises
+        Args:
+            name: The name of the span, e.g. 'cook up'
+            attributes: Attributes of the span, which may be added to by the enclosed operation
+            parent: The parent span, defaults to the current span of this thread
+            links: Further spans the operation follows from, e.g. additional dependencies
+
+        Returns:
+            The span
+        """
+        span = Span(name, self._trace_id, parent or self.current, attributes, links)
+        with self._lock:
+            if self._root is None:
+                self._root = span
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        self._local.stack.append(span)
+        try:
+            yield span
+        except BaseException as ex:
+            span.end(error=str(ex) or ex.__class__.__name__)
+            raise
+        else:
+            span.end()
+        finally:
+            self._local.stack.pop()
+            with self._lock:
+                self._spans.append(span)
+
+    def to_otlp(self) -> typing.Dict:
+        """
+        The finished spans as an OTLP/JSON trace export request
+        """
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self._service_name}}]},
+            'scopeSpans': [{'scope': {'name': TRACE_SERVICE_NAME},
+                            'spans': [span.to_otlp() for span in self.spans]}]}]}
+
+    def write(self, path: pathlib.Path):
+        """
+        Append the trace as a single line to an OTLP/JSON file
+        """
+        with open(path, 'a', encoding='UTF-8') as f:
+            f.write(json.dumps(self.to_otlp()) + '\n')
+
+    def send(self, endpoint: str, timeout: float = DEFAULT_TRACE_TIMEOUT):
+        """
+        Send the trace to an OTLP/HTTP endpoint, e.g. http://localhost:4318/v1/traces
+        Raises:
+            OSError (including urllib.error.URLError) when the endpoint cannot be reached
+        """
+        request = urllib.request.Request(endpoint,
+                                         data=json.dumps(self.to_otlp()).encode('UTF-8'),
+                                         headers={'Content-Type': 'application/json'},
+                                         method='POST')
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+
+_tracer: typing.Optional[Tracer] = None
+
+
+def install(tracer: typing.Optional[Tracer]):
+    """
+    Install the tracer which records the spans of this process, or remove it
+    """
+    global _tracer   # pylint: disable=global-statement
+    _tracer = tracer
+
+
+def tracer() -> typing.Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str,
+         attributes: typing.Optional[typing.Dict[str, typing.Any]] = None,
+         parent: typing.Optional[Span] = None,
+         links: typing.Optional[typing.List[Span]] = None) -> typing.ContextManager[typing.Optional[Span]]:
+    """
+    Time the enclosed operation as a span of the installed tracer. Without a tracer, nothing is recorded and the span
+    is None
+    """
+    if _tracer is None:
+        return contextlib.nullcontext(None)
+    return _tracer.span(name, attributes, parent, links)
@@ -0,0 +1,57 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import typing
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:     # pragma: no cover
+    from yaml import SafeLoader, SafeDumper
+
+
+def load(stream: typing.Union[str, bytes, typing.IO]) -> typing.Any:
+    """
+    Parse a YAML document, using libyaml when PyYAML was built with it
+    Args:
+        stream: The YAML document or a file it is read from
+
+    Returns:
+        The parsed document
+    """
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def dump(data: typing.Any, stream: typing.Optional[typing.IO] = None, **kwargs) -> typing.Optional[str]:
+    """
+    Serialise a document to YAML, using libyaml when PyYAML was built with it
+    Args:
+        data: The document to serialise
+        stream: An optional file to write the document to
+        **kwargs: Further options for the dumper, e.g. sort_keys or explicit_start
+
+    Returns:
+        The serialised document when no stream is given
+    """
+    return yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
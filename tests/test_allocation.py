@@ -0,0 +1,41 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import pytest
+
+from suikinkutsu.allocation import allocate_cores, parse_cpuset, format_cpuset
+
+
+@pytest.mark.parametrize('demands,cores,allocation', [
+    ({'zk': 1, 'kafka': 2, 'pg': 1}, list(range(8)), {'zk': '0-1', 'kafka': '2-5', 'pg': '6-7'}),
+    ({'pg': 0.1, 'kafka': 10}, [0, 1, 2, 3], {'pg': '0', 'kafka': '1-3'}),
+    ({'a': 1, 'b': 1, 'c': 1}, [0, 1], {'a': '0', 'b': '1', 'c': '0'}),
+    ({'a': 1, 'b': 1}, [1, 2, 5, 6], {'a': '1-2', 'b': '5-6'})
+])
+def test_allocate_cores(demands, cores, allocation):
+    assert allocate_cores(demands, cores) == allocation
+
+
+def test_cpuset_roundtrip():
+    assert parse_cpuset('0-2,5') == [0, 1, 2, 5]
+    assert format_cpuset([5, 0, 2, 1]) == '0-2,5'
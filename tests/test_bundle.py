@@ -0,0 +1,58 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import os
+import typing
+
+from suikinkutsu.bundle import ImageBundle
+
+
+class StubPlatform:
+    """
+    Just enough of a platform to save and load images
+    """
+
+    def __init__(self, images: typing.Dict[str, bytes]):
+        self.images = images
+        self.loaded = []
+
+    def image_save(self, image: str, chunk_size: int) -> typing.Iterator[bytes]:
+        content = self.images[image]
+        for offset in range(0, len(content), chunk_size):
+            yield content[offset:offset + chunk_size]
+
+    def image_load(self, chunks: typing.Iterable[bytes]) -> str:
+        self.loaded.append(b''.join(chunks))
+        return 'Loaded'
+
+
+def test_bundle_roundtrip(tmp_path):
+    images = {'postgres:14': os.urandom(10000), 'jboss/keycloak:16.1.1': os.urandom(2500)}
+    source = StubPlatform(images)
+    bundle = ImageBundle(tmp_path / 'bundle', workers=3)
+    manifest = bundle.save(source, sorted(images.keys()), chunk_size=1024)
+    assert [entry['image'] for entry in manifest['images']] == sorted(images.keys())
+    assert len(manifest['images'][1]['chunks']) == 10, 'Images are split into chunks'
+
+    target = StubPlatform({})
+    ImageBundle(tmp_path / 'bundle', workers=2).load(target)
+    assert target.loaded == [images[image] for image in sorted(images.keys())], 'Chunks are loaded in order'
@@ -27,7 +27,7 @@ import pytest
 
 import conftest
 import suikinkutsu.constants
-from suikinkutsu.config import Configuration, Source, ConfigurableItem
+from suikinkutsu.config import Configuration, Source, ConfigurableItem, env_flag
 
 
 def assert_configurable_item(item: ConfigurableItem, value: str, source: Source):
@@ -81,3 +81,19 @@ def test_config_file_overrides_default(config_env, tmp_path, cli_arg_namespace:
     assert_configurable_item(config.config_dir, 'file-override', Source.CONFIGURATION)
     assert config.recipe_file.source == Source.DEFAULT
     assert config.secrets_file.source == Source.DEFAULT
+
+
+@pytest.mark.parametrize('value,expected', [('1', True), ('true', True), ('Yes', True), (' TRUE ', True),
+                                            ('', False), ('0', False), ('false', False), ('no', False),
+                                            ('off', False)])
+def test_env_flag(monkeypatch, value: str, expected: bool):
+    monkeypatch.setenv(suikinkutsu.constants.ENV_MEMORY, value)
+    assert env_flag(suikinkutsu.constants.ENV_MEMORY) is expected
+    parser = argparse.ArgumentParser()
+    Configuration().cli_prepare(parser, parser.add_subparsers())
+    assert getattr(parser.parse_args([]), suikinkutsu.constants.CLI_MEMORY) is expected
+
+
+def test_env_flag_unset(monkeypatch):
+    monkeypatch.delenv(suikinkutsu.constants.ENV_MEMORY, raising=False)
+    assert env_flag(suikinkutsu.constants.ENV_MEMORY) is False
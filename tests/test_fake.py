@@ -0,0 +1,143 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import argparse
+import io
+import os
+
+import pytest
+
+from suikinkutsu.blueprints import PostgreSQL
+from suikinkutsu.config import Configuration
+from suikinkutsu.constants import CLI_PLATFORM, ENV_PLATFORM, LABEL_BLUEPRINT, LABEL_TEMPLATE
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.models import Resources
+from suikinkutsu.platforms import Fake
+from suikinkutsu.runtime import Runtime
+from suikinkutsu.secretsfile import SecretsFile
+
+
+def test_fake_lifecycle(config):
+    fake = Fake(config)
+    pg = PostgreSQL()
+    instance = fake.apply(pg)
+    assert instance.name == pg.name
+    assert [i.instance_id for i in fake.instances()] == [instance.instance_id]
+    assert [vol.name for vol in instance.volume_bindings] == [vol.name for vol in pg.volume_bindings]
+    assert set(fake.volumes) == {vol.name for vol in pg.volume_bindings}
+    assert fake.instances_labelled(LABEL_BLUEPRINT, 'PostgreSQL') == [pg.name]
+
+    fake.instance_stop(pg.name)
+    assert not fake.instance_get(pg.name).running
+    fake.instance_update(pg.name, Resources(cpus=1.5))
+    assert fake.instance_resources(pg.name).cpus == 1.5
+    assert fake.instance_resources(pg.name).shm_size == pg.resources.shm_size
+
+    fake.instance_remove(instance)
+    assert fake.instances() == []
+    assert fake.volumes == {}
+    assert fake.instance_get(pg.name) is None
+
+
+def test_fake_assigns_free_ports(config):
+    fake = Fake(config)
+    pg = PostgreSQL()
+    first = fake.apply(pg.variant(port_bindings=[]), 'first')
+    assert first.port_bindings == []
+    ports = {fake.apply(pg.variant(port_bindings=[
+        type(binding)(host_port=None, container_port=binding.container_port, host_ip=binding.host_ip)
+        for binding in pg.port_bindings]), name).port_bindings[0].host_port for name in ['a', 'b']}
+    assert len(ports) == 2
+    with pytest.raises(MurkyWaterException):
+        fake.apply(pg, 'a')
+
+
+def test_fake_is_deterministic(config):
+    def run(seed: int):
+        fake = Fake(config, failure_rate=0.5, seed=seed)
+        for index in range(20):
+            try:
+                fake.apply(PostgreSQL().variant(volume_bindings=[]), f'pg-{index}')
+            except MurkyWaterException:
+                pass
+        return [event['failed'] for event in fake.events], [i.instance_id for i in fake.instances()]
+    assert run(42) == run(42)
+    assert run(42) != run(43)
+    failures, instance_ids = run(42)
+    assert any(failures) and not all(failures)
+
+
+def test_fake_volumes(config):
+    fake = Fake(config)
+    pg = PostgreSQL()
+    fake.template_create(pg)
+    assert list(fake.templates().keys()) == [pg.template_key()]
+    template_volume = fake.template_volume(pg, pg.volume_bindings[0])
+    fake.volume_import(template_volume, io.BytesIO(b'initialised'))
+    assert fake.template_clone(pg)
+    exported = io.BytesIO()
+    fake.volume_export(pg.volume_bindings[0].name, exported)
+    assert exported.getvalue() == b'initialised'
+    assert LABEL_TEMPLATE not in fake.volumes[pg.volume_bindings[0].name]
+    assert not fake.template_clone(pg)
+
+
+def test_fake_selectable(config_env):
+    os.environ[ENV_PLATFORM] = 'fake'
+    config = Configuration()
+    runtime = Runtime(config, SecretsFile(config))
+    runtime.cli_assess(None)
+    assert isinstance(runtime.platform, Fake)
+
+
+def test_fake_only_available_when_selected(config_env, cli_arg_namespace, capsys):
+    config = Configuration()
+    runtime = Runtime(config, SecretsFile(config))
+    assert not runtime.platforms['fake'].available, 'The fake platform is not offered unless selected'
+    runtime.cli_assess(None)
+    assert runtime.platform is None or runtime.platform.name != 'fake'
+    runtime.platforms['fake'].platform_list(runtime, None)
+    assert 'fake' not in capsys.readouterr().out
+
+    setattr(cli_arg_namespace, CLI_PLATFORM, 'fake')
+    config.cli_assess(cli_arg_namespace)
+    runtime.cli_assess(None)
+    assert runtime.platform.available, 'The fake platform can still be selected on the command line'
+
+
+def test_fake_ephemeral_create(config_env, monkeypatch):
+    monkeypatch.setenv(ENV_PLATFORM, 'fake')
+    config = Configuration()
+    runtime = Runtime(config, SecretsFile(config))
+    runtime.cli_assess(None)
+    for blueprint in runtime.blueprints.values():
+        parser = argparse.ArgumentParser()
+        subparsers = parser.add_subparsers()
+        blueprint.cli_prepare(parser, subparsers)
+        args = parser.parse_args([next(iter(subparsers.choices)), 'create', '--ephemeral', '--ephemeral-size', '64m'])
+        args.cmd(runtime, args)
+        instance = runtime.platform.instance_get(args.name)
+        assert instance is not None, f'The create command of {blueprint.name} created an instance'
+        assert len(instance.volume_bindings) == len(blueprint.volume_bindings)
+        assert all(vol.ephemeral and vol.size == '64m' for vol in instance.volume_bindings), \
+            f'The create command of {blueprint.name} honours --ephemeral'
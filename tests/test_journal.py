@@ -0,0 +1,102 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import shutil
+
+import pytest
+
+from suikinkutsu.behaviours import CommandExecutor
+from suikinkutsu.constants import ENV_CONFIG_DIR
+from suikinkutsu.config import Configuration
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.journal import Journal, percentile
+
+
+class Shell(CommandExecutor):
+    """
+    Executes commands with the shell
+    """
+
+    _available = True
+    executable_name = 'sh'
+    executable = shutil.which('sh')
+
+
+@pytest.fixture
+def journal(config_env, monkeypatch) -> Journal:
+    monkeypatch.setenv(ENV_CONFIG_DIR, str(config_env))
+    return Journal(Configuration(), max_size=1024, backups=2)
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([1.0], 99) == 1.0
+
+
+def test_journal_spans(journal):
+    shell = Shell()
+    shell.journal = journal
+    assert shell._execute(shell.executable, ['-c', 'printf hello']).stdout == 'hello'
+    with pytest.raises(MurkyWaterException):
+        shell._execute(shell.executable, ['-c', 'exit 3'])
+    assert list(shell._stream(shell.executable, ['-c', 'echo one; echo two'])) == ['one', 'two']
+    spans = list(journal.spans())
+    assert [(span['platform'], span['operation'], span['args'], span['exit'], span['bytes']) for span in spans] == [
+        ('sh', '-c', 2, 0, 5),
+        ('sh', '-c', 2, 3, 0),
+        ('sh', '-c', 2, 0, 8)]
+    assert all(span['duration'] > 0 for span in spans)
+
+
+
+def test_binary_streams():
+    shell = Shell()
+    # More on standard error than a pipe buffers, before any output
+    chunks = shell._read(shell.executable, ['-c', 'head -c 1000000 /dev/zero >&2; printf hello'], chunk_size=2)
+    assert b''.join(chunks) == b'hello'
+    with pytest.raises(MurkyWaterException) as mwe:
+        list(shell._read(shell.executable, ['-c', 'echo broken >&2; exit 2'], chunk_size=2))
+    assert mwe.value.msg == 'broken\n'
+    assert shell._write(shell.executable, ['-c', 'wc -c'], [b'x' * 1024] * 4).strip() == '4096'
+    with pytest.raises(MurkyWaterException) as mwe:
+        shell._write(shell.executable, ['-c', 'echo refused; exit 1'], (b'x' * 1024 * 1024 for _ in range(64)))
+    assert mwe.value.msg == 'refused\n', 'A command exiting early is reported with its output'
+
+
+def test_journal_rotation_and_stats(journal):
+    for index in range(100):
+        journal.record({'platform': 'docker', 'operation': 'container run' if index % 4 else 'container rm',
+                        'args': 1, 'exit': 0 if index % 10 else 1, 'duration': float(index), 'bytes': 0})
+    assert journal.path.with_name(f'{journal.path.name}.2').exists()
+    assert not journal.path.with_name(f'{journal.path.name}.3').exists()
+    spans = list(journal.spans())
+    assert 0 < len(spans) < 100
+    assert [span['duration'] for span in spans] == sorted(span['duration'] for span in spans)
+    stats = journal.stats()
+    assert [stat['operation'] for stat in stats] == ['container run', 'container rm']
+    run = stats[0]
+    assert run['count'] == len([span for span in spans if span['operation'] == 'container run'])
+    assert run['p50'] <= run['p95'] <= run['p99'] == 99.0
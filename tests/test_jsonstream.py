@@ -0,0 +1,71 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import json
+import tracemalloc
+
+import pytest
+
+from suikinkutsu import jsonstream
+from suikinkutsu.exceptions import MurkyWaterException
+
+
+def chunked(data: bytes, size: int):
+    return [data[offset:offset + size] for offset in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 7, 4096])
+def test_iter_array(size):
+    elements = [{'Id': 'a', 'Name': '/tricky"{[', 'Labels': {'x': 'y\\\\'}, 'Ports': [[1, 2], []]},
+                {'Id': 'b', 'Name': 'ünïcödé \\" ]}', 'State': {'Running': True}},
+                []]
+    document = json.dumps(elements, indent=2, ensure_ascii=False).encode('UTF-8')
+    assert list(jsonstream.iter_array(chunked(document, size))) == elements
+
+
+@pytest.mark.parametrize('document', [b'', b'[]', b'[]\n', b'  [ ]  '])
+def test_iter_array_empty(document):
+    assert list(jsonstream.iter_array([document])) == []
+
+
+@pytest.mark.parametrize('document', [b'[{"a": 1}', b'[{"a": "}]', b'{"a": 1}', b'[1, 2]', b'["a"]', b'[{}]]',
+                                      b'[{},]', b'[{} {}]'])
+def test_iter_array_malformed(document):
+    with pytest.raises(MurkyWaterException):
+        list(jsonstream.iter_array(chunked(document, 3)))
+
+
+def test_iter_array_memory():
+    elements = [{'Id': f'{index:064x}', 'Labels': {f'label-{label}': 'value' for label in range(20)}}
+                for index in range(2000)]
+    document = json.dumps(elements).encode('UTF-8')
+    tracemalloc.start()
+    try:
+        json.loads(document)
+        _, loaded = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in jsonstream.iter_array(chunked(document, 64 * 1024)):
+            pass
+        _, streamed = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert streamed < loaded / 4, 'Streaming holds the whole document in memory'
@@ -0,0 +1,55 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import pytest
+
+from suikinkutsu.exceptions import UnparseableInstanceException
+from suikinkutsu.models import Instance, PortBinding, VolumeBinding, Resources
+
+
+def test_models_are_slotted():
+    for model in [Instance('1234', 'pg'),
+                  PortBinding(host_port=5432, container_port=5432),
+                  VolumeBinding('pg_data', '/var/lib/postgresql/data'),
+                  Resources(cpus=1.5)]:
+        assert not hasattr(model, '__dict__')
+        with pytest.raises(AttributeError):
+            model.unexpected = True
+
+
+def test_models_equality():
+    assert PortBinding.from_spec('5432/tcp', '127.0.0.1:5432') == PortBinding.from_mapping(
+        '5432', [{'HostIp': '127.0.0.1', 'HostPort': '5432'}])
+    assert PortBinding.from_spec('5432', '5432') != PortBinding.from_spec('5432', '5433')
+    assert len({VolumeBinding('a', '/a'), VolumeBinding('a', '/a'), VolumeBinding('a', '/a', ephemeral=True)}) == 2
+    assert Resources(cpus=1.5).merged(Resources(memory='2g')) == Resources(cpus=1.5, memory='2g')
+    running = Instance('1234', 'pg', running=True)
+    stopped = Instance('1234', 'pg', running=False)
+    assert running == stopped
+    assert len({running, stopped, Instance('5678', 'pg')}) == 2
+
+
+def test_port_binding_parse():
+    assert PortBinding.parse_container('5432/udp') == ('5432', 'udp')
+    assert PortBinding.parse_container('5432') == ('5432', 'tcp')
+    with pytest.raises(UnparseableInstanceException):
+        PortBinding.parse_container('postgres')
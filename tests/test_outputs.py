@@ -21,10 +21,15 @@
 #  SOFTWARE.
 
 import pytest
+import csv
+import io
 import json
+import subprocess
+import sys
 import yaml
 
-from suikinkutsu.outputs import OutputSeverity, OutputEntry, HumanWaterOutput, JSONWaterOutput, YAMLWaterOutput
+from suikinkutsu.outputs import OutputSeverity, OutputEntry, HumanWaterOutput, JSONWaterOutput, YAMLWaterOutput, \
+    YAMLStreamWaterOutput, NDJSONWaterOutput, CSVWaterOutput, TSVWaterOutput, OUTPUTS
 
 
 @pytest.mark.parametrize('severity', list(OutputSeverity))
@@ -86,7 +91,7 @@ def test_json_output_obj(severity: OutputSeverity, config, capsys):
     assert json_out['severity'] == entry.severity.value
     assert json_out['title'] == entry.title
     assert json_out['code'] == entry.code
-    assert json_out['msg'] == dict(zip(entry.columns, entry.msg))
+    assert json_out['msg'] == [{'col1': 'one', 'col2': 'two'}, {'col1': 'four', 'col2': 'five'}]
     with pytest.raises(json.decoder.JSONDecodeError):
         json_err = json.loads(captured.err)
 
@@ -107,7 +112,7 @@ def test_yaml_output_strings(severity: OutputSeverity, config, capsys):
 
 @pytest.mark.parametrize('severity', list(OutputSeverity))
 def test_yaml_output_obj(severity: OutputSeverity, config, capsys):
-    output = JSONWaterOutput(config)
+    output = YAMLWaterOutput(config)
     entry = OutputEntry(msg=[['one', 'two'], ['four', 'five']],
                         columns=['col1', 'col2'],
                         title='Test',
@@ -119,4 +124,54 @@ def test_yaml_output_obj(severity: OutputSeverity, config, capsys):
     assert yaml_out['severity'] == entry.severity.value
     assert yaml_out['title'] == entry.title
     assert yaml_out['code'] == entry.code
-    assert yaml_out['msg'] == dict(zip(entry.columns, entry.msg))
+    assert yaml_out['msg'] == [{'col1': 'one', 'col2': 'two'}, {'col1': 'four', 'col2': 'five'}]
+
+
+@pytest.mark.parametrize('output_class,load,load_all', [
+    (NDJSONWaterOutput, json.loads, lambda out: [json.loads(line) for line in out.splitlines()]),
+    (YAMLStreamWaterOutput, yaml.safe_load, lambda out: list(yaml.safe_load_all(out)))
+], ids=['ndjson', 'yaml-stream'])
+def test_streaming_output_rows(config, capsys, output_class, load, load_all):
+    output = output_class(config)
+    printed = []
+
+    def rows():
+        for row in [['one', 'two'], ['four', 'five']]:
+            yield row
+            # The row is printed before the next one is produced
+            printed.append(capsys.readouterr().out)
+
+    output.print(OutputEntry(msg=rows(), columns=['col1', 'col2'], title='Test'))
+    assert [load(out) for out in printed] == [{'col1': 'one', 'col2': 'two'}, {'col1': 'four', 'col2': 'five'}]
+    output.print(OutputEntry(msg=iter([['one', 'two'], ['four', 'five']]), columns=['col1', 'col2']))
+    assert len(load_all(capsys.readouterr().out)) == 2, 'Rows are separate documents'
+
+
+def test_delimited_output(config, capsys):
+    rows = [['pg', 'pg_data\npg_other'], ['kc', 'tab\there, "quoted"\\']]
+    CSVWaterOutput(config).print(OutputEntry(msg=iter(rows), columns=['Name', 'Volumes']))
+    CSVWaterOutput(config).warning('Not on stdout')
+    captured = capsys.readouterr()
+    assert list(csv.reader(io.StringIO(captured.out))) == [['Name', 'Volumes'], *rows]
+    assert captured.err == 'Warning: Not on stdout\n'
+
+    TSVWaterOutput(config).print(OutputEntry(msg=iter(rows), columns=['Name', 'Volumes']))
+    assert capsys.readouterr().out.splitlines() == ['Name\tVolumes',
+                                                    'pg\tpg_data\\npg_other',
+                                                    'kc\ttab\\there, "quoted"\\\\']
+
+
+def test_machine_outputs_do_not_import_rich():
+    probe = 'import sys; from suikinkutsu.runtime import Runtime; ' \
+            'from suikinkutsu.outputs import output_class; output_class("tsv"); print("rich" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
+
+
+@pytest.mark.parametrize('name', ['csv', 'tsv', 'json', 'ndjson'])
+def test_outputs_are_imported_when_chosen(name: str):
+    probe = 'import sys; from suikinkutsu.outputs import output_class; ' \
+            f'output_class("{name}"); print(sorted(module for module in sys.modules ' \
+            'if module == "yaml" or module.startswith("suikinkutsu.outputs.output_")))'
+    result = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == str([OUTPUTS[name][0]]), 'Neither PyYAML nor the other outputs are imported'
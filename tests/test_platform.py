@@ -0,0 +1,62 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import pytest
+
+from suikinkutsu.platforms import Fake, Platform
+from suikinkutsu.blueprints import PostgreSQL
+from suikinkutsu.schema import BlueprintSchema
+
+
+@pytest.mark.parametrize('reference,mirrored', [
+    ('postgres:14', '127.0.0.1:5000/library/postgres:14'),
+    ('postgres@sha256:1234', '127.0.0.1:5000/library/postgres@sha256:1234'),
+    ('confluentinc/cp-kafka:7.3.1', '127.0.0.1:5000/confluentinc/cp-kafka:7.3.1'),
+    ('docker.io/jboss/keycloak:16.1.1', '127.0.0.1:5000/jboss/keycloak:16.1.1'),
+    ('quay.io/keycloak/keycloak:21.0', 'quay.io/keycloak/keycloak:21.0'),
+    ('localhost:5000/custom:1', 'localhost:5000/custom:1')
+])
+def test_mirrored_references(reference: str, mirrored: str):
+    assert Platform._mirrored(reference, '127.0.0.1:5000') == mirrored
+    assert Platform._mirrored(reference, None) == reference, 'References are unchanged without a mirror'
+
+
+def test_mirrored_references_are_only_used_to_pull(config):
+    platform = Fake(config)
+    platform.registry_mirror = lambda: '127.0.0.1:5000'
+    for _ in platform.image_pull('postgres:14'):
+        pass
+    assert platform.image_reference('postgres:14') == 'postgres:14', 'Present images are not pulled again'
+    assert platform.image_reference('postgres:14', local=False) == 'postgres:14'
+    assert platform.image_reference('postgres:15') == '127.0.0.1:5000/library/postgres:15'
+    for _ in platform.image_pull('127.0.0.1:5000/library/postgres:15'):
+        pass
+    assert platform.image_reference('postgres:15') == '127.0.0.1:5000/library/postgres:15'
+
+
+def test_template_key():
+    first, second = PostgreSQL(), PostgreSQL()
+    assert first.environment['POSTGRES_PASSWORD'] != second.environment['POSTGRES_PASSWORD']
+    assert first.template_key() == second.template_key(), 'Passwords are re-applied after cloning'
+    second.configure(BlueprintSchema(kind='pg', environment={'POSTGRES_DB': 'other'}))
+    assert first.template_key() != second.template_key(), 'Initialisation environment is part of the key'
+    assert Platform.template_volume(first, first.volume_bindings[0]).startswith(f'sk-template-{first.template_key()}-')
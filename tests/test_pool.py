@@ -0,0 +1,96 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import types
+import typing
+
+from suikinkutsu.blueprints import PostgreSQL
+from suikinkutsu.constants import LABEL_POOL
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.models import Instance
+from suikinkutsu.pool import InstancePool
+
+
+class StubPlatform:
+    """
+    Just enough of a platform to keep a pool of instances
+    """
+
+    name = 'stub'
+
+    def __init__(self):
+        self.instances: typing.Dict[str, typing.Dict[str, str]] = {}
+
+    def template_clone(self, blueprint, targets) -> bool:
+        return False
+
+    def apply(self, blueprint, name, template=True) -> Instance:
+        self.instances[name] = dict(blueprint.labels)
+        instance = Instance(instance_id=name, name=name, running=True)
+        instance.port_bindings = blueprint.port_bindings
+        return instance
+
+    def instance_wait(self, name, command, timeout) -> bool:
+        return True
+
+    def instances_labelled(self, label, value) -> typing.List[str]:
+        return sorted(name for name, labels in self.instances.items() if labels.get(label) == value)
+
+    def instance_rename(self, name, new_name):
+        if name not in self.instances:
+            raise MurkyWaterException(msg=f'No such container: {name}')
+        self.instances[new_name] = self.instances.pop(name)
+
+    def instance_update(self, name, resources):
+        pass
+
+    def instance_get(self, name) -> typing.Optional[Instance]:
+        return Instance(instance_id=name, name=name, running=True) if name in self.instances else None
+
+    def instance_remove(self, instance):
+        del self.instances[instance.name]
+
+    def execute(self, args, check=True):
+        pass
+
+
+def test_pool_claim(tmp_path):
+    config = types.SimpleNamespace(config_dir=types.SimpleNamespace(value=str(tmp_path)))
+    platform = StubPlatform()
+    pool = InstancePool(config, platform)
+    blueprint = PostgreSQL()
+    assert pool.claim(blueprint, 'cold') is None, 'There is nothing to claim without a pool'
+
+    started = pool.fill(blueprint, size=2)
+    assert len(started) == 2
+    assert all(platform.instances[name][LABEL_POOL] == InstancePool.key(blueprint) for name in started)
+    assert pool.fill(blueprint) == [], 'A full pool is left alone'
+
+    assert pool.claim(blueprint.variant(labels={'shard': '1'}), 'labelled') is None, 'Labels cannot be changed'
+    assert pool.claim(blueprint.replica('pg-1', 1), 'pg-1') is None, 'Published ports cannot be changed'
+    claimed = pool.claim(PostgreSQL(), 'mydb', refill=False)
+    assert claimed.name == 'mydb'
+    assert len(pool.members(InstancePool.key(blueprint))) == 1, 'A claimed member leaves the pool by its name'
+    assert pool.drain(InstancePool.key(blueprint)) == 1
+    assert list(platform.instances.keys()) == ['mydb']
+    assert pool.state == {}
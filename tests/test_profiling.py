@@ -0,0 +1,114 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import json
+import os
+import pstats
+import subprocess
+import sys
+import time
+
+from suikinkutsu.constants import ENV_CONFIG_DIR, ENV_PLATFORM
+from suikinkutsu.config import Configuration
+from suikinkutsu.profiling import Profiler, MemoryProfiler, install_memory_profiler, memory_section
+
+
+def busy(seconds: float):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_profiler(config_env, monkeypatch):
+    monkeypatch.setenv(ENV_CONFIG_DIR, str(config_env))
+    profiler = Profiler(Configuration(), 'busy')
+    with profiler:
+        busy(0.1)
+    assert profiler.pstats_path.parent == config_env / 'profiles'
+    stats = pstats.Stats(str(profiler.pstats_path))
+    assert any(function == 'busy' for _, _, function in stats.stats)
+    stacks = [line.rsplit(' ', 1) for line in profiler.stacks_path.read_text(encoding='UTF-8').splitlines()]
+    assert len(stacks) > 0
+    assert all(stack.startswith('MainThread;') and int(count) > 0 for stack, count in stacks)
+    assert any('busy (test_profiling.py:' in stack for stack, _ in stacks)
+
+
+@memory_section('allocate')
+def allocate(count: int):
+    return [bytearray(1024) for _ in range(count)]
+
+
+@memory_section('outer')
+def outer():
+    return allocate(10)
+
+
+def test_memory_profiler():
+    assert len(allocate(1)) == 1
+    with MemoryProfiler(top=3) as memory:
+        install_memory_profiler(memory)
+        try:
+            retained = allocate(1000)
+            allocate(2000)
+            outer()
+        finally:
+            install_memory_profiler(None)
+    assert set(memory.sections) == {'allocate', 'outer'}
+    section = memory.sections['allocate']
+    assert section['calls'] == 2
+    # The bytearrays returned are retained when the section ends
+    assert 3000 * 1024 <= section['retained'] < 3300 * 1024
+    assert section['peak'] >= 2000 * 1024
+    sites = memory.top_sites('allocate')
+    assert 0 < len(sites) <= 3
+    assert sites[0][0].startswith('test_profiling.py:')
+    assert sites[0][2] >= 1000
+    assert len(retained) == 1000
+
+
+@memory_section('generate')
+def generate(count: int):
+    for _ in range(count):
+        yield bytearray(1024)
+
+
+def test_memory_profiler_generators():
+    assert len(list(generate(2))) == 2
+    with MemoryProfiler() as memory:
+        install_memory_profiler(memory)
+        try:
+            elements = generate(100)
+            with memory.section('consume'):
+                assert len(list(elements)) == 100
+        finally:
+            install_memory_profiler(None)
+    assert set(memory.sections) == {'generate', 'consume'}, 'Generators are not accounted to their consumer'
+    assert memory.sections['generate']['peak'] >= 100 * 1024
+
+
+def test_memory_report_platform_instances(config_env):
+    result = subprocess.run([sys.executable, '-m', 'suikinkutsu.cli', '-d', str(config_env),
+                             '-r', str(config_env / 'Recipe'), '--memory', '-o', 'json', 'instance', 'list'],
+                            env={**os.environ, ENV_PLATFORM: 'fake'}, capture_output=True, text=True, check=True)
+    reports = {report['title']: report['msg'] for report in map(json.loads, result.stdout.splitlines())}
+    assert {row['Section'] for row in reports['Memory']} == {'platform instances', 'output render'}
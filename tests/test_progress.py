@@ -0,0 +1,91 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import argparse
+
+import pytest
+import yaml
+
+from suikinkutsu.cli import cook_up
+from suikinkutsu.config import Configuration
+from suikinkutsu.constants import ENV_CONFIG_DIR, ENV_CONFIG_FILE, ENV_PLATFORM, ENV_RECIPE_FILE, ENV_OUTPUT, \
+    ENV_FAKE_FAILURE_RATE
+from suikinkutsu.progress import Progress, PullProgress
+from suikinkutsu.runtime import Runtime
+from suikinkutsu.secretsfile import SecretsFile
+
+
+def test_progress_reporting():
+    lines = []
+    with Progress('Testing', lines.append, interval=3600) as progress:
+        progress.update('pg', state='dumping')
+        progress.update('pg', advance=1024)
+        progress.update('pg', advance=1024)
+        progress.update('kc', state='blocked', detail='waiting for pg')
+        progress.update('kc', state='blocked', detail='waiting for pg')
+    # Changes of state are reported right away, byte counts only once per interval
+    assert lines == ['Testing', 'pg: dumping', 'kc: blocked - waiting for pg']
+    assert {task.key: task.completed for task in progress.tasks} == {'pg': 2048, 'kc': 0}
+    progress.update('pg', state='dumped')
+    assert progress.tasks[0].completed == 0, 'Byte counts are specific to a state'
+
+
+def test_pull_progress():
+    pull = PullProgress()
+    assert pull.feed('Digest: sha256:1234') == {}
+    assert pull.feed('a1b2c3d4e5f6: Pulling fs layer') == {'detail': '0/1 layers'}
+    assert pull.feed('f6e5d4c3b2a1: Already exists') == {'detail': '1/2 layers'}
+    assert pull.feed('a1b2c3d4e5f6: Downloading [==>   ]  1.5MB/3MB') == {'detail': '1/2 layers',
+                                                                           'completed': 1500000,
+                                                                           'total': 3000000}
+    assert pull.feed('a1b2c3d4e5f6: Pull complete')['completed'] == 3000000
+
+
+@pytest.mark.parametrize('failure_rate', [0, 1])
+def test_cook_up_concurrently(tmp_path, monkeypatch, capsys, failure_rate):
+    monkeypatch.setenv(ENV_CONFIG_DIR, str(tmp_path))
+    monkeypatch.setenv(ENV_CONFIG_FILE, str(tmp_path / 'water.yaml'))
+    monkeypatch.setenv(ENV_RECIPE_FILE, str(tmp_path / 'Recipe'))
+    monkeypatch.setenv(ENV_PLATFORM, 'fake')
+    monkeypatch.setenv(ENV_OUTPUT, 'ndjson')
+    monkeypatch.setenv(ENV_FAKE_FAILURE_RATE, str(failure_rate))
+    (tmp_path / 'Recipe').write_text(yaml.safe_dump({'blueprints': {
+        'pg': {'kind': 'pg'},
+        'reg': {'kind': 'registry'},
+        'kc': {'kind': 'keycloak', 'depends_on': ['pg', 'reg']}
+    }}), encoding='UTF-8')
+    config = Configuration()
+    runtime = Runtime(config, SecretsFile(config))
+    runtime.cli_assess(None)
+    args = argparse.Namespace(allocate_cores=False, reserve_cores=0, cook_workers=4, environment=[], labels=[])
+    assert cook_up(runtime, args) == failure_rate
+    out = capsys.readouterr().out
+    if failure_rate:
+        assert 'kc: skipped' in out, 'Dependents of failed instances are not started'
+        assert runtime.platform.events[-1]['action'] != 'container.run'
+    else:
+        assert 'kc: blocked - waiting for pg, reg' in out
+        assert {event['target'] for event in runtime.platform.events if event['action'] == 'container.run'} == \
+               {'pg', 'reg', 'kc'}
+        # The dependent is only started once its dependencies are ready
+        started = [event['target'] for event in runtime.platform.events if event['action'] == 'container.run']
+        assert started[-1] == 'kc'
@@ -0,0 +1,265 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+import pathlib
+
+import pytest
+
+import suikinkutsu.constants
+from suikinkutsu import MurkyWaterException
+from suikinkutsu.cli import cook_show
+from suikinkutsu.config import Configuration
+from suikinkutsu.lockfile import LockFile
+from suikinkutsu.recipe import Recipe
+from suikinkutsu.runtime import Runtime
+from suikinkutsu.secretsfile import SecretsFile
+from suikinkutsu.blueprints import PostgreSQL, Keycloak
+from suikinkutsu.schema import LayerSchema
+
+
+@pytest.fixture
+def recipe_config(config_env, monkeypatch) -> Configuration:
+    recipe_file = config_env / 'Recipe'
+    monkeypatch.setenv(suikinkutsu.constants.ENV_RECIPE_FILE, str(recipe_file))
+    monkeypatch.setenv(suikinkutsu.constants.ENV_CONFIG_DIR, str(config_env))
+    yield Configuration()
+
+
+def make_recipe(config: Configuration, content: str) -> Recipe:
+    recipe_file = config.recipe_file.value
+    with open(recipe_file, 'w', encoding='UTF-8') as r:
+        r.write(content)
+    return Recipe(config, {'pg': PostgreSQL(), 'keycloak': Keycloak()}, LockFile(config))
+
+
+def test_recipe_configures_blueprints(recipe_config):
+    recipe = make_recipe(recipe_config, '''
+blueprints:
+  kc:
+    kind: keycloak
+    depends_on: [pg]
+  pg:
+    kind: pg
+    version: '15'
+    environment:
+      POSTGRES_DB: testdb
+    ports:
+      5432/tcp: 127.0.0.1:15432
+''')
+    assert list(recipe.blueprints.keys()) == ['kc', 'pg']
+    pg = recipe.blueprints['pg']
+    assert pg.version == '15'
+    assert pg.environment['POSTGRES_DB'] == 'testdb'
+    assert pg.port_bindings[0].host_port == '15432'
+    assert [name for name, _ in recipe.ordered()] == ['pg', 'kc'], 'Dependencies are ordered first'
+
+
+def test_recipe_ephemeral_volumes(recipe_config):
+    recipe = make_recipe(recipe_config, '''
+blueprints:
+  pg:
+    kind: pg
+    volumes:
+      pg_datavol:
+        mount_point: /var/lib/postgresql/data
+        ephemeral: true
+        size: 256m
+      pg_confvol: /etc/postgresql
+''')
+    volumes = recipe.blueprints['pg'].volume_bindings
+    assert [(vol.name, vol.ephemeral, vol.size) for vol in volumes] == [('pg_datavol', True, '256m'),
+                                                                       ('pg_confvol', False, None)]
+    assert recipe.blueprints['pg'].template_key() != PostgreSQL().ephemeral().template_key()
+
+
+def test_recipe_layered_defaults(recipe_config):
+    recipe = make_recipe(recipe_config, '''
+defaults:
+  pg:
+    version: '15'
+    labels:
+      team: data
+    environment:
+      POSTGRES_DB: shared
+      POSTGRES_USER: shared
+    ports:
+    resources:
+      cpus: 2
+      memory: 1g
+blueprints:
+  pg:
+    kind: pg
+    environment:
+      POSTGRES_DB: mine
+    resources:
+      cpus: 1
+  legacy:
+    kind: pg
+    version: '13'
+  kc:
+    kind: keycloak
+''')
+    recipe.override(LayerSchema(environment={'POSTGRES_USER': 'cli'}))
+    pg = recipe.blueprints['pg']
+    assert pg.version == '15', 'Settings fall back to the defaults for the kind'
+    assert pg.labels['team'] == 'data'
+    assert pg.environment['POSTGRES_DB'] == 'mine', 'Instances override the defaults'
+    assert pg.environment['POSTGRES_USER'] == 'cli', 'The command line overrides the recipe'
+    assert str(pg.port_bindings[0].host_port) == '5432', 'Empty default sections leave the blueprint defaults'
+    assert (pg.resources.cpus, pg.resources.memory) == (1, '1g'), 'Resources are merged by key'
+    assert recipe.blueprints['legacy'].version == '13'
+    assert recipe.blueprints['kc'].version == Keycloak().version, 'Defaults only apply to their kind'
+    assert recipe.blueprints['kc'].environment['POSTGRES_USER'] == 'cli'
+    assert recipe.blueprints['pg'] is pg, 'Blueprints are configured once'
+
+
+def test_recipe_templates(recipe_config):
+    recipe = make_recipe(recipe_config, '''
+defaults:
+  pg:
+    environment:
+      POSTGRES_DB: shard_${index}
+blueprints:
+  pg:
+    kind: pg
+    replicas: 2
+    matrix:
+      version: ['14', 15]
+    ports:
+      5432/tcp: 127.0.0.1:15432
+  kc:
+    kind: keycloak
+    replicas: 4
+    depends_on: [pg]
+  app:
+    kind: keycloak
+    depends_on: [kc, external]
+''')
+    assert list(recipe.blueprints) == ['pg-14-0', 'pg-14-1', 'pg-15-0', 'pg-15-1', 'kc-0', 'kc-1', 'kc-2', 'kc-3',
+                                       'app']
+    pg = recipe.blueprints['pg-15-1']
+    assert pg.version == '15', 'Matrix parameters set the settings of the same name'
+    assert pg.environment['POSTGRES_DB'] == 'shard_3', 'Parameters are substituted'
+    assert [str(port.host_port) for port in pg.port_bindings] == ['15435'], 'Host ports are offset by the index'
+    assert [vol.name for vol in pg.volume_bindings] == [f'pg-15-1-{vol.name}' for vol in PostgreSQL().volume_bindings]
+    assert recipe.blueprints['kc-2'].depends_on == ['pg-15-0'], 'Templates of the same size depend pairwise'
+    assert recipe.blueprints['app'].depends_on == ['kc-0', 'kc-1', 'kc-2', 'kc-3', 'external']
+    assert [name for name, _ in recipe.ordered()].index('kc-2') > 2
+
+
+def test_recipe_template_clashes(recipe_config):
+    with pytest.raises(MurkyWaterException):
+        make_recipe(recipe_config, '''
+blueprints:
+  pg:
+    kind: pg
+    replicas: 2
+  pg-1:
+    kind: pg
+''')
+
+
+
+@pytest.mark.parametrize('host,replicas', [('127.0.0.1:notaport', 1), ('70000', 1), ('127.0.0.1:65535', 2)])
+def test_recipe_invalid_host_ports(recipe_config, host: str, replicas: int):
+    recipe = make_recipe(recipe_config, f'''
+blueprints:
+  pg:
+    kind: pg
+    replicas: {replicas}
+    ports:
+      5432/tcp: '{host}'
+''')
+    with pytest.raises(MurkyWaterException, match='Recipe entry pg'):
+        assert recipe.blueprints
+
+def test_recipe_circular_dependencies(recipe_config):
+    recipe = make_recipe(recipe_config, '''
+blueprints:
+  pg:
+    kind: pg
+    depends_on: [kc]
+  kc:
+    kind: keycloak
+    depends_on: [pg]
+''')
+    with pytest.raises(MurkyWaterException):
+        recipe.ordered()
+
+
+def test_lockfile_roundtrip(recipe_config):
+    lockfile = LockFile(recipe_config)
+    assert lockfile.get('postgres:14') is None
+    lockfile.add('postgres:14', 'postgres@sha256:1234')
+    lockfile.save()
+    assert lockfile.lock_file.name == 'Recipe.lock'
+    assert LockFile(recipe_config).get('postgres:14') == 'postgres@sha256:1234'
+
+
+def test_recipe_cache(recipe_config, monkeypatch):
+    content = '''
+blueprints:
+  pg:
+    kind: pg
+    volumes:
+      pg_datavol:
+        mount_point: /var/lib/postgresql/data
+        ephemeral: true
+'''
+    make_recipe(recipe_config, content)
+    assert len(list((pathlib.Path(recipe_config.config_dir.value) / 'recipes').iterdir())) == 1
+
+    def not_parsed(_):
+        raise AssertionError('The recipe is parsed again')
+    monkeypatch.setattr('suikinkutsu.yamlstream.load', not_parsed)
+    recipe = make_recipe(recipe_config, content)
+    assert recipe.blueprints['pg'].volume_bindings[0].ephemeral, 'The cached recipe is equivalent'
+    with pytest.raises(AssertionError):
+        make_recipe(recipe_config, content.replace('pg:\n    kind', 'db:\n    kind'))
+
+
+@pytest.mark.parametrize('content', ['blueprints: [pg',
+                                     'blueprints:\n  pg:\n    version: 15',
+                                     'blueprints:\n  pg:\n    kind: pg\n    matrix:\n      version: []',
+                                     'blueprints:\n  pg:\n    kind: nope'])
+def test_recipe_errors_are_reported(recipe_config, content):
+    with pytest.raises(MurkyWaterException):
+        make_recipe(recipe_config, content)
+
+
+@pytest.mark.parametrize('output', ['human', 'json'])
+def test_cook_show(recipe_config, monkeypatch, capsys, output):
+    monkeypatch.setenv(suikinkutsu.constants.ENV_PLATFORM, 'fake')
+    monkeypatch.setenv(suikinkutsu.constants.ENV_OUTPUT, output)
+    config = Configuration()
+    runtime = Runtime(config, SecretsFile(config))
+    runtime.cli_assess(None)
+    pathlib.Path(config.recipe_file.value).write_text('blueprints:\n  pg:\n    kind: pg\n', encoding='UTF-8')
+    assert cook_show(runtime, None) == 0
+    assert 'pg_datavol' in capsys.readouterr().out
+
+    pathlib.Path(config.recipe_file.value).write_text('blueprints:\n  pg:\n    kind: nope\n', encoding='UTF-8')
+    runtime = Runtime(config, SecretsFile(config))
+    runtime.cli_assess(None)
+    assert cook_show(runtime, None) == 1
+    reported = ' '.join(capsys.readouterr().out.split())
+    assert 'Blueprint nope for instance pg is not available' in reported, 'Recipe errors are reported'
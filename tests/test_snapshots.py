@@ -0,0 +1,90 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import os
+import types
+import typing
+
+import pytest
+
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.models import Instance, VolumeBinding
+from suikinkutsu.snapshots import VolumeSnapshots
+
+
+class StubPlatform:
+    """
+    Just enough of a platform to export and import volumes
+    """
+
+    def __init__(self, volumes: typing.Dict[str, bytes]):
+        self.volumes = volumes
+        self.calls = []
+
+    def instance_stop(self, name: str):
+        self.calls.append(('stop', name))
+
+    def instance_start(self, name: str):
+        self.calls.append(('start', name))
+
+    def volume_export(self, volume: str, destination: typing.BinaryIO):
+        destination.write(self.volumes[volume])
+
+    def volume_import(self, volume: str, source: typing.BinaryIO):
+        self.volumes[volume] = source.read()
+
+
+def test_snapshot_roundtrip(tmp_path):
+    config = types.SimpleNamespace(config_dir=types.SimpleNamespace(value=str(tmp_path)))
+    content = {'pg_datavol': os.urandom(100000), 'pg_confvol': os.urandom(1000)}
+    instance = Instance(instance_id='1234', name='pg', running=True)
+    instance.volume_bindings = [VolumeBinding(name, f'/{name}') for name in content]
+    platform = StubPlatform(dict(content))
+    snapshots = VolumeSnapshots(config, workers=3, chunk_size=4096)
+
+    manifest = snapshots.create(platform, instance, 'compressed', snapshot_format='gzip')
+    assert len(manifest['volumes'][0]['members']) == 25, 'Compressed volumes are split into gzip members'
+    snapshots.create(platform, instance, 'plain', snapshot_format='tar')
+    snapshots.create(platform, instance, 'stored')
+    manifest = snapshots.create(platform, instance, 'stored-again')
+    assert [vol['stored'] for vol in manifest['volumes']] == [0, 0], 'Unchanged volumes write no chunks'
+    assert platform.calls == [('stop', 'pg'), ('start', 'pg')] * 4, 'A running instance is stopped while exporting'
+    assert [m['snapshot'] for m in snapshots.list('pg')] == ['compressed', 'plain', 'stored', 'stored-again']
+
+    for snapshot in ['compressed', 'plain', 'stored-again']:
+        platform.volumes = {}
+        snapshots.restore(platform, instance, snapshot)
+        assert platform.volumes == content
+
+    snapshots.remove('pg', 'stored')
+    assert [m['snapshot'] for m in snapshots.list('pg')] == ['compressed', 'plain', 'stored-again']
+
+
+@pytest.mark.parametrize('snapshot_name', ['../../escaped', 'a/b', '..', ''])
+def test_snapshot_names(tmp_path, snapshot_name):
+    config = types.SimpleNamespace(config_dir=types.SimpleNamespace(value=str(tmp_path / 'config')))
+    instance = Instance(instance_id='1234', name='pg', running=False)
+    instance.volume_bindings = [VolumeBinding('pg_datavol', '/data')]
+    with pytest.raises(MurkyWaterException):
+        VolumeSnapshots(config).create(StubPlatform({'pg_datavol': b'data'}), instance, snapshot_name, 'tar')
+    assert list(tmp_path.iterdir()) == [], 'Nothing is written outside of the snapshot directory'
@@ -0,0 +1,93 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import os
+import random
+import types
+
+import pytest
+
+from suikinkutsu.exceptions import MurkyWaterException
+from suikinkutsu.chunking import content_defined_chunks
+from suikinkutsu.store import ChunkStore
+
+
+@pytest.fixture
+def store(tmp_path) -> ChunkStore:
+    config = types.SimpleNamespace(config_dir=types.SimpleNamespace(value=str(tmp_path)))
+    return ChunkStore(config, workers=3, min_size=4096, avg_size=16384, max_size=65536)
+
+
+def test_content_defined_chunks():
+    content = os.urandom(1024 * 1024)
+    chunks = list(content_defined_chunks([content[i:i + 1000] for i in range(0, len(content), 1000)],
+                                         4096, 16384, 65536))
+    assert b''.join(chunks) == content
+    assert all(4096 <= len(chunk) <= 65536 for chunk in chunks[:-1])
+    edited = list(content_defined_chunks([content[:5000] + b'edit' + content[5000:]], 4096, 16384, 65536))
+    assert len(set(chunks) - set(edited)) <= 2, 'An edit only changes the chunks around it'
+
+
+
+def test_content_defined_chunks_resynchronise():
+    rng = random.Random(1)
+    words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 9))) for _ in range(5000)]
+    content = ' '.join(rng.choice(words) for _ in range(200000)).encode('UTF-8')
+    chunks = list(content_defined_chunks([content], 4096, 16384, 65536))
+    assert len(chunks) > 20
+    for offset in [0, 100000, len(content) // 2]:
+        edited = list(content_defined_chunks([content[:offset] + b'insert' + content[offset:]], 4096, 16384, 65536))
+        assert len(set(chunks) - set(edited)) <= 2, 'Boundaries survive an insertion in text'
+
+
+def test_content_defined_chunks_without_anchors():
+    content = bytes(random.Random(1).choices(b'0123456789', k=300000))
+    chunks = list(content_defined_chunks([content], 4096, 16384, 65536))
+    assert [len(chunk) for chunk in chunks[:-1]] == [65536] * 4, 'Data without anchor pairs is cut at the maximum size'
+
+
+def test_store_deduplicates(store):
+    content = os.urandom(1024 * 1024)
+    first = store.put('pg/pg/first', [content], metadata={'schema': 'public'})
+    assert first['stored'] > 0
+    assert store.put('pg/pg/same', [content])['stored'] == 0, 'Identical content writes no chunks'
+    edited = store.put('pg/pg/edited', [content[:5000], b'edit', content[5000:]])
+    assert 0 < edited['stored'] < first['stored'] / 4, 'Only changed chunks are written'
+    assert b''.join(store.get('pg/pg/edited')) == content[:5000] + b'edit' + content[5000:]
+    assert [index['key'] for index in store.list('pg')] == ['pg/pg/edited', 'pg/pg/first', 'pg/pg/same']
+    assert store.index('pg/pg/first')['metadata'] == {'schema': 'public'}
+
+
+def test_store_gc(store):
+    store.put('a/one', [os.urandom(100000)])
+    kept = os.urandom(100000)
+    store.put('b/two', [kept])
+    assert store.remove('a') == 1
+    removed, freed = store.gc()
+    assert removed > 0 and freed > 0
+    assert store.gc() == (0, 0)
+    assert b''.join(store.get('b/two')) == kept
+    with pytest.raises(MurkyWaterException):
+        store.index('a/one')
+    with pytest.raises(MurkyWaterException):
+        store.put('../escape', [b''])
@@ -0,0 +1,121 @@
+#  MIT License
+#
+#  Copyright (c) 2023 Mathieu Imfeld
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in
+#  all copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NON INFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+import http.server
+import json
+import threading
+import types
+
+import pytest
+
+from suikinkutsu import tracing, MurkyWaterException
+from suikinkutsu.cli import trace_export, jaeger_endpoint
+from suikinkutsu.tracing import Tracer, STATUS_ERROR
+
+
+def test_tracer_nesting():
+    tracer = Tracer()
+    with tracer.span('cook up') as root:
+        with tracer.span('up pg', {'instance': 'pg'}) as pg:
+            pass
+        with tracer.span('up kc', parent=pg, links=[root]) as kc:
+            def run():
+                with tracer.span('docker container run'):
+                    pass
+            worker = threading.Thread(target=run)
+            worker.start()
+            worker.join()
+        with pytest.raises(ValueError):
+            with tracer.span('down pg'):
+                raise ValueError('boom')
+    spans = {span['name']: span for span in tracer.to_otlp()['resourceSpans'][0]['scopeSpans'][0]['spans']}
+    assert 'parentSpanId' not in spans['cook up']
+    assert spans['up pg']['parentSpanId'] == root.span_id
+    assert spans['up pg']['attributes'] == [{'key': 'instance', 'value': {'stringValue': 'pg'}}]
+    assert spans['up kc']['parentSpanId'] == pg.span_id
+    assert spans['up kc']['links'] == [{'traceId': tracer.trace_id, 'spanId': root.span_id}]
+    assert spans['docker container run']['parentSpanId'] == root.span_id
+    assert spans['down pg']['status'] == {'code': STATUS_ERROR, 'message': 'boom'}
+    assert all(span['traceId'] == tracer.trace_id for span in spans.values())
+    assert int(spans['cook up']['endTimeUnixNano']) >= int(spans['up kc']['endTimeUnixNano'])
+    assert kc.parent is pg
+
+
+def test_tracer_export(tmp_path):
+    received = []
+
+    class Collector(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append((self.path, json.loads(self.rfile.read(int(self.headers['Content-Length'])))))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    tracer = Tracer()
+    tracing.install(tracer)
+    try:
+        with tracing.span('config show'):
+            pass
+    finally:
+        tracing.install(None)
+    with tracing.span('untraced') as span:
+        assert span is None
+
+    tracer.write(tmp_path / 'traces.jsonl')
+    tracer.write(tmp_path / 'traces.jsonl')
+    lines = (tmp_path / 'traces.jsonl').read_text(encoding='UTF-8').splitlines()
+    assert len(lines) == 2 and json.loads(lines[0]) == tracer.to_otlp()
+
+    server = http.server.HTTPServer(('127.0.0.1', 0), Collector)
+    thread = threading.Thread(target=server.handle_request)
+    thread.start()
+    tracer.send(f'http://127.0.0.1:{server.server_port}/v1/traces')
+    thread.join()
+    server.server_close()
+    assert received == [('/v1/traces', tracer.to_otlp())]
+
+
+class UnreachablePlatform:
+    available = True
+
+    def instances_labelled(self, label, value):
+        raise MurkyWaterException(msg='Cannot connect to the Docker daemon')
+
+
+@pytest.mark.parametrize('platform', [None, UnreachablePlatform()])
+def test_trace_export_without_platform(tmp_path, platform):
+    warnings = []
+    runtime = types.SimpleNamespace(platform=platform,
+                                    output=types.SimpleNamespace(info=warnings.append, warning=warnings.append))
+    assert jaeger_endpoint(runtime) is None
+    tracing.install(Tracer())
+    try:
+        with tracing.span('config show'):
+            pass
+        trace_export(runtime, 'http://127.0.0.1:1/v1/traces')
+        trace_export(runtime, None)
+    finally:
+        tracing.install(None)
+    assert len(warnings) == 2, 'The trace is sent to the default endpoint, failing to send it is only a warning'